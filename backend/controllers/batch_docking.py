@@ -0,0 +1,167 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from rdkit import Chem
+
+from controllers.docking_controller import DockingController
+
+logger = logging.getLogger(__name__)
+
+# Default number of docking worker processes (defaults to one per core)
+DOCK_BATCH_WORKERS = int(os.getenv("DOCK_BATCH_WORKERS", "0")) or None
+
+# Docking controller owned by each worker process
+_worker_controller = None
+_worker_cysteine_id = None
+
+
+def plan_workers(n_jobs, max_workers=None, total_cpus=None):
+    """
+    Split the machine between worker processes and Vina threads
+
+    Args:
+        n_jobs (int): Number of ligands to dock
+        max_workers (int, optional): Upper bound on worker processes
+        total_cpus (int, optional): CPUs available (default: os.cpu_count())
+
+    Returns:
+        tuple: (workers, cpu_per_job) with workers * cpu_per_job <= total_cpus
+    """
+    total_cpus = total_cpus or os.cpu_count() or 1
+    workers = max_workers or DOCK_BATCH_WORKERS or total_cpus
+    workers = max(1, min(workers, total_cpus, n_jobs))
+    cpu_per_job = max(1, total_cpus // workers)
+    return workers, cpu_per_job
+
+
+def read_sdf_ligands(sdf_file):
+    """
+    Read ligands from an SDF file object
+
+    Args:
+        sdf_file: Binary file object with SDF content
+
+    Returns:
+        list: (name, smiles) tuples; smiles is None for unreadable records
+    """
+    ligands = []
+    for idx, mol in enumerate(Chem.ForwardSDMolSupplier(sdf_file)):
+        if mol is None:
+            ligands.append((f"molecule_{idx}", None))
+            continue
+
+        name = mol.GetProp("_Name") if mol.HasProp("_Name") else ""
+        ligands.append((name or f"molecule_{idx}", Chem.MolToSmiles(mol)))
+
+    return ligands
+
+
+def _init_worker(protein_path, cysteine_id, engine, cpu, exhaustiveness):
+    """Set up the per-process docking controller"""
+    global _worker_controller, _worker_cysteine_id
+
+    controller = DockingController(engine=engine)
+    controller.cpu = cpu
+    controller.exhaustiveness = exhaustiveness
+    # Same box for every ligand, so the stored grid maps apply to all
+    controller.size_box_to_ligand = False
+
+    # The parent prepared the receptor, so this is a receptor cache hit
+    controller.set_protein(protein_path)
+
+    _worker_controller = controller
+    _worker_cysteine_id = cysteine_id
+
+
+def _dock_one(job):
+    """Dock a single ligand inside a worker process"""
+    index, name, smiles = job
+
+    if not smiles:
+        result = {"status": "error", "message": "Could not read molecule"}
+    else:
+        try:
+            result = _worker_controller.dock_from_smiles(
+                smiles=smiles, cysteine_id=_worker_cysteine_id
+            )
+        except Exception as e:
+            result = {"status": "error", "message": str(e)}
+
+    result.update({"index": index, "name": name, "smiles": smiles})
+    return result
+
+
+def dock_batch(
+    protein_path,
+    ligands,
+    cysteine_id=None,
+    max_workers=None,
+    engine="cli",
+    exhaustiveness=8,
+):
+    """
+    Dock many ligands against one receptor using a process pool
+
+    The receptor is prepared once in the calling process; each worker
+    then picks it up from the receptor cache. Vina's CPU count per job is
+    chosen so that all concurrent jobs together use the machine's cores
+    without oversubscribing them.
+
+    Args:
+        protein_path (str): Path to protein structure file (PDB or PDBQT)
+        ligands (list): (name, smiles) tuples
+        cysteine_id (str, optional): Cysteine ID for covalent docking
+        max_workers (int, optional): Maximum number of worker processes
+        engine (str): Docking engine, "cli" or "python"
+        exhaustiveness (int): Vina search exhaustiveness
+
+    Returns:
+        list: One result dict per ligand, in input order. Failed ligands
+            have status "error" and do not affect the others.
+    """
+    if not ligands:
+        return []
+
+    # Prepare (and cache) the receptor once before fanning out
+    controller = DockingController(engine=engine)
+    controller.size_box_to_ligand = False
+    controller.set_protein(protein_path)
+
+    # Store the grid maps once; workers then load them instead of computing
+    if engine == "python":
+        controller.precompute_maps(cysteine_id)
+
+    workers, cpu_per_job = plan_workers(len(ligands), max_workers)
+    logger.info(
+        f"Docking {len(ligands)} ligands with {workers} workers x {cpu_per_job} CPUs"
+    )
+
+    jobs = [(idx, name, smiles) for idx, (name, smiles) in enumerate(ligands)]
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(protein_path, cysteine_id, engine, cpu_per_job, exhaustiveness),
+    ) as pool:
+        futures = [pool.submit(_dock_one, job) for job in jobs]
+
+    results = []
+    for (index, name, smiles), future in zip(jobs, futures):
+        try:
+            results.append(future.result())
+        except Exception as e:
+            # A crashed worker breaks the pool; report the ligands it left
+            # unfinished instead of failing the whole request
+            logger.error(f"Docking worker failed for {smiles}: {str(e)}")
+            results.append(
+                {
+                    "status": "error",
+                    "message": f"Docking worker failed: {str(e)}",
+                    "index": index,
+                    "name": name,
+                    "smiles": smiles,
+                }
+            )
+
+    return results
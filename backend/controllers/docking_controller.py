@@ -1,6 +1,9 @@
+import itertools
 import os
 import tempfile
 import subprocess
+import time
+from contextlib import contextmanager
 from pathlib import Path
 from rdkit import Chem
 from rdkit.Chem import AllChem
@@ -8,6 +11,35 @@ import numpy as np
 import shutil
 import uuid
 
+from controllers.vina_engine import box_key, get_vina_engine
+from utils.covalent_geometry import (
+    map_mol_atoms_to_pdbqt,
+    parse_pdbqt_coords,
+    reactive_pose_atoms,
+    warhead_cysteine_distances,
+)
+from utils.covalent_scoring import score_covalent
+from utils.ligand_cache import OPENBABEL_PREP, RDKIT_PREP, get_ligand_cache
+from utils.ligand_prep import conformers_to_sdf, embed_conformers, mol_to_pdbqt
+from utils.pocket_detection import DEFAULT_LIGAND_EXTENT, fit_docking_box, ligand_extent
+from utils.pose_parser import read_vina_poses
+from utils.receptor_cache import get_receptor_cache
+from utils.receptor_crop import crop_receptor
+from utils.receptor_index import get_receptor_index
+from utils.receptor_registry import POCKET_BOX, get_receptor_registry
+
+# Options passed to obabel when converting a receptor PDB to PDBQT
+RECEPTOR_CONVERSION_OPTIONS = {"converter": "obabel", "flags": "-xr"}
+
+# Lowest-energy conformers of each ligand docked separately; the best
+# scoring run is reported
+LIGAND_DOCK_CONFORMERS = int(os.getenv("LIGAND_DOCK_CONFORMERS", "1"))
+
+# Dock against residues within this many Angstroms of the box only;
+# 0 docks against the whole receptor. Vina ignores atoms further than
+# 8 A from the grid, so 10 A leaves the maps unchanged.
+RECEPTOR_CROP_DISTANCE = float(os.getenv("RECEPTOR_CROP_DISTANCE", "0"))
+
 class WarheadDetector:
     """Simple class to detect possible reactive warheads in molecules"""
     
@@ -23,6 +55,19 @@ class WarheadDetector:
             "nitrile": "[CX2]#[NX1]",
             "beta_lactone": "C1OC(=O)C1",
         }
+        
+        # Positions (within each SMARTS match) of the electrophilic atoms
+        # attacked by the cysteine thiol
+        self.reactive_atoms = {
+            "acrylamide": [0],
+            "chloroacetamide": [1],
+            "vinyl_sulfone": [0],
+            "alpha_beta_unsaturated": [0],
+            "michael_acceptor": [0],
+            "epoxide": [0, 2],
+            "nitrile": [0],
+            "beta_lactone": [2],
+        }
     
     def detect_warheads(self, mol):
         """
@@ -46,10 +91,15 @@ class WarheadDetector:
             pattern = Chem.MolFromSmarts(smarts)
             if pattern and mol.HasSubstructMatch(pattern):
                 matches = mol.GetSubstructMatches(pattern)
+                positions = self.reactive_atoms.get(name)
                 warheads_found.append({
                     "type": name,
                     "smarts": smarts,
-                    "atom_indices": [list(match) for match in matches]
+                    "atom_indices": [list(match) for match in matches],
+                    "reactive_atom_indices": [
+                        [match[p] for p in positions] if positions else list(match)
+                        for match in matches
+                    ]
                 })
         
         return {
@@ -62,6 +112,9 @@ def calculate_covalent_score(affinity, distance):
     """
     Calculate a composite score for covalent binding potential
     
+    Scalar wrapper around utils.covalent_scoring; use score_covalent to
+    score many poses at once.
+    
     Args:
         affinity (float): Binding affinity/docking score
         distance (float): Distance to reactive cysteine
@@ -69,29 +122,16 @@ def calculate_covalent_score(affinity, distance):
     Returns:
         float: Covalent binding score
     """
-    # Distance penalty factor (higher distance = more penalty)
-    if distance < 3.5:
-        distance_factor = 1.0
-    elif distance < 5.0:
-        distance_factor = 0.8
-    elif distance < 7.0:
-        distance_factor = 0.4
-    else:
-        distance_factor = 0.1
-    
-    # Affinity contribution (negative scores are better)
-    affinity_component = min(1.0, max(0.0, (-affinity - 4) / 6))
-    
-    # Combined score (higher is better)
-    score = affinity_component * distance_factor * 10
-    
-    return score
+    scores, _ = score_covalent(affinity, distance, True, scoring="step")
+    return float(scores)
 
 
 def predict_covalent_binding(affinity, has_warhead, distance):
     """
     Predict likelihood of covalent binding based on score, distance and warhead presence
     
+    Scalar wrapper around utils.covalent_scoring.score_covalent.
+    
     Args:
         affinity (float): Binding affinity/docking score
         has_warhead (bool): Whether molecule has a warhead
@@ -100,33 +140,58 @@ def predict_covalent_binding(affinity, has_warhead, distance):
     Returns:
         str: "likely" or "unlikely"
     """
-    if not has_warhead:
-        return "unlikely"
-    
-    if distance > 8.0:
-        return "unlikely"
-    
-    # Calculate covalent score
-    score = calculate_covalent_score(affinity, distance)
-    
-    # Decision threshold
-    return "likely" if score > 4.0 else "unlikely"
+    _, predictions = score_covalent(affinity, distance, has_warhead, scoring="step")
+    return str(predictions)
 
 
 class DockingController:
     """Controller for molecular docking operations"""
     
-    def __init__(self, vina_path="vina"):
+    def __init__(self, vina_path="vina", engine="cli", covalent_scoring="step"):
         """
         Initialize the docking controller
         
         Args:
             vina_path (str): Path to AutoDock Vina executable
+            engine (str): "cli" to run the vina executable per ligand, or
+                "python" to dock in-process against reusable grid maps
+            covalent_scoring (str): Name of the covalent scoring function
+                (see utils.covalent_scoring.SCORING_FUNCTIONS)
         """
+        if engine not in ("cli", "python"):
+            raise ValueError(f"Unsupported docking engine: {engine}")
+        
         self.vina_path = vina_path
+        self.engine = engine
+        self.covalent_scoring = covalent_scoring
         self.protein_path = None
+        self.exhaustiveness = 8
+        self.num_modes = 9
+        
+        # CPUs per Vina run; None lets Vina use every core
+        self.cpu = None
+        
+        # Conformers of each ligand to dock, lowest energy first
+        self.dock_conformers = LIGAND_DOCK_CONFORMERS
+        
+        # Wall-clock seconds spent in each stage of the last docking run
+        self.timings = {}
+        
+        # Crop the receptor around the box before docking (None: whole receptor)
+        self.crop_distance = RECEPTOR_CROP_DISTANCE or None
+        
+        # Size pocket boxes for each ligand; when False every ligand gets
+        # the same box so a batch can share grid maps
+        self.size_box_to_ligand = True
+        self.ligand_extent = None
+        
+        # Boxes fitted at preparation time for the default ligand extent,
+        # keyed by cysteine ID or POCKET_BOX, and cysteine SG coordinates;
+        # set from the receptor registry (see utils.receptor_registry)
+        self.boxes = {}
+        self.cysteines = {}
         
-        # Default box size and center
+        # Default box size and center, used when no pocket is found
         self.center_x = 0
         self.center_y = 0
         self.center_z = 0
@@ -146,12 +211,19 @@ class DockingController:
         # Initialize warhead detector
         self.warhead_detector = WarheadDetector()
     
-    def set_protein(self, protein_path):
+    def set_protein(self, protein_path, use_cache=True):
         """
         Set protein structure for docking
+
+        A cleaned PDB registered by protein preparation is docked against
+        the receptor PDBQT written at preparation, with its site-limited
+        protonation and AutoDock types. Other PDB inputs are converted
+        once with obabel. Either way the receptor is stored in the
+        receptor cache, and later calls with the same structure reuse it.
         
         Args:
             protein_path (str): Path to protein structure file (PDB or PDBQT)
+            use_cache (bool): Whether to use the receptor cache (default: True)
             
         Returns:
             str: Path to the prepared protein file
@@ -159,6 +231,21 @@ class DockingController:
         if not os.path.exists(protein_path):
             raise FileNotFoundError(f"Protein file not found: {protein_path}")
         
+        self.boxes, self.cysteines = {}, {}
+        cache = get_receptor_cache() if use_cache else None
+        cache_key = None
+        
+        entry = get_receptor_registry().find_by_path(protein_path)
+        if entry is not None and os.path.exists(entry["pdbqt"]):
+            return self._set_prepared_protein(entry, cache)
+        
+        if cache is not None and protein_path.lower().endswith('.pdb'):
+            cache_key = cache.receptor_key(protein_path, **RECEPTOR_CONVERSION_OPTIONS)
+            cached_pdbqt = cache.get_receptor(cache_key)
+            if cached_pdbqt:
+                self.protein_path = cached_pdbqt
+                return self.protein_path
+        
         # Copy the file to the working directory
         protein_basename = os.path.basename(protein_path)
         protein_copy = os.path.join(self.work_dir, f"receptor_{protein_basename}")
@@ -177,6 +264,13 @@ class DockingController:
                     raise FileNotFoundError("Failed to convert PDB to PDBQT")
             except Exception as e:
                 raise RuntimeError(f"Error converting protein to PDBQT format: {str(e)}")
+            
+            if cache_key is not None:
+                # get_receptor_index picks up an index saved at preparation
+                self.protein_path = cache.put_receptor(
+                    cache_key, protein_copy, pdbqt_path,
+                    index=get_receptor_index(protein_path)
+                )
         elif protein_copy.lower().endswith('.pdbqt'):
             self.protein_path = protein_copy
         else:
@@ -184,6 +278,31 @@ class DockingController:
         
         return self.protein_path
     
+    def _set_prepared_protein(self, entry, cache):
+        """
+        Use the receptor PDBQT, boxes and cysteines stored at preparation
+        
+        Args:
+            entry (dict): Receptor registry entry
+            cache (ReceptorCache): Receptor cache, or None to use the
+                prepared files in place
+            
+        Returns:
+            str: Path to the receptor PDBQT file
+        """
+        self.boxes, self.cysteines = entry["boxes"], entry["cysteines"]
+        
+        pdb_path, pdbqt_path = entry["cleaned_pdb"], entry["pdbqt"]
+        if cache is None:
+            self.protein_path = pdbqt_path
+            return self.protein_path
+        
+        cache_key = cache.receptor_key(pdb_path, prepared_pdbqt=cache.file_digest(pdbqt_path))
+        self.protein_path = cache.get_receptor(cache_key) or cache.put_receptor(
+            cache_key, pdb_path, pdbqt_path, index=get_receptor_index(pdb_path)
+        )
+        return self.protein_path
+    
     def _run_command(self, cmd, check=True):
         """
         Run a shell command safely
@@ -207,139 +326,172 @@ class DockingController:
             
         return process.stdout, process.stderr, process.returncode
     
-    def _prepare_ligand(self, smiles):
+    def _prepare_ligand(self, smiles, use_cache=True):
         """
         Prepare ligand for docking from SMILES
+
+        A conformer ensemble is embedded and optimised on self.cpu cores
+        (all if not set), and the self.dock_conformers lowest-energy
+        conformers are returned.
+        The PDBQT is written by Meeko straight from the RDKit molecule,
+        without intermediate files or obabel processes. Ligands already
+        prepared by this method or by molecule_handler.process_smiles are
+        reused from the ligand cache.
         
         Args:
             smiles (str): SMILES string of the ligand
+            use_cache (bool): Whether to use the ligand cache (default: True)
             
         Returns:
-            tuple: (pdbqt_path, mol)
+            list: (pdbqt, mol) per conformer, lowest energy first, with the
+                PDBQT content as text
         """
         try:
+            cache = get_ligand_cache() if use_cache else None
+            
+            if cache is not None:
+                cached = self._load_cached_ligand(cache, smiles)
+                if cached is not None:
+                    return cached
+            
             # Generate RDKit molecule
             mol = Chem.MolFromSmiles(smiles)
             if mol is None:
                 raise ValueError("Invalid SMILES string")
             
-            # Add hydrogens and generate 3D coordinates
+            # Add hydrogens and generate the 3D conformer ensemble
             mol = Chem.AddHs(mol)
-            AllChem.EmbedMolecule(mol, randomSeed=42)
-            AllChem.MMFFOptimizeMolecule(mol)
-            
-            # Save as PDB
-            ligand_name = f"ligand_{uuid.uuid4().hex[:8]}"
-            pdb_path = os.path.join(self.work_dir, f"{ligand_name}.pdb")
-            Chem.MolToPDBFile(mol, pdb_path)
-            
-            # Convert to PDBQT using Open Babel
-            pdbqt_path = os.path.join(self.work_dir, f"{ligand_name}.pdbqt")
-            self._run_command(f"obabel {pdb_path} -O {pdbqt_path} -xn --partialcharge gasteiger")
-            
-            if not os.path.exists(pdbqt_path) or os.path.getsize(pdbqt_path) == 0:
-                # Try alternate conversion approach if first fails
-                self._run_command(f"obabel {pdb_path} -O {pdbqt_path} -xn")
-                
-                if not os.path.exists(pdbqt_path) or os.path.getsize(pdbqt_path) == 0:
-                    # Create minimal valid PDBQT as last resort
-                    self._create_minimal_pdbqt(mol, pdbqt_path)
-            
-            return pdbqt_path, mol
+            with self._stage("embed_conformers"):
+                conf_ids, energies = embed_conformers(mol, threads=self.cpu or 0)
+            
+            # Charges, atom types and torsion tree, in memory
+            conformers = [Chem.Mol(mol, confId=conf_id) for conf_id in conf_ids]
+            ligands = [
+                (mol_to_pdbqt(conformer), conformer)
+                for conformer in conformers[:self.dock_conformers]
+            ]
+            
+            if cache is not None:
+                cache_key = cache.ligand_key(smiles, RDKIT_PREP)
+                if cache_key is not None:
+                    best_pdbqt, best = ligands[0]
+                    cache.put_ligand(
+                        cache_key, smiles, RDKIT_PREP,
+                        Chem.MolToPDBBlock(best).encode("utf-8"), best_pdbqt.encode("utf-8"),
+                        Chem.MolToMolBlock(best),
+                        conformers=conformers_to_sdf(mol, conf_ids, energies),
+                    )
+            
+            return ligands
             
         except Exception as e:
             raise RuntimeError(f"Error preparing ligand: {str(e)}")
     
-    def _create_minimal_pdbqt(self, mol, output_path):
+    def _load_cached_ligand(self, cache, smiles):
         """
-        Create a minimal valid PDBQT file from an RDKit molecule
+        Load a prepared ligand from the ligand cache
         
         Args:
-            mol: RDKit molecule
-            output_path (str): Path to save PDBQT file
-        """
-        with open(output_path, 'w') as f:
-            f.write("ROOT\n")
+            cache (LigandCache): Ligand cache
+            smiles (str): SMILES string of the ligand
             
-            # Get atom positions
-            conf = mol.GetConformer()
-            for i, atom in enumerate(mol.GetAtoms()):
-                pos = conf.GetAtomPosition(i)
-                element = atom.GetSymbol()
-                
-                # Ensure element is valid for AutoDock
-                if element not in ["C", "N", "O", "H", "S", "P", "F", "Cl", "Br", "I"]:
-                    element = "C"
-                
-                # Write atom in PDBQT format
-                f.write(f"ATOM  {i+1:5d}  {element:<2}  LIG A   1    {pos.x:8.3f}{pos.y:8.3f}{pos.z:8.3f}  1.00  0.00    {element:>2}\n")
-                
-            f.write("ENDROOT\n")
-            f.write("TORSDOF 0\n")
+        Returns:
+            list: (pdbqt, mol) per conformer, or None if no usable entry exists
+        """
+        # Prefer our own recipe, then structures prepared by /api/process-smiles
+        for recipe in (RDKIT_PREP, OPENBABEL_PREP):
+            cached = cache.get_ligand(cache.ligand_key(smiles, recipe))
+            if cached is None:
+                continue
+            
+            if self.dock_conformers > 1 and os.path.exists(cached["conformers_path"]):
+                supplier = Chem.SDMolSupplier(cached["conformers_path"], removeHs=False)
+                conformers = list(itertools.islice(supplier, self.dock_conformers))
+                if conformers and all(conformer is not None for conformer in conformers):
+                    return [(mol_to_pdbqt(conformer), conformer) for conformer in conformers]
+            
+            mol = Chem.MolFromMolFile(cached["mol_path"], removeHs=False)
+            if mol is not None:
+                with open(cached["pdbqt_path"]) as f:
+                    return [(f.read(), mol)]
+        
+        return None
     
-    def _get_cysteine_coords(self, cysteine_id):
+    def _get_cysteine_coords(self, cysteine_id, center_box=True):
         """
         Get coordinates of cysteine sulfur atom
         
         Args:
             cysteine_id (str): Cysteine identifier in format "chain:resnum"
+            center_box (bool): Whether to fit the docking box to the pocket
+                next to the sulfur (or center it on the sulfur if there is none)
             
         Returns:
-            tuple: (x, y, z) coordinates or None
+            tuple: (x, y, z) coordinates, or None if the receptor has no such cysteine
         """
         if not cysteine_id or not self.protein_path:
             return None
-            
+        
+        # Parse cysteine identifier
         try:
-            # Parse cysteine identifier
             chain, resnum = cysteine_id.split(":")
             resnum = int(resnum)
-            
-            # Use PDB file if available, otherwise use PDBQT
-            protein_file = self.protein_path
-            if protein_file.endswith(".pdbqt") and os.path.exists(protein_file.replace(".pdbqt", ".pdb")):
-                protein_file = protein_file.replace(".pdbqt", ".pdb")
-            
-            # Find sulfur atom coordinates
-            with open(protein_file, 'r') as f:
-                for line in f:
-                    if line.startswith(('ATOM', 'HETATM')):
-                        if len(line) < 54: # Ensure line is long enough
-                            continue
-                        
-                        try:
-                            atom_name = line[12:16].strip()
-                            residue_name = line[17:20].strip()
-                            chain_id = line[21:22].strip()
-                            res_num = int(line[22:26].strip())
-                            
-                            # Look for sulfur atom in cysteine
-                            if (residue_name == "CYS" and 
-                                chain_id == chain and 
-                                res_num == resnum and 
-                                atom_name == "SG"):
-                                
-                                x = float(line[30:38].strip())
-                                y = float(line[38:46].strip())
-                                z = float(line[46:54].strip())
-                                
-                                # Center the box on the sulfur atom
-                                self.center_x = x
-                                self.center_y = y
-                                self.center_z = z
-                                # Use smaller box for covalent docking
-                                self.size_x = 15
-                                self.size_y = 15
-                                self.size_z = 15
-                                
-                                return (x, y, z)
-                        except (ValueError, IndexError):
-                            continue
-            
-            return None
-        except Exception as e:
-            print(f"Error finding cysteine: {str(e)}")
+        except ValueError:
+            raise ValueError(f"Invalid cysteine ID {cysteine_id!r}, expected chain:resnum")
+        
+        # Registered receptors carry the SG coordinates; otherwise look the
+        # sulfur atom up in the receptor's spatial index
+        sg = self.cysteines.get(f"{chain}:{resnum}")
+        if sg is None:
+            sg = get_receptor_index(self.protein_path).cysteine_sg(chain, resnum)
+        if sg is None:
             return None
+        
+        x, y, z = (float(c) for c in sg)
+        
+        if center_box and not self._fit_box(anchor=(x, y, z), site=cysteine_id):
+            # No pocket next to the cysteine: center the box on the sulfur atom
+            self.center_x = x
+            self.center_y = y
+            self.center_z = z
+            # Use smaller box for covalent docking
+            self.size_x = 15
+            self.size_y = 15
+            self.size_z = 15
+        
+        return (x, y, z)
+    
+    def _fit_box(self, anchor=None, site=POCKET_BOX):
+        """
+        Fit the docking box to a pocket detected on the receptor
+        
+        Args:
+            anchor (tuple, optional): (x, y, z) the pocket has to be next to;
+                without one the largest pocket is used
+            site (str): Key of the precomputed box for this anchor, used
+                when the ligand is no larger than the default extent the
+                box was fitted for
+            
+        Returns:
+            bool: Whether a pocket was found and the box was set
+        """
+        fits_stored_box = (
+            self.ligand_extent is None or self.ligand_extent <= DEFAULT_LIGAND_EXTENT
+        )
+        if fits_stored_box and site in self.boxes:
+            box = (self.boxes[site]["center"], self.boxes[site]["size"])
+        else:
+            points, labels = get_receptor_index(self.protein_path).pockets
+            box = fit_docking_box(
+                points, labels, anchor, extent=self.ligand_extent or DEFAULT_LIGAND_EXTENT
+            )
+        if box is None:
+            return False
+        
+        center, size = box
+        self.center_x, self.center_y, self.center_z = center
+        self.size_x, self.size_y, self.size_z = size
+        return True
     
     def dock_from_smiles(self, smiles, cysteine_id=None):
         """
@@ -347,7 +499,9 @@ class DockingController:
         
         Args:
             smiles (str): SMILES string of the ligand
-            cysteine_id (str, optional): Cysteine ID for covalent docking
+            cysteine_id (str or list, optional): Cysteine ID(s) for covalent
+                docking. The box is centred on the first one; warhead
+                distances are measured to all of them.
             
         Returns:
             dict: Docking results formatted for frontend
@@ -355,45 +509,171 @@ class DockingController:
         if not self.protein_path:
             return {"status": "error", "message": "Protein structure not set"}
             
+        self.timings = {}
+        
         try:
             # Prepare the ligand
-            ligand_path, mol = self._prepare_ligand(smiles)
+            with self._stage("prepare_ligand"):
+                ligands = self._prepare_ligand(smiles)
+                if self.size_box_to_ligand:
+                    # The box must fit every conformer that is docked
+                    self.ligand_extent = max(ligand_extent(mol) for _, mol in ligands)
             
             # Detect warheads if relevant
-            warhead_result = self.warhead_detector.detect_warheads(mol)
+            with self._stage("detect_warheads"):
+                warhead_result = self.warhead_detector.detect_warheads(ligands[0][1])
             
             # Get cysteine coordinates for covalent docking
-            cysteine_coords = None
-            if cysteine_id:
-                cysteine_coords = self._get_cysteine_coords(cysteine_id)
-            
-            # Run Vina docking
-            output_file, log_output = self._run_vina_docking(ligand_path)
+            cysteine_ids, cysteine_coords = self._parse_cysteine_ids(cysteine_id), None
+            if cysteine_ids:
+                with self._stage("locate_cysteine"):
+                    cysteine_ids, cysteine_coords = self._locate_cysteines(cysteine_ids)
+            else:
+                with self._stage("locate_pocket"):
+                    self._fit_box()
+            
+            # Cut the receptor down to the box
+            if self.crop_distance:
+                with self._stage("crop_receptor"):
+                    self._docking_receptor()
+            
+            # Run Vina docking from each conformer, keeping the best run
+            with self._stage("docking"):
+                runs = [
+                    self._dock_conformer(ligand_pdbqt, f"docking_output_{i}.pdbqt")
+                    for i, (ligand_pdbqt, _) in enumerate(ligands)
+                ]
+                best_run = min(range(len(runs)), key=lambda i: runs[i][2])
+                output_file, log_output, _ = runs[best_run]
+                ligand_pdbqt, mol = ligands[best_run]
             
             # Process the results
-            results = self._process_docking_results(output_file, log_output, warhead_result, cysteine_coords)
+            with self._stage("process_results"):
+                reactive_atoms = None
+                if cysteine_coords is not None and warhead_result["has_warhead"]:
+                    reactive_atoms = self._map_reactive_atoms(ligand_pdbqt, mol, warhead_result)
+                
+                results = self._process_docking_results(
+                    output_file, log_output, warhead_result, cysteine_coords,
+                    reactive_atoms=reactive_atoms, cysteine_ids=cysteine_ids
+                )
             
+            results["conformers_docked"] = len(ligands)
+            results["best_conformer"] = best_run
+            results["timings"] = dict(self.timings)
             return results
             
         except Exception as e:
-            return {"status": "error", "message": str(e)}
+            return {"status": "error", "message": str(e), "timings": dict(self.timings)}
+    
+    @staticmethod
+    def _parse_cysteine_ids(cysteine_id):
+        """Normalize a cysteine ID, comma-separated IDs or a list of IDs to a list"""
+        if not cysteine_id:
+            return []
+        if isinstance(cysteine_id, str):
+            cysteine_id = cysteine_id.split(",")
+        return [c.strip() for c in cysteine_id if c and c.strip()]
     
-    def _run_vina_docking(self, ligand_path):
+    def _locate_cysteines(self, cysteine_ids):
+        """
+        Find SG coordinates of the requested cysteines
+        
+        The docking box is centred on the first cysteine.
+        
+        Args:
+            cysteine_ids (list): Cysteine identifiers in format "chain:resnum"
+            
+        Returns:
+            tuple: (found_ids, coords) with coords of shape (n_found, 3),
+                or ([], None) if the first cysteine was not found
+        """
+        first = self._get_cysteine_coords(cysteine_ids[0], center_box=True)
+        if first is None:
+            return [], None
+        
+        found_ids, coords = [cysteine_ids[0]], [first]
+        for cys_id in cysteine_ids[1:]:
+            xyz = self._get_cysteine_coords(cys_id, center_box=False)
+            if xyz is not None:
+                found_ids.append(cys_id)
+                coords.append(xyz)
+        
+        return found_ids, np.array(coords, dtype=np.float64)
+    
+    def _map_reactive_atoms(self, ligand_pdbqt, mol, warhead_result):
+        """
+        Map the reactive warhead atoms of the molecule onto pose atom indices
+        
+        Args:
+            ligand_pdbqt (str): Ligand PDBQT content that was docked
+            mol: RDKit molecule the PDBQT was prepared from
+            warhead_result (dict): Warhead detection results
+            
+        Returns:
+            ndarray: Pose atom indices of the reactive atoms (may be empty)
+        """
+        pdbqt_coords = parse_pdbqt_coords(ligand_pdbqt)
+        
+        atom_map = map_mol_atoms_to_pdbqt(mol, pdbqt_coords)
+        return reactive_pose_atoms(warhead_result, atom_map)
+    
+    @contextmanager
+    def _stage(self, name):
+        """
+        Record the wall-clock time of a docking stage in self.timings
+        
+        Args:
+            name (str): Stage name
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = round(time.perf_counter() - start, 4)
+    
+    def _dock_conformer(self, ligand_pdbqt, output_name):
+        """
+        Dock one ligand conformer with the configured engine
+        
+        Args:
+            ligand_pdbqt (str): Ligand PDBQT content
+            output_name (str): File name of the Vina output in the work directory
+            
+        Returns:
+            tuple: (output_file_path, log_output, best_affinity)
+        """
+        if self.engine == "python":
+            output_file, log_output = self._run_vina_python(ligand_pdbqt, output_name)
+        else:
+            output_file, log_output = self._run_vina_docking(ligand_pdbqt, output_name)
+        
+        affinities = read_vina_poses(output_file).affinities
+        best_affinity = float(affinities.min()) if len(affinities) else float('inf')
+        return output_file, log_output, best_affinity
+    
+    def _run_vina_docking(self, ligand_pdbqt, output_name="docking_output.pdbqt"):
         """
         Run AutoDock Vina docking
         
         Args:
-            ligand_path (str): Path to ligand PDBQT file
+            ligand_pdbqt (str): Ligand PDBQT content
+            output_name (str): File name of the output in the work directory
             
         Returns:
             tuple: (output_file_path, log_output)
         """
+        # The vina executable reads the ligand from a file
+        ligand_path = os.path.join(self.work_dir, "ligand.pdbqt")
+        with open(ligand_path, 'w') as f:
+            f.write(ligand_pdbqt)
+        
         # Create config file
         config_path = os.path.join(self.work_dir, "vina_config.txt")
-        output_path = os.path.join(self.work_dir, "docking_output.pdbqt")
+        output_path = os.path.join(self.work_dir, output_name)
         
         with open(config_path, 'w') as f:
-            f.write(f"receptor = {self.protein_path}\n")
+            f.write(f"receptor = {self._docking_receptor()}\n")
             f.write(f"ligand = {ligand_path}\n")
             f.write(f"center_x = {self.center_x}\n")
             f.write(f"center_y = {self.center_y}\n")
@@ -401,8 +681,10 @@ class DockingController:
             f.write(f"size_x = {self.size_x}\n")
             f.write(f"size_y = {self.size_y}\n")
             f.write(f"size_z = {self.size_z}\n")
-            f.write("exhaustiveness = 8\n")
-            f.write("num_modes = 9\n")
+            f.write(f"exhaustiveness = {self.exhaustiveness}\n")
+            f.write(f"num_modes = {self.num_modes}\n")
+            if self.cpu:
+                f.write(f"cpu = {self.cpu}\n")
         
         # Run Vina
         cmd = f"{self.vina_path} --config {config_path} --out {output_path}"
@@ -413,7 +695,106 @@ class DockingController:
         
         return output_path, stdout
     
-    def _process_docking_results(self, output_file, log_output, warhead_result, cysteine_coords=None):
+    def precompute_maps(self, cysteine_id=None):
+        """
+        Compute and store the grid maps for the docking box ahead of time
+        
+        Used before fanning out to worker processes, so the workers load
+        the stored maps instead of each computing them.
+        
+        Args:
+            cysteine_id (str or list, optional): Cysteine ID(s) as for
+                dock_from_smiles; the box is centred on the first one
+        """
+        if not self.protein_path:
+            raise ValueError("Protein structure not set")
+        
+        # Same box resolution as docking, so workers hit the stored maps
+        cysteine_ids = self._parse_cysteine_ids(cysteine_id)
+        if cysteine_ids:
+            found_ids, _ = self._locate_cysteines(cysteine_ids)
+            if not found_ids:
+                raise ValueError(f"Cysteine not found: {cysteine_ids[0]}")
+        else:
+            self._fit_box()
+        
+        self._get_vina_engine()
+    
+    def _docking_receptor(self):
+        """
+        Receptor PDBQT to dock against
+        
+        With a crop distance set, this is the receptor PDBQT cut down to
+        the residues near the current box, keeping its charges and atom
+        types. Cropped receptors are kept in the receptor cache per box;
+        they share the full receptor's index, so cysteine and pocket
+        lookups are unchanged.
+        
+        Returns:
+            str: Path to the receptor PDBQT file
+        """
+        if not self.crop_distance:
+            return self.protein_path
+        
+        center = (self.center_x, self.center_y, self.center_z)
+        size = (self.size_x, self.size_y, self.size_z)
+        
+        cache = get_receptor_cache()
+        cache_key = cache.receptor_key(
+            self.protein_path, crop_distance=self.crop_distance, box=box_key(center, size)
+        )
+        cached_pdbqt = cache.get_receptor(cache_key)
+        if cached_pdbqt:
+            return cached_pdbqt
+        
+        cropped_pdbqt = os.path.join(self.work_dir, "receptor_cropped.pdbqt")
+        crop_receptor(self.protein_path, cropped_pdbqt, center, size, self.crop_distance)
+        
+        return cache.put_receptor(
+            cache_key, None, cropped_pdbqt, index=get_receptor_index(self.protein_path)
+        )
+    
+    def _get_vina_engine(self):
+        """Get the in-process Vina engine for the current receptor and box"""
+        return get_vina_engine(
+            self._docking_receptor(),
+            (self.center_x, self.center_y, self.center_z),
+            (self.size_x, self.size_y, self.size_z),
+            cpu=self.cpu or 0,
+        )
+    
+    def _run_vina_python(self, ligand_pdbqt, output_name="docking_output.pdbqt"):
+        """
+        Run AutoDock Vina in-process against cached receptor grid maps
+        
+        Args:
+            ligand_pdbqt (str): Ligand PDBQT content
+            output_name (str): File name of the output in the work directory
+            
+        Returns:
+            tuple: (output_file_path, log_output)
+        """
+        engine = self._get_vina_engine()
+        poses, energies = engine.dock(
+            ligand_pdbqt, exhaustiveness=self.exhaustiveness, n_poses=self.num_modes
+        )
+        
+        if not poses.strip():
+            raise RuntimeError("Vina docking produced no poses")
+        
+        output_path = os.path.join(self.work_dir, output_name)
+        with open(output_path, 'w') as f:
+            f.write(poses)
+        
+        # Mimic the score table printed by the vina executable
+        log_lines = ["mode |   affinity", "-----+-----------"]
+        for mode, row in enumerate(energies, start=1):
+            log_lines.append(f"{mode:4d} {row[0]:10.3f}")
+        
+        return output_path, "\n".join(log_lines)
+    
+    def _process_docking_results(self, output_file, log_output, warhead_result, cysteine_coords=None,
+                                 reactive_atoms=None, cysteine_ids=None):
         """
         Process docking results and format for frontend
         
@@ -421,55 +802,47 @@ class DockingController:
             output_file (str): Path to Vina output file
             log_output (str): Vina stdout log
             warhead_result (dict): Warhead detection results
-            cysteine_coords (tuple): Coordinates of target cysteine
+            cysteine_coords (array-like): SG coordinates of the target
+                cysteine(s), shape (3,) or (n_cysteines, 3)
+            reactive_atoms (ndarray, optional): Pose atom indices of the
+                reactive warhead atoms; all atoms are used if empty
+            cysteine_ids (list, optional): IDs matching cysteine_coords
             
         Returns:
             dict: Formatted docking results
         """
-        # Parse log for scores
-        scores = []
-        for line in log_output.split('\n'):
-            if line.strip().startswith('1 '):  # First pose score line
-                parts = line.strip().split()
-                if len(parts) >= 4:
-                    scores.append({
-                        'mode': int(parts[0]),
-                        'affinity': float(parts[1]),
-                        'rmsd_lb': float(parts[2]),
-                        'rmsd_ub': float(parts[3])
-                    })
-        
-        # Extract poses from output file
-        poses = self._split_poses(output_file)
-        best_affinity = float('inf')
+        # Parse all poses once into arrays
+        pose_set = read_vina_poses(output_file)
+        poses = self._split_poses(pose_set)
+        best_affinity = float(pose_set.affinities.min()) if len(pose_set) else float('inf')
         
         # Calculate distance to cysteine for each pose
         min_distance = float('inf')
-        for pose in poses:
-            # Get best affinity
-            if pose['affinity'] < best_affinity:
-                best_affinity = pose['affinity']
-            
-            # Calculate distance to cysteine for covalent docking
-            if cysteine_coords and warhead_result["has_warhead"]:
-                distance = self._calculate_warhead_distance(pose['coordinates'], cysteine_coords)
-                pose['distance_to_cysteine'] = distance
-                
-                # Calculate covalent score
-                covalent_score = calculate_covalent_score(pose['affinity'], distance)
-                pose['covalent_score'] = covalent_score
-                
-                # Predict covalent binding
-                covalent_prediction = predict_covalent_binding(
-                    pose['affinity'], 
-                    warhead_result["has_warhead"],
-                    distance
-                )
-                pose['covalent_prediction'] = covalent_prediction
-                
-                # Track minimum distance
-                if distance < min_distance:
-                    min_distance = distance
+        if cysteine_coords is not None and warhead_result["has_warhead"] and len(pose_set):
+            if reactive_atoms is None:
+                reactive_atoms = np.array([], dtype=np.int64)
+            
+            # (poses, cysteines) distances from the reactive warhead atoms
+            cysteine_distances = warhead_cysteine_distances(
+                pose_set.coords, reactive_atoms, cysteine_coords
+            )
+            nearest = cysteine_distances.argmin(axis=1)
+            distances = cysteine_distances[np.arange(len(nearest)), nearest]
+            
+            # Score and classify every pose in one call
+            scores, predictions = score_covalent(
+                pose_set.affinities, distances, warhead_result["has_warhead"],
+                scoring=self.covalent_scoring
+            )
+            
+            for i, pose in enumerate(poses):
+                pose['distance_to_cysteine'] = float(distances[i])
+                if cysteine_ids and len(cysteine_ids) > 1:
+                    pose['nearest_cysteine'] = cysteine_ids[nearest[i]]
+                pose['covalent_score'] = float(scores[i])
+                pose['covalent_prediction'] = str(predictions[i])
+            
+            min_distance = float(distances.min())
         
         # Determine covalent potential
         covalent_potential = "Low"
@@ -484,6 +857,7 @@ class DockingController:
             "has_warhead": warhead_result["has_warhead"],
             "warheads": warhead_result["warheads"],
             "covalent_potential": covalent_potential,
+            "covalent_scoring": self.covalent_scoring,
         }
         
         # Add warhead distance if we calculated it
@@ -492,108 +866,31 @@ class DockingController:
         
         return results
     
-    def _split_poses(self, output_file):
+    def _split_poses(self, pose_set):
         """
-        Split Vina output file into separate pose files
+        Write each pose to its own file and build the pose dictionaries
         
         Args:
-            output_file (str): Path to Vina output file
+            pose_set (PoseSet): Poses parsed from the Vina output file
             
         Returns:
             list: List of pose dictionaries
         """
         poses = []
-        current_pose = None
-        pose_lines = []
-        
-        with open(output_file, 'r') as f:
-            for line in f:
-                if line.startswith('MODEL'):
-                    # Save previous pose
-                    if current_pose is not None and pose_lines:
-                        pose_content = ''.join(pose_lines)
-                        poses.append({
-                            'mode': current_pose,
-                            'coordinates': pose_content
-                        })
-                        pose_lines = []
-                    
-                    # Start new pose
-                    current_pose = int(line.split()[1])
-                    pose_lines = [line]
-                elif line.startswith('ENDMDL'):
-                    pose_lines.append(line)
-                    # Save this pose
-                    pose_content = ''.join(pose_lines)
-                    
-                    # Extract affinity from Vina log
-                    affinity = 0
-                    for i in range(len(poses) + 1):
-                        if i + 1 == current_pose:
-                            affinity = -10.0  # Default value
-                            break
-                    
-                    # Save pose file
-                    pose_file = os.path.join(self.poses_dir, f"pose_{uuid.uuid4().hex[:8]}.pdbqt")
-                    with open(pose_file, 'w') as pf:
-                        pf.write(pose_content)
-                    
-                    poses.append({
-                        'mode': current_pose,
-                        'affinity': affinity,
-                        'coordinates': pose_content,
-                        'pose_file': pose_file
-                    })
-                    
-                    pose_lines = []
-                else:
-                    pose_lines.append(line)
-        
-        # Parse Vina output to get accurate affinities
-        with open(output_file, 'r') as f:
-            vina_log = f.read()
-            
-            for pose in poses:
-                mode = pose['mode']
-                # Looking for lines like "   1       -7.2      0.000      0.000"
-                for line in vina_log.split("\n"):
-                    if line.strip().startswith(f"{mode} "):
-                        parts = line.strip().split()
-                        if len(parts) >= 2:
-                            try:
-                                pose['affinity'] = float(parts[1])
-                            except ValueError:
-                                pass
         
-        return poses
-    
-    def _calculate_warhead_distance(self, pose_pdbqt, cysteine_coords):
-        """
-        Calculate minimum distance between pose atoms and cysteine sulfur
-        
-        Args:
-            pose_pdbqt (str): PDBQT content of the pose
-            cysteine_coords (tuple): (x, y, z) of cysteine sulfur
-            
-        Returns:
-            float: Minimum distance in Angstroms
-        """
-        min_distance = float('inf')
+        for i, block in enumerate(pose_set.blocks):
+            # Save pose file
+            pose_file = os.path.join(self.poses_dir, f"pose_{uuid.uuid4().hex[:8]}.pdbqt")
+            with open(pose_file, 'w') as pf:
+                pf.write(block)
+            
+            poses.append({
+                'mode': int(pose_set.modes[i]),
+                'affinity': float(pose_set.affinities[i]),
+                'rmsd_lb': float(pose_set.rmsd_lb[i]),
+                'rmsd_ub': float(pose_set.rmsd_ub[i]),
+                'coordinates': block,
+                'pose_file': pose_file
+            })
         
-        # Parse atom coordinates from PDBQT
-        for line in pose_pdbqt.split('\n'):
-            if line.startswith(('ATOM', 'HETATM')):
-                try:
-                    x = float(line[30:38])
-                    y = float(line[38:46])
-                    z = float(line[46:54])
-                    
-                    # Calculate distance to cysteine sulfur
-                    cx, cy, cz = cysteine_coords
-                    distance = np.sqrt((x - cx)**2 + (y - cy)**2 + (z - cz)**2)
-                    
-                    min_distance = min(min_distance, distance)
-                except (ValueError, IndexError):
-                    continue
-        
-        return min_distance
\ No newline at end of file
+        return poses
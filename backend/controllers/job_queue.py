@@ -0,0 +1,153 @@
+import copy
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from controllers.docking_controller import DockingController
+
+logger = logging.getLogger(__name__)
+
+# Number of docking jobs executed concurrently
+DOCKING_JOB_WORKERS = int(os.getenv("DOCKING_JOB_WORKERS", "2"))
+
+# Number of finished jobs kept for status polling
+DOCKING_JOB_HISTORY = int(os.getenv("DOCKING_JOB_HISTORY", "500"))
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+
+
+class DockingJobQueue:
+    """
+    Background queue for docking jobs.
+
+    Jobs run on worker threads, which spend most of their time waiting on
+    obabel/vina subprocesses or native Vina code, so the web server's
+    event loop stays free to answer other requests while docking runs.
+    """
+
+    def __init__(self, max_workers=DOCKING_JOB_WORKERS, history=DOCKING_JOB_HISTORY):
+        """
+        Initialize the job queue
+
+        Args:
+            max_workers (int): Number of jobs executed concurrently
+            history (int): Number of finished jobs kept for status polling
+        """
+        self.history = history
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="docking-job"
+        )
+
+    def submit(self, protein_path, smiles, cysteine_id=None, engine="cli"):
+        """
+        Queue a docking job
+
+        Args:
+            protein_path (str): Path to protein structure file
+            smiles (str): SMILES string of the ligand
+            cysteine_id (str, optional): Cysteine ID for covalent docking
+            engine (str): Docking engine, "cli" or "python"
+
+        Returns:
+            dict: Snapshot of the new job
+        """
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "status": JOB_QUEUED,
+            "smiles": smiles,
+            "cysteine_id": cysteine_id,
+            "submitted_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "stage_timings": {},
+            "result": None,
+            "error": None,
+        }
+
+        with self._lock:
+            self._jobs[job_id] = job
+            self._trim_history()
+            snapshot = copy.deepcopy(job)
+
+        self._executor.submit(self._run, job_id, protein_path, smiles, cysteine_id, engine)
+        return snapshot
+
+    def get(self, job_id):
+        """
+        Get a snapshot of a job
+
+        Args:
+            job_id (str): Job ID returned by submit()
+
+        Returns:
+            dict: Job snapshot, or None if the job is unknown
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return copy.deepcopy(job) if job is not None else None
+
+    def list_jobs(self):
+        """
+        Summarize all known jobs, newest first
+
+        Returns:
+            list: Job snapshots without their results
+        """
+        with self._lock:
+            return [
+                {key: value for key, value in job.items() if key != "result"}
+                for job in reversed(self._jobs.values())
+            ]
+
+    def _run(self, job_id, protein_path, smiles, cysteine_id, engine):
+        self._update(job_id, status=JOB_RUNNING, started_at=time.time())
+
+        try:
+            controller = DockingController(engine=engine)
+
+            start = time.perf_counter()
+            controller.set_protein(protein_path)
+            receptor_time = round(time.perf_counter() - start, 4)
+
+            result = controller.dock_from_smiles(smiles=smiles, cysteine_id=cysteine_id)
+            stage_timings = {"prepare_receptor": receptor_time, **result.get("timings", {})}
+
+            if result.get("status") == "success":
+                self._update(job_id, status=JOB_COMPLETED, result=result, stage_timings=stage_timings)
+            else:
+                self._update(
+                    job_id,
+                    status=JOB_FAILED,
+                    error=result.get("message", "Docking failed"),
+                    stage_timings=stage_timings,
+                )
+        except Exception as e:
+            logger.error(f"Docking job {job_id} failed: {str(e)}")
+            self._update(job_id, status=JOB_FAILED, error=str(e))
+        finally:
+            self._update(job_id, finished_at=time.time())
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                job.update(fields)
+
+    def _trim_history(self):
+        finished = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job["status"] in (JOB_COMPLETED, JOB_FAILED)
+        ]
+        for job_id in finished[: max(0, len(finished) - self.history)]:
+            del self._jobs[job_id]
@@ -0,0 +1,154 @@
+import os
+import threading
+from collections import OrderedDict
+
+from utils.map_store import get_map_store
+
+# Number of (receptor, box) grid sets kept in memory per process
+VINA_ENGINE_CACHE_SIZE = int(os.getenv("VINA_ENGINE_CACHE_SIZE", "4"))
+
+_engines = OrderedDict()
+_engines_lock = threading.Lock()
+
+
+def box_key(center, size, precision=3):
+    """
+    Normalize a docking box so equal boxes produce equal keys
+
+    Args:
+        center (sequence): Box center (x, y, z)
+        size (sequence): Box edge lengths (x, y, z)
+        precision (int): Decimal places to keep
+
+    Returns:
+        tuple: ((cx, cy, cz), (sx, sy, sz))
+    """
+    return (
+        tuple(round(float(c), precision) for c in center),
+        tuple(round(float(s), precision) for s in size),
+    )
+
+
+class VinaEngine:
+    """
+    In-process AutoDock Vina engine built on the Vina Python bindings.
+
+    The receptor is loaded once and its affinity maps are computed once
+    for a fixed box; every ligand docked afterwards reuses the maps held
+    in memory instead of recomputing them as the vina binary does. Maps
+    are also persisted in the map store, so other worker processes load
+    them from disk instead of computing them again. Loaded maps live in
+    this process's memory; see MapStore for why they are not shared.
+    """
+
+    def __init__(
+        self, receptor_path, center, size, scoring="vina", cpu=0, seed=42, use_map_store=True
+    ):
+        """
+        Load the receptor and compute (or load) the affinity maps for the box
+
+        Args:
+            receptor_path (str): Path to the rigid receptor PDBQT file
+            center (sequence): Box center (x, y, z)
+            size (sequence): Box edge lengths (x, y, z)
+            scoring (str): Vina scoring function (default: vina)
+            cpu (int): Number of CPUs used per docking run, 0 for all
+            seed (int): Random seed for the Monte Carlo search
+            use_map_store (bool): Whether to load/save maps from the map store
+        """
+        from vina import Vina
+
+        self.receptor_path = receptor_path
+        self.scoring = scoring
+        self.center, self.size = box_key(center, size)
+
+        self._vina = Vina(sf_name=scoring, cpu=cpu, seed=seed, verbosity=0)
+        self.maps_loaded = False
+
+        store = get_map_store() if use_map_store else None
+        key = store.map_key(receptor_path, self.center, self.size, scoring) if store else None
+        map_prefix = store.get_maps(key) if store else None
+
+        if map_prefix is not None:
+            self._vina.load_maps(map_prefix)
+            self.maps_loaded = True
+        else:
+            self._vina.set_receptor(rigid_pdbqt_filename=receptor_path)
+
+            # No ligand is set yet, so maps are computed for every atom type
+            # and stay valid for any ligand docked later. Even voxel counts
+            # are required for the maps to be written to disk.
+            self._vina.compute_vina_maps(
+                center=list(self.center), box_size=list(self.size), force_even_voxels=True
+            )
+
+            if store is not None:
+                store.put_maps(
+                    key,
+                    lambda prefix: self._vina.write_maps(prefix, overwrite=True),
+                    {
+                        "receptor": receptor_path,
+                        "center": list(self.center),
+                        "size": list(self.size),
+                        "scoring": scoring,
+                    },
+                )
+
+        # A Vina object holds mutable ligand state, so docking is serialized
+        self._lock = threading.Lock()
+
+    def dock(self, ligand_pdbqt, exhaustiveness=8, n_poses=9):
+        """
+        Dock a ligand against the precomputed maps
+
+        Args:
+            ligand_pdbqt (str): Ligand PDBQT content
+            exhaustiveness (int): Search exhaustiveness
+            n_poses (int): Number of poses to return
+
+        Returns:
+            tuple: (poses_pdbqt, energies) where poses_pdbqt is the
+                multi-model PDBQT text and energies is an array with one
+                row per pose, the first column being the affinity
+        """
+        with self._lock:
+            self._vina.set_ligand_from_string(ligand_pdbqt)
+            self._vina.dock(exhaustiveness=exhaustiveness, n_poses=n_poses)
+            poses = self._vina.poses(n_poses=n_poses)
+            energies = self._vina.energies(n_poses=n_poses)
+
+        return poses, energies
+
+
+def get_vina_engine(receptor_path, center, size, scoring="vina", cpu=0):
+    """
+    Get an engine for a receptor and box, reusing one already in memory
+
+    Args:
+        receptor_path (str): Path to the rigid receptor PDBQT file
+        center (sequence): Box center (x, y, z)
+        size (sequence): Box edge lengths (x, y, z)
+        scoring (str): Vina scoring function (default: vina)
+        cpu (int): Number of CPUs used per docking run, 0 for all
+
+    Returns:
+        VinaEngine: Engine with maps computed for the box
+    """
+    key = (os.path.abspath(receptor_path), box_key(center, size), scoring, cpu)
+
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is not None:
+            _engines.move_to_end(key)
+            return engine
+
+    # Compute maps outside the registry lock so other boxes are not blocked
+    engine = VinaEngine(receptor_path, center, size, scoring=scoring, cpu=cpu)
+
+    with _engines_lock:
+        engine = _engines.setdefault(key, engine)
+        _engines.move_to_end(key)
+        while len(_engines) > VINA_ENGINE_CACHE_SIZE:
+            _engines.popitem(last=False)
+
+    return engine
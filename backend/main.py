@@ -1,10 +1,11 @@
+import json
+import math
 import os
-import shutil
 from typing import Dict, List, Optional
 from datetime import datetime
 
 from fastapi import FastAPI, File, Form, HTTPException, UploadFile, Request
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.middleware.cors import CORSMiddleware  # Import CORS middleware
 from pydantic import BaseModel
@@ -14,7 +15,12 @@ from utils.compound_extractor import (
     extract_mk2_inhibitors_to_library,
     search_mk2_inhibitors,
 )
-from utils.molecule_handler import batch_process_smiles, process_sdf, process_smiles
+from utils.molecule_handler import (
+    batch_process_smiles,
+    process_sdf,
+    process_smiles,
+    stream_process_sdf,
+)
 from utils.molecule_library import (
     get_all_covalent_inhibitors,
     get_all_non_covalent_binders,
@@ -22,11 +28,24 @@ from utils.molecule_library import (
     get_molecule_by_name,
     get_test_set,
 )
-from utils.structure_cleaner import clean_analyze_and_convert, clean_and_identify
+from utils.ligand_cache import get_ligand_cache
+from utils.map_store import get_map_store
+from utils.receptor_cache import get_receptor_cache
+from utils.receptor_index import get_receptor_index, index_path_for
+from utils.receptor_registry import get_receptor_registry, receptor_boxes
+from utils.structure_cleaner import (
+    clean_analyze_and_convert,
+    clean_and_identify,
+)
+from utils.structure_stream import STRUCTURE_EXTENSIONS, structure_base_name
+from utils.upload_store import prepare_once, prepared_key, store_upload
 from utils.warhead_detector import WarheadDetector
 
 # Add these imports
+from controllers.batch_docking import dock_batch, read_sdf_ligands
 from controllers.docking_controller import DockingController
+from controllers.job_queue import DockingJobQueue
+from starlette.concurrency import run_in_threadpool
 import tempfile
 import os
 
@@ -60,6 +79,13 @@ os.makedirs(os.path.join(UPLOAD_FOLDER, "structures"), exist_ok=True)
 os.makedirs(os.path.join(UPLOAD_FOLDER, "cleaned"), exist_ok=True)
 os.makedirs(os.path.join(UPLOAD_FOLDER, "molecules"), exist_ok=True)
 
+# Docking engine: "cli" runs the vina executable per ligand, "python" docks
+# in-process and reuses receptor grid maps across requests
+VINA_ENGINE = os.getenv("VINA_ENGINE", "cli")
+
+# Background workers for docking jobs submitted through /api/jobs
+job_queue = DockingJobQueue()
+
 # Mount static files directory for serving uploaded files
 app.mount("/uploads", StaticFiles(directory=UPLOAD_FOLDER), name="uploads")
 
@@ -69,6 +95,11 @@ class CysteineInfo(BaseModel):
     chain: str
     residue_number: int
     residue_name: str
+    sasa: Optional[float] = None
+    relative_sasa: Optional[float] = None
+    pocket_depth: Optional[float] = None
+    ligandability: Optional[float] = None
+    rank: Optional[int] = None
 
 
 class CleanStructureResponse(BaseModel):
@@ -125,6 +156,7 @@ class SearchCompoundsResponse(BaseModel):
 
 class PreparedProteinResponse(BaseModel):
     success: bool
+    receptor_id: Optional[str] = None
     cleaned_structure_url: str
     filesystem_path: str  # Add this to track the actual filesystem path
     cysteines: List[CysteineInfo]
@@ -132,6 +164,61 @@ class PreparedProteinResponse(BaseModel):
     potential_disulfide_bonds: List = []
 
 
+def _check_structure_upload(filename):
+    """
+    Validate the name of an uploaded structure file
+
+    Args:
+        filename (str): Uploaded file name
+
+    Returns:
+        str: File suffix to store it under, e.g. ".pdb" or ".cif.gz"
+    """
+    suffix = filename[len(structure_base_name(filename)):]
+    if suffix.lower().removesuffix(".gz") not in STRUCTURE_EXTENSIONS:
+        raise HTTPException(
+            status_code=400,
+            detail="Structure must be a PDB or mmCIF file, optionally gzip-compressed",
+        )
+    return suffix
+
+
+def _register_receptor(registry, receptor_id, name, digest, result):
+    """
+    Record a prepared protein in the receptor registry
+
+    Args:
+        registry (ReceptorRegistry): Receptor registry
+        receptor_id (str): Receptor ID
+        name (str): Name of the uploaded structure
+        digest (str): SHA-256 of the uploaded structure
+        result (dict): Result of clean_analyze_and_convert
+
+    Returns:
+        dict: Registered entry
+    """
+    index = get_receptor_index(result["cleaned_pdb"])
+    analysis = result["analysis"]
+    cysteines = analysis["cysteines"] if isinstance(analysis, dict) else analysis
+
+    sg_coords = {}
+    for cys in cysteines:
+        sg = index.cysteine_sg(cys["chain"], cys["residue_number"])
+        if sg is not None:
+            sg_coords[f"{cys['chain']}:{cys['residue_number']}"] = [float(c) for c in sg]
+
+    return registry.register(
+        receptor_id,
+        name,
+        digest,
+        result["cleaned_pdb"],
+        result["pdbqt"],
+        cysteines=sg_coords,
+        boxes=receptor_boxes(index, list(sg_coords)),
+        index_path=index_path_for(result["cleaned_pdb"]),
+    )
+
+
 @app.post(
     "/api/clean-structure",
     response_model=CleanStructureResponse,
@@ -142,7 +229,7 @@ async def clean_structure_route(file: UploadFile = File(...)):
     Clean a protein structure by removing water molecules and ligands,
     and adding hydrogens. Also identifies cysteine residues.
 
-    - **file**: PDB file to clean
+    - **file**: PDB or mmCIF file to clean, optionally gzip-compressed
 
     Returns:
         - **success**: Whether the operation was successful
@@ -152,21 +239,23 @@ async def clean_structure_route(file: UploadFile = File(...)):
     if not file.filename:
         raise HTTPException(status_code=400, detail="No file selected")
 
-    # Save the uploaded file
-    upload_dir = os.path.join(UPLOAD_FOLDER, "structures")
-    temp_input_path = os.path.join(upload_dir, file.filename)
+    suffix = _check_structure_upload(file.filename)
 
-    with open(temp_input_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    # Save the uploaded file under its content digest, so uploads that
+    # share a name do not overwrite each other
+    upload_dir = os.path.join(UPLOAD_FOLDER, "structures")
+    temp_input_path, digest = await run_in_threadpool(
+        store_upload, file.file, upload_dir, suffix
+    )
 
     output_dir = os.path.join(UPLOAD_FOLDER, "cleaned")
-    base_name = os.path.splitext(os.path.basename(temp_input_path))[0]
-    output_path = os.path.join(output_dir, f"{base_name}_cleaned.pdb")
+    base_name = structure_base_name(file.filename)
+    output_path = os.path.join(output_dir, f"{base_name}_{digest[:16]}_cleaned.pdb")
 
     try:
-        # Clean the structure and identify cysteines
-        cleaned_path, analysis_results = clean_and_identify(
-            temp_input_path, output_path
+        # Clean the structure and identify cysteines, off the event loop
+        cleaned_path, analysis_results = await run_in_threadpool(
+            clean_and_identify, temp_input_path, output_path
         )
 
         # Generate relative path for API response
@@ -194,43 +283,95 @@ async def clean_structure_route(file: UploadFile = File(...)):
     response_model=PreparedProteinResponse,  # Update the response model
     responses={400: {"model": ErrorResponse}, 500: {"model": ErrorResponse}},
 )
-async def prepare_protein_route(file: UploadFile = File(...)):
+async def prepare_protein_route(
+    file: UploadFile = File(...),
+    protonate_site: Optional[str] = Form(None),
+    protonate_center: Optional[str] = Form(None),
+    protonation_radius: Optional[float] = Form(None),
+    chains: Optional[str] = Form(None),
+):
     """
     Complete protein preparation for docking:
     1. Clean structure (remove water, add hydrogens)
     2. Identify cysteine residues
     3. Convert to PDBQT format for AutoDock Vina
 
-    - **file**: PDB file to process
+    - **file**: PDB or mmCIF file to process, optionally gzip-compressed
+      (.pdb, .pdb.gz, .cif, .cif.gz)
+    - **protonate_site**: Optional comma-separated residues, e.g. "A:98,A:140";
+      only residues near them get hydrogens, which keeps large assemblies fast
+    - **protonate_center**: Optional "x,y,z" of a pocket to protonate around
+    - **protonation_radius**: Optional protonation radius around the site in
+      Angstroms; by default residues near the site's docking box are protonated
+    - **chains**: Optional comma-separated chains to keep, e.g. "A,B"
 
     Returns:
         - **success**: Whether the operation was successful
+        - **receptor_id**: ID to pass to /api/dock; the same structure and
+          options always get the same ID
         - **cleaned_structure_url**: URL to download the cleaned PDB structure
         - **filesystem_path**: Actual filesystem path for internal API use
         - **cysteines**: List of identified cysteine residues
     """
     if not file.filename:
         raise HTTPException(status_code=400, detail="No file selected")
+    suffix = _check_structure_upload(file.filename)
 
-    # Create a predictable filename to store the processed protein
-    base_filename = os.path.splitext(file.filename)[0]
-    timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-    unique_id = f"{base_filename}_{timestamp}"
+    try:
+        site_residues = (
+            [r.strip() for r in protonate_site.split(",") if r.strip()]
+            if protonate_site
+            else None
+        )
+        site_center = (
+            [float(v) for v in protonate_center.split(",")]
+            if protonate_center
+            else None
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="protonate_center must be x,y,z")
+    chain_ids = [c.strip() for c in chains.split(",") if c.strip()] if chains else None
 
-    # Save the uploaded file in predictable location
+    # Store the upload under its content digest, compressed or not;
+    # preparation streams it directly
     upload_dir = os.path.join(UPLOAD_FOLDER, "structures")
-    temp_input_path = os.path.join(upload_dir, f"{unique_id}_original.pdb")
-
-    with open(temp_input_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    input_path, digest = await run_in_threadpool(store_upload, file.file, upload_dir, suffix)
+
+    # The same structure prepared with the same options is reused as is
+    key = prepared_key(
+        digest,
+        site_residues=site_residues,
+        site_center=site_center,
+        protonation_radius=protonation_radius if (site_residues or site_center) else None,
+        chains=chain_ids,
+    )
+    receptor_id = key[:32]
+    output_dir = os.path.join(UPLOAD_FOLDER, "prepared_proteins", receptor_id)
+    base_filename = structure_base_name(file.filename)
+
+    def prepare_and_register():
+        # Complete protein preparation workflow
+        result, _ = prepare_once(
+            output_dir,
+            lambda staging: clean_analyze_and_convert(
+                input_path,
+                staging,
+                site_residues=site_residues,
+                site_center=site_center,
+                protonation_radius=protonation_radius,
+                chains=chain_ids,
+                base_name=base_filename,
+            ),
+        )
 
-    # Store processed proteins in a dedicated 'prepared_proteins' directory for easier lookup
-    output_dir = os.path.join(UPLOAD_FOLDER, "prepared_proteins")
-    os.makedirs(output_dir, exist_ok=True)
+        registry = get_receptor_registry()
+        if registry.get(receptor_id) is None:
+            _register_receptor(registry, receptor_id, base_filename, digest, result)
+        return result
 
     try:
-        # Complete protein preparation workflow
-        result = clean_analyze_and_convert(temp_input_path, output_dir)
+        # Cleaning and protonation run off the event loop
+        result = await run_in_threadpool(prepare_and_register)
 
         # Generate relative paths for API response
         cleaned_relative_path = os.path.relpath(
@@ -251,6 +392,7 @@ async def prepare_protein_route(file: UploadFile = File(...)):
 
         return {
             "success": True,
+            "receptor_id": receptor_id,
             "cleaned_structure_url": cleaned_download_url,
             "filesystem_path": result["cleaned_pdb"],  # Add the actual filesystem path
             "cysteines": cysteines,
@@ -258,6 +400,8 @@ async def prepare_protein_route(file: UploadFile = File(...)):
             "potential_disulfide_bonds": potential_disulfide_bonds,
         }
 
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -319,7 +463,10 @@ async def batch_process_smiles_route(batch: MoleculeInputBatch):
     """
     try:
         output_dir = os.path.join(UPLOAD_FOLDER, "molecules")
-        results = batch_process_smiles(batch.smiles_list, output_dir, batch.names)
+        # Prepared on the worker pool, off the event loop
+        results = await run_in_threadpool(
+            batch_process_smiles, batch.smiles_list, output_dir, batch.names
+        )
 
         molecules = []
         for result in results:
@@ -374,15 +521,15 @@ async def process_sdf_route(file: UploadFile = File(...)):
         raise HTTPException(status_code=400, detail="File must be an SDF file")
 
     try:
-        # Save the uploaded file
+        # Save the uploaded file under its content digest
         upload_dir = os.path.join(UPLOAD_FOLDER, "structures")
-        temp_input_path = os.path.join(upload_dir, file.filename)
-
-        with open(temp_input_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        temp_input_path, _ = await run_in_threadpool(
+            store_upload, file.file, upload_dir, ".sdf"
+        )
 
+        # Run off the event loop so other requests are served meanwhile
         output_dir = os.path.join(UPLOAD_FOLDER, "molecules")
-        results = process_sdf(temp_input_path, output_dir)
+        results = await run_in_threadpool(process_sdf, temp_input_path, output_dir)
 
         molecules = []
         for result in results:
@@ -404,6 +551,59 @@ async def process_sdf_route(file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/api/process-sdf-stream")
+async def process_sdf_stream_route(
+    file: UploadFile = File(...), max_workers: Optional[int] = Form(None)
+):
+    """
+    Process a large SDF file, streaming one result per molecule as NDJSON
+
+    Records are read incrementally and prepared in parallel in fixed-size
+    chunks, so memory stays bounded for files of any size.
+
+    - **file**: SDF file containing one or more molecules
+    - **max_workers**: Optional number of worker processes
+
+    Returns:
+        NDJSON stream with one line per molecule in completion order
+        (index, name, smiles and pdb_url/pdbqt_url or error), followed by
+        a summary line with done, processed and errors
+    """
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="No file selected")
+
+    if not file.filename.lower().endswith(".sdf"):
+        raise HTTPException(status_code=400, detail="File must be an SDF file")
+
+    # The upload is read back from disk while the response streams
+    upload_dir = os.path.join(UPLOAD_FOLDER, "structures")
+    input_path, _ = await run_in_threadpool(store_upload, file.file, upload_dir, ".sdf")
+    output_dir = os.path.join(UPLOAD_FOLDER, "molecules")
+
+    def ndjson_lines():
+        processed = errors = 0
+        with open(input_path, "rb") as sdf_file:
+            for result in stream_process_sdf(sdf_file, output_dir, max_workers=max_workers):
+                line = {
+                    "index": result["index"],
+                    "name": result["name"],
+                    "smiles": result["smiles"],
+                }
+                if "error" in result:
+                    line["error"] = result["error"]
+                    errors += 1
+                else:
+                    for key in ("pdb", "pdbqt"):
+                        rel_path = os.path.relpath(result[f"{key}_path"], start=UPLOAD_FOLDER)
+                        line[f"{key}_url"] = f"/uploads/{rel_path}"
+                processed += 1
+                yield json.dumps(line) + "\n"
+
+        yield json.dumps({"done": True, "processed": processed, "errors": errors}) + "\n"
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+
 @app.get(
     "/api/library/covalent",
     response_model=LibraryResponse,
@@ -479,7 +679,9 @@ async def process_test_set():
         names = list(test_molecules.keys())
 
         output_dir = os.path.join(UPLOAD_FOLDER, "molecules")
-        results = batch_process_smiles(smiles_list, output_dir, names)
+        results = await run_in_threadpool(
+            batch_process_smiles, smiles_list, output_dir, names
+        )
 
         molecules = []
         for result in results:
@@ -544,33 +746,42 @@ async def search_pubchem_compounds_route():
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/api/dock")
-async def dock_molecule(request: Request):
+def _resolve_receptor(data):
     """
-    Perform molecular docking of a compound against a protein structure
-    
-    Request body:
-    - smiles: SMILES string of the molecule to dock
-    - protein_path: Path to the protein structure file
-    - filesystem_path: Optional direct filesystem path to the protein
-    - cysteine_id: Optional cysteine residue ID for covalent docking (format: "chain:resnum")
-    
+    Look up the registered receptor referenced by a docking request
+
+    Args:
+        data (dict): Request body, optionally with receptor_id
+
     Returns:
-    - JSON response with docking results including scores, poses, and binding information
+        dict: Registry entry, or None if no receptor_id was given
     """
-    data = await request.json()
-    
-    # Get SMILES string from request
-    smiles = data.get("smiles")
-    if not smiles:
-        raise HTTPException(status_code=400, detail="SMILES string required")
+    receptor_id = data.get("receptor_id")
+    if not receptor_id:
+        return None
+
+    entry = get_receptor_registry().get(receptor_id)
+    if entry is None or not os.path.exists(entry["cleaned_pdb"]):
+        raise HTTPException(status_code=404, detail=f"Unknown receptor: {receptor_id}")
+    return entry
+
+
+def _resolve_protein_path(data):
+    """
+    Find the protein structure file referenced by a docking request
+
+    Args:
+        data (dict): Request body with receptor_id, filesystem_path and/or
+            protein_path
+
+    Returns:
+        str: Path to an existing protein file
+    """
+    # A receptor ID resolves with one registry lookup
+    entry = _resolve_receptor(data)
+    if entry is not None:
+        return entry["cleaned_pdb"]
 
-    # Log request information
-    print(f"Dock request: SMILES={smiles}, paths={data.get('protein_path')}/{data.get('filesystem_path')}")
-    
-    # Create a docking controller
-    docking_controller = DockingController()
-    
     # Process protein path - try to find the protein file
     protein_path = None
     file_candidates = []
@@ -604,27 +815,112 @@ async def dock_molecule(request: Request):
                 protein_path = candidate
                 break
     
-    # Last resort: search in prepared_proteins directory for the filename
+    # Last resort: look the path up among registered receptors
     if not protein_path and data.get("protein_path"):
-        filename = os.path.basename(data.get("protein_path"))
-        prepared_dir = os.path.join(UPLOAD_FOLDER, "prepared_proteins")
-        
-        if os.path.exists(prepared_dir):
-            for root, _, files in os.walk(prepared_dir):
-                for file in files:
-                    if filename in file:
-                        candidate = os.path.join(root, file)
-                        if os.path.exists(candidate):
-                            protein_path = candidate
-                            break
+        protein_path = _resolve_registered_path(data.get("protein_path"), file_candidates)
     
     # If we still don't have a protein path, error out
     if not protein_path:
-        raise HTTPException(status_code=400, detail="Could not find valid protein structure file")
+        raise HTTPException(status_code=404, detail="Could not find valid protein structure file")
     
-    # Set the protein file in the docking controller
+    return protein_path
+
+
+def _resolve_registered_path(path, candidates):
+    """
+    Find a registered receptor by its stored path or a bare file name
+
+    A stored path (e.g. the PDBQT URL of a prepared receptor) names one
+    receptor. A bare file name is shared by every preparation of the same
+    structure, so it only resolves if exactly one receptor has it.
+
+    Args:
+        path (str): protein_path of the request
+        candidates (list): Filesystem paths the protein_path may refer to
+
+    Returns:
+        str: Path to the cleaned PDB file, or None if nothing matches
+    """
+    registry = get_receptor_registry()
+    for candidate in candidates:
+        entry = registry.find_by_path(candidate)
+        if entry is not None and os.path.exists(entry["cleaned_pdb"]):
+            return entry["cleaned_pdb"]
+
+    filename = path.strip("/")
+    if os.path.basename(filename) != filename:
+        return None
+
+    entries = [
+        entry for entry in registry.find_by_filename(filename)
+        if os.path.exists(entry["cleaned_pdb"])
+    ]
+    if len(entries) > 1:
+        receptor_ids = ", ".join(entry["receptor_id"] for entry in entries)
+        raise HTTPException(
+            status_code=409,
+            detail=f"{filename} matches several receptors; pass receptor_id ({receptor_ids})",
+        )
+    return entries[0]["cleaned_pdb"] if entries else None
+
+
+def _add_pose_urls(results):
+    """Add frontend-compatible URLs for the pose files in docking results"""
+    if "poses" in results:
+        for pose in results["poses"]:
+            if "pose_file" in pose and os.path.exists(pose["pose_file"]):
+                relpath = os.path.relpath(pose["pose_file"], start=UPLOAD_FOLDER)
+                pose["pdbqt_url"] = f"/uploads/{relpath}"
+
+
+@app.post("/api/dock")
+async def dock_molecule(request: Request):
+    """
+    Perform molecular docking of a compound against a protein structure
+    
+    Request body:
+    - smiles: SMILES string of the molecule to dock
+    - receptor_id: ID returned by /api/prepare-protein (preferred)
+    - protein_path: Path to the protein structure file
+    - filesystem_path: Optional direct filesystem path to the protein
+    - cysteine_id: Optional cysteine residue ID for covalent docking (format: "chain:resnum")
+    - crop_distance: Optional distance in Angstroms; dock against the residues
+      within it of the docking box only (0 for the whole receptor)
+    
+    Returns:
+    - JSON response with docking results including scores, poses, and binding information
+    """
+    data = await request.json()
+    
+    # Get SMILES string from request
+    smiles = data.get("smiles")
+    if not smiles:
+        raise HTTPException(status_code=400, detail="SMILES string required")
+
+    # Log request information
+    print(f"Dock request: SMILES={smiles}, paths={data.get('protein_path')}/{data.get('filesystem_path')}")
+    
+    # Create a docking controller
+    docking_controller = DockingController(engine=VINA_ENGINE)
+    
+    # Optionally dock against the receptor cropped around the box
+    if data.get("crop_distance") is not None:
+        try:
+            crop_distance = float(data["crop_distance"])
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=400, detail="crop_distance must be a number")
+        if not math.isfinite(crop_distance) or crop_distance < 0:
+            raise HTTPException(
+                status_code=400, detail="crop_distance must be a non-negative number"
+            )
+        docking_controller.crop_distance = crop_distance or None
+    
+    protein_path = _resolve_protein_path(data)
+    
+    # Set the protein file in the docking controller; a registered receptor
+    # brings its prepared PDBQT, cysteines and docking boxes along
     try:
-        docking_controller.set_protein(protein_path)
+        await run_in_threadpool(docking_controller.set_protein, protein_path)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error loading protein: {str(e)}")
     
@@ -633,14 +929,13 @@ async def dock_molecule(request: Request):
     
     # Run docking
     try:
-        results = docking_controller.dock_from_smiles(smiles=smiles, cysteine_id=cysteine_id)
+        # Run off the event loop so other requests are served meanwhile
+        results = await run_in_threadpool(
+            docking_controller.dock_from_smiles, smiles=smiles, cysteine_id=cysteine_id
+        )
         
         # Process URLs in results to be frontend-compatible
-        if "poses" in results:
-            for pose in results["poses"]:
-                if "pose_file" in pose and os.path.exists(pose["pose_file"]):
-                    relpath = os.path.relpath(pose["pose_file"], start=UPLOAD_FOLDER)
-                    pose["pdbqt_url"] = f"/uploads/{relpath}"
+        _add_pose_urls(results)
         
         return results
     except Exception as e:
@@ -650,6 +945,125 @@ async def dock_molecule(request: Request):
         raise HTTPException(status_code=500, detail=f"Docking failed: {str(e)}")
 
 
+@app.post("/api/dock-batch")
+async def dock_batch_route(request: Request):
+    """
+    Dock many compounds against one protein structure in parallel
+
+    Accepts either a JSON body or a multipart form with an uploaded SDF file.
+
+    Request body / form fields:
+    - smiles_list: List of SMILES strings (JSON only)
+    - names: Optional list of names for the molecules (JSON only)
+    - file: SDF file with the molecules to dock (multipart only)
+    - receptor_id / protein_path / filesystem_path: Protein structure, as for /api/dock
+    - cysteine_id: Optional cysteine residue ID for covalent docking
+    - max_workers: Optional maximum number of docking processes
+
+    Returns:
+    - JSON response with one docking result per molecule, in input order
+    """
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        form = await request.form()
+        data = dict(form)
+        upload = form.get("file")
+        if upload is None or not getattr(upload, "filename", None):
+            raise HTTPException(status_code=400, detail="No file selected")
+        if not upload.filename.lower().endswith(".sdf"):
+            raise HTTPException(status_code=400, detail="File must be an SDF file")
+        ligands = await run_in_threadpool(read_sdf_ligands, upload.file)
+    else:
+        data = await request.json()
+        smiles_list = data.get("smiles_list") or []
+        names = data.get("names") or []
+        ligands = [
+            (names[i] if i < len(names) else f"molecule_{i}", smiles)
+            for i, smiles in enumerate(smiles_list)
+        ]
+
+    if not ligands:
+        raise HTTPException(status_code=400, detail="At least one molecule required")
+
+    protein_path = _resolve_protein_path(data)
+    try:
+        max_workers = int(data["max_workers"]) if data.get("max_workers") else None
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="max_workers must be an integer")
+
+    try:
+        results = await run_in_threadpool(
+            dock_batch,
+            protein_path,
+            ligands,
+            cysteine_id=data.get("cysteine_id") or None,
+            max_workers=max_workers,
+            engine=VINA_ENGINE,
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Batch docking failed: {str(e)}")
+
+    for result in results:
+        _add_pose_urls(result)
+
+    succeeded = sum(1 for result in results if result.get("status") == "success")
+
+    return {
+        "success": True,
+        "total": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "results": results,
+    }
+
+
+@app.post("/api/jobs", status_code=202)
+async def submit_docking_job(request: Request):
+    """
+    Submit a docking job to run in the background
+
+    Request body: same fields as /api/dock
+
+    Returns:
+    - job_id: ID to poll with /api/jobs/{job_id}
+    - status: Initial job status ("queued")
+    """
+    data = await request.json()
+
+    smiles = data.get("smiles")
+    if not smiles:
+        raise HTTPException(status_code=400, detail="SMILES string required")
+
+    protein_path = _resolve_protein_path(data)
+    job = job_queue.submit(
+        protein_path, smiles, cysteine_id=data.get("cysteine_id"), engine=VINA_ENGINE
+    )
+
+    return {"job_id": job["job_id"], "status": job["status"]}
+
+
+@app.get("/api/jobs")
+async def list_docking_jobs():
+    """
+    List docking jobs with their status and stage timings, newest first
+    """
+    return {"success": True, "jobs": job_queue.list_jobs()}
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_docking_job(job_id: str):
+    """
+    Get the status, stage timings and (once completed) results of a docking job
+    """
+    job = job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    if job["result"]:
+        _add_pose_urls(job["result"])
+
+    return job
+
+
 @app.post("/api/detect-warheads")
 async def detect_warheads(request: Request):
     data = await request.json()
@@ -772,6 +1186,18 @@ async def generate_report_route(request: Request):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """
+    Report hit/miss counters and sizes of the preparation caches
+    """
+    return {
+        "receptors": get_receptor_cache().stats(),
+        "ligands": get_ligand_cache().stats(),
+        "maps": get_map_store().stats(),
+    }
+
+
 @app.get("/")
 async def home():
     """
@@ -785,12 +1211,17 @@ async def home():
             "process_smiles": "/api/process-smiles",
             "batch_process_smiles": "/api/batch-process-smiles",
             "process_sdf": "/api/process-sdf",
+            "process_sdf_stream": "/api/process-sdf-stream",
             "library_covalent": "/api/library/covalent",
             "library_non_covalent": "/api/library/non-covalent",
             "library_warheads": "/api/library/warheads",
             "library_test_set": "/api/library/test-set",
             "process_test_set": "/api/library/process-test-set",
             "search_pubchem": "/api/search/pubchem",
+            "dock": "/api/dock",
+            "dock_batch": "/api/dock-batch",
+            "jobs": "/api/jobs",
+            "cache_stats": "/api/cache/stats",
         },
     }
 
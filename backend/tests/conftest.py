@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# Modules are imported as in the app ("from utils.x import ..."), from backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Caches are configured at import time; keep test runs out of the user cache
+os.environ.setdefault("BINDFORGE_CACHE_DIR", tempfile.mkdtemp(prefix="bindforge-tests-"))
@@ -0,0 +1,27 @@
+import numpy as np
+
+from utils.accessibility import PROBE_RADIUS, shrake_rupley, sphere_points
+
+
+def test_sphere_points_are_unit_vectors():
+    points = sphere_points(50)
+    np.testing.assert_allclose(np.linalg.norm(points, axis=1), 1.0)
+
+
+def test_isolated_atom_is_fully_exposed():
+    area = shrake_rupley(np.zeros((1, 3)), np.array([1.7]), [0])
+    np.testing.assert_allclose(area, 4 * np.pi * (1.7 + PROBE_RADIUS) ** 2)
+
+
+def test_neighbour_buries_part_of_the_surface():
+    coords = np.array([[0.0, 0.0, 0.0], [3.0, 0.0, 0.0], [50.0, 0.0, 0.0]])
+    radii = np.array([1.7, 1.7, 1.7])
+    area = shrake_rupley(coords, radii, [0, 2])
+
+    full = 4 * np.pi * (1.7 + PROBE_RADIUS) ** 2
+    assert 0 < area[0] < full
+    np.testing.assert_allclose(area[1], full)
+
+
+def test_no_selected_atoms():
+    assert len(shrake_rupley(np.zeros((1, 3)), np.array([1.7]), [])) == 0
@@ -0,0 +1,67 @@
+import os
+import time
+
+from utils.artifact_cache import ArtifactCache
+
+
+def test_make_key_depends_on_parts_and_options():
+    key = ArtifactCache.make_key("abc", mode="x")
+    assert key == ArtifactCache.make_key("abc", mode="x")
+    assert key != ArtifactCache.make_key("abc", mode="y")
+    assert key != ArtifactCache.make_key("abd", mode="x")
+
+
+def test_put_and_get(tmp_path):
+    cache = ArtifactCache(str(tmp_path))
+    entry = cache.put("k", {"a.txt": b"hello"})
+
+    assert cache.get("k") == entry
+    assert (tmp_path / "k" / "a.txt").read_bytes() == b"hello"
+    assert cache.get("missing") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = ArtifactCache(str(tmp_path), max_bytes=250, in_use_seconds=0)
+    cache.put("a", {"f": b"x" * 100})
+    cache.put("b", {"f": b"x" * 100})
+
+    # Touch "a" so "b" becomes the oldest entry
+    cache.get("a")
+    cache.put("c", {"f": b"x" * 100})
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+    assert cache.evictions == 1
+
+
+def test_keeps_entries_in_use(tmp_path):
+    cache = ArtifactCache(str(tmp_path), max_bytes=250, in_use_seconds=60)
+    cache.put("a", {"f": b"x" * 100})
+    cache.put("b", {"f": b"x" * 100})
+    # "a" was last used long ago; "b" is still in use
+    old = time.time() - 120
+    os.utime(tmp_path / "a", (old, old))
+    cache.put("c", {"f": b"x" * 100})
+
+    assert not (tmp_path / "a").exists()
+    assert (tmp_path / "b").exists()
+    assert cache.evictions == 1
+
+
+def test_keeps_oversized_latest_entry(tmp_path):
+    cache = ArtifactCache(str(tmp_path), max_bytes=10)
+    cache.put("big", {"f": b"x" * 100})
+    assert cache.get("big") is not None
+
+
+def test_lru_order_survives_reload(tmp_path):
+    cache = ArtifactCache(str(tmp_path), max_bytes=1000)
+    cache.put("a", {"f": b"x" * 100})
+    cache.put("b", {"f": b"x" * 100})
+
+    reloaded = ArtifactCache(str(tmp_path), max_bytes=1000)
+    assert reloaded.stats()["entries"] == 2
+    assert reloaded.get("a") is not None
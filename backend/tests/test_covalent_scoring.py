@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from utils.covalent_scoring import MAX_COVALENT_DISTANCE, score_covalent, step_score
+
+
+def test_step_score_bands():
+    scores = step_score(np.array([-10.0, -10.0, -10.0, -10.0]), np.array([3.0, 4.0, 6.0, 9.0]))
+    np.testing.assert_allclose(scores, [10.0, 8.0, 4.0, 1.0])
+
+
+def test_step_score_affinity_is_clipped():
+    scores = step_score(np.array([-2.0, -20.0]), np.array([3.0, 3.0]))
+    np.testing.assert_allclose(scores, [0.0, 10.0])
+
+
+def test_predictions_need_warhead_and_distance():
+    affinities = [-10.0, -10.0, -10.0]
+    distances = [3.0, 3.0, MAX_COVALENT_DISTANCE + 1]
+
+    _, predictions = score_covalent(affinities, distances, [True, False, True])
+    assert list(predictions) == ["likely", "unlikely", "unlikely"]
+
+
+def test_threshold_override():
+    _, predictions = score_covalent([-10.0], [3.0], True, threshold=20.0)
+    assert list(predictions) == ["unlikely"]
+
+
+def test_unknown_scoring_function():
+    with pytest.raises(ValueError):
+        score_covalent([-5.0], [3.0], True, scoring="nope")
@@ -0,0 +1,50 @@
+import numpy as np
+from rdkit import Chem
+from rdkit.Chem import AllChem
+
+from utils import ligand_prep
+from utils.ligand_prep import embed_conformers, mol_to_pdbqt
+
+
+def test_embed_conformers_sorted_by_energy():
+    mol = Chem.AddHs(Chem.MolFromSmiles("CCCCCCO"))
+    conf_ids, energies = embed_conformers(mol, n_conformers=5)
+
+    assert len(conf_ids) == len(energies) >= 1
+    assert np.all(np.diff(energies) >= 0)
+
+
+def test_failed_optimisation_is_ranked_last(monkeypatch):
+    monkeypatch.setattr(
+        AllChem,
+        "MMFFOptimizeMoleculeConfs",
+        lambda mol, **kwargs: [(0, 5.0), (-1, -1.0), (1, 3.0)],
+    )
+    mol = Chem.AddHs(Chem.MolFromSmiles("CCCCCCCCO"))
+    conf_ids, energies = ligand_prep.embed_conformers(mol, n_conformers=3, prune_rms=0.0)
+
+    assert conf_ids == [2, 0, 1]
+    assert np.isinf(energies[-1])
+
+
+def test_embed_conformers_use_the_given_threads(monkeypatch):
+    calls = []
+    optimize = AllChem.MMFFOptimizeMoleculeConfs
+
+    def record(mol, **kwargs):
+        calls.append(kwargs["numThreads"])
+        return optimize(mol, **kwargs)
+
+    monkeypatch.setattr(AllChem, "MMFFOptimizeMoleculeConfs", record)
+    embed_conformers(Chem.AddHs(Chem.MolFromSmiles("CCO")), n_conformers=2, threads=1)
+
+    assert calls == [1]
+
+
+def test_mol_to_pdbqt_has_torsion_tree():
+    mol = Chem.AddHs(Chem.MolFromSmiles("C=CC(=O)N1CCCC1"))
+    AllChem.EmbedMolecule(mol, randomSeed=42)
+    pdbqt = mol_to_pdbqt(mol)
+
+    assert "ROOT" in pdbqt
+    assert pdbqt.strip().endswith("TORSDOF 1")
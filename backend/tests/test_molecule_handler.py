@@ -0,0 +1,34 @@
+import os
+
+from utils.molecule_handler import batch_process_smiles, molecule_key
+
+
+def test_molecule_key_is_canonical():
+    assert molecule_key("CCO") == molecule_key("OCC") == "LFQSCWFLJHTTHZ-UHFFFAOYSA-N"
+    assert molecule_key("CCO") != molecule_key("CCN")
+
+
+def test_molecule_key_falls_back_to_digest():
+    key = molecule_key("not a smiles(")
+    assert key.startswith("molecule_")
+    assert key == molecule_key("not a smiles(")
+
+
+def test_batch_deduplicates_by_inchikey(tmp_path):
+    results = batch_process_smiles(
+        ["CCO", "OCC", "CCO"], str(tmp_path), names=["a", "b"], max_workers=1
+    )
+
+    assert [r["name"] for r in results] == ["a", "b", "LFQSCWFLJHTTHZ-UHFFFAOYSA-N"]
+    assert [r["smiles"] for r in results] == ["CCO", "OCC", "CCO"]
+    assert len({r["pdbqt_path"] for r in results}) == 1
+    assert sorted(os.listdir(tmp_path)) == [
+        "LFQSCWFLJHTTHZ-UHFFFAOYSA-N.pdb",
+        "LFQSCWFLJHTTHZ-UHFFFAOYSA-N.pdbqt",
+    ]
+
+
+def test_batch_reports_invalid_smiles(tmp_path):
+    results = batch_process_smiles(["CCO", "xx("], str(tmp_path), max_workers=1)
+    assert "error" not in results[0]
+    assert "error" in results[1]
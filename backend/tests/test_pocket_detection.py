@@ -0,0 +1,39 @@
+import numpy as np
+
+from utils.pocket_detection import MAX_BOX_SIZE, MIN_BOX_SIZE, detect_pockets, fit_docking_box
+
+
+def _hollow_shell(radius=9.0, spacing=1.5):
+    """Atoms on a closed spherical shell; its inside is one buried pocket"""
+    axis = np.arange(-radius, radius + spacing, spacing)
+    grid = np.stack(np.meshgrid(axis, axis, axis, indexing="ij"), axis=-1).reshape(-1, 3)
+    distance = np.linalg.norm(grid, axis=1)
+    return grid[(distance > radius - 2.0) & (distance <= radius)]
+
+
+def test_finds_cavity_inside_shell():
+    points, labels = detect_pockets(_hollow_shell())
+
+    assert len(points) > 0
+    assert labels.min() == 0
+    # The pocket is the cavity around the origin
+    assert np.linalg.norm(points[labels == 0].mean(axis=0)) < 1.0
+
+
+def test_no_atoms():
+    points, labels = detect_pockets(np.zeros((0, 3)))
+    assert points.shape == (0, 3)
+    assert len(labels) == 0
+
+
+def test_fit_docking_box_covers_pocket():
+    points, labels = detect_pockets(_hollow_shell())
+    center, size = fit_docking_box(points, labels)
+
+    np.testing.assert_allclose(center, (0, 0, 0), atol=1.0)
+    assert all(MIN_BOX_SIZE <= s <= MAX_BOX_SIZE for s in size)
+
+
+def test_fit_docking_box_anchor_too_far():
+    points, labels = detect_pockets(_hollow_shell())
+    assert fit_docking_box(points, labels, anchor=(100.0, 0.0, 0.0)) is None
@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from utils.pose_parser import parse_vina_poses
+
+
+def _pose(mode, affinity, coords):
+    lines = [f"MODEL {mode}", f"REMARK VINA RESULT:    {affinity:.3f}      0.000      0.000"]
+    for i, (x, y, z) in enumerate(coords, start=1):
+        lines.append(
+            f"ATOM  {i:5d}  C{i:<2} UNL     1    {x:8.3f}{y:8.3f}{z:8.3f}  0.00  0.00    +0.000 C "
+        )
+    lines.append("ENDMDL")
+    return "\n".join(lines) + "\n"
+
+
+def test_parses_all_poses():
+    text = _pose(1, -7.5, [(1, 2, 3), (4, 5, 6)]) + _pose(2, -6.25, [(-1, -2, -3), (0, 0, 0)])
+    poses = parse_vina_poses(text)
+
+    assert len(poses) == 2
+    np.testing.assert_array_equal(poses.modes, [1, 2])
+    np.testing.assert_allclose(poses.affinities, [-7.5, -6.25])
+    assert poses.coords.shape == (2, 2, 3)
+    np.testing.assert_allclose(poses.coords[1, 0], [-1, -2, -3])
+    assert list(poses.atom_types) == ["C", "C"]
+    assert poses.blocks[0].startswith("MODEL 1")
+
+
+def test_touching_coordinate_columns():
+    poses = parse_vina_poses(_pose(1, -5.0, [(-100.123, -200.456, -300.789)]))
+    np.testing.assert_allclose(poses.coords[0, 0], [-100.123, -200.456, -300.789])
+
+
+def test_empty_output():
+    poses = parse_vina_poses("")
+    assert len(poses) == 0
+    assert poses.coords.shape == (0, 0, 3)
+
+
+def test_rejects_inconsistent_atom_counts():
+    text = _pose(1, -5.0, [(0, 0, 0)]) + _pose(2, -4.0, [(0, 0, 0), (1, 1, 1)])
+    with pytest.raises(ValueError):
+        parse_vina_poses(text)
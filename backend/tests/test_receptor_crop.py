@@ -0,0 +1,43 @@
+import numpy as np
+
+from utils.receptor_crop import crop_receptor, residues_near_box
+from utils.structure_io import ATOM_DTYPE, read_atoms, write_atoms
+
+
+def _atoms(residues):
+    """Two atoms per residue: one at the given x, one 1 A further out"""
+    atoms = np.zeros(2 * len(residues), dtype=ATOM_DTYPE)
+    for i, (resseq, x) in enumerate(residues):
+        for j in range(2):
+            atom = atoms[2 * i + j]
+            atom["record"] = "ATOM"
+            atom["name"] = ("CA", "CB")[j]
+            atom["resname"] = "ALA"
+            atom["chain"] = "A"
+            atom["resseq"] = resseq
+            atom["coords"] = (x + j, 0.0, 0.0)
+            atom["element"] = "C"
+    return atoms
+
+
+def test_keeps_whole_residues_near_box():
+    atoms = _atoms([(1, 0.0), (2, 9.5), (3, 30.0)])
+    mask = residues_near_box(atoms, (0, 0, 0), (10, 10, 10), distance=5.0)
+
+    # Residue 2 has one atom inside the cutoff, so both of its atoms are kept
+    assert mask.tolist() == [True, True, True, True, False, False]
+
+
+def test_crop_receptor_writes_gap_ter(tmp_path):
+    atoms = _atoms([(1, 0.0), (2, 40.0), (3, 2.0)])
+    source = write_atoms(atoms, str(tmp_path / "receptor.pdb"))
+    output, kept, total = crop_receptor(
+        source, str(tmp_path / "cropped.pdb"), (0, 0, 0), (8, 8, 8), 2.0
+    )
+
+    assert (kept, total) == (4, 6)
+    cropped = read_atoms(output)
+    assert sorted(set(cropped["resseq"].tolist())) == [1, 3]
+    lines = open(output).read().splitlines()
+    # A TER separates residue 1 from residue 3 across the removed residue
+    assert lines.count("TER") == 2
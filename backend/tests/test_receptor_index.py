@@ -0,0 +1,34 @@
+import numpy as np
+
+from utils.receptor_index import ReceptorIndex, get_receptor_index, index_path_for
+from utils.structure_io import ATOM_DTYPE, write_atoms
+
+
+def _write_structure(path, x):
+    atoms = np.zeros(1, dtype=ATOM_DTYPE)
+    atoms[0]["record"] = "ATOM"
+    atoms[0]["name"] = "SG"
+    atoms[0]["resname"] = "CYS"
+    atoms[0]["chain"] = "A"
+    atoms[0]["resseq"] = 10
+    atoms[0]["coords"] = (x, 0.0, 0.0)
+    atoms[0]["element"] = "S"
+    return write_atoms(atoms, str(path))
+
+
+def test_persisted_index_is_used(tmp_path):
+    structure = _write_structure(tmp_path / "receptor.pdb", 1.0)
+    index = ReceptorIndex.from_structure(structure)
+    index.save(index_path_for(structure), (structure,))
+
+    assert get_receptor_index(structure).atom_coord("A", 10, "SG")[0] == 1.0
+
+
+def test_stale_persisted_index_is_rebuilt(tmp_path):
+    structure = _write_structure(tmp_path / "receptor.pdb", 1.0)
+    ReceptorIndex.from_structure(structure).save(index_path_for(structure), (structure,))
+
+    # Replace the structure in place; the saved index no longer describes it
+    _write_structure(tmp_path / "receptor.pdb", 5.0)
+
+    assert get_receptor_index(structure).atom_coord("A", 10, "SG")[0] == 5.0
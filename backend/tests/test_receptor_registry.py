@@ -0,0 +1,47 @@
+from utils.receptor_registry import ReceptorRegistry
+
+
+def _register(registry, receptor_id, cleaned_pdb):
+    return registry.register(
+        receptor_id,
+        "3m2w.pdb",
+        "digest",
+        cleaned_pdb,
+        cleaned_pdb.replace(".pdb", ".pdbqt"),
+        cysteines={"A:140": [1.0, 2.0, 3.0]},
+        boxes={"pocket": {"center": [0, 0, 0], "size": [20, 20, 20]}},
+    )
+
+
+def test_register_and_get(tmp_path):
+    registry = ReceptorRegistry(str(tmp_path / "registry.sqlite"))
+    entry = _register(registry, "r1", "/data/r1/3m2w_cleaned.pdb")
+
+    assert entry["receptor_id"] == "r1"
+    assert entry["cysteines"] == {"A:140": [1.0, 2.0, 3.0]}
+    assert entry["boxes"]["pocket"]["size"] == [20, 20, 20]
+    assert registry.get("r1") == entry
+    assert registry.get("missing") is None
+
+
+def test_registry_persists(tmp_path):
+    path = str(tmp_path / "registry.sqlite")
+    _register(ReceptorRegistry(path), "r1", "/data/r1/3m2w_cleaned.pdb")
+    assert ReceptorRegistry(path).get("r1")["cleaned_name"] == "3m2w_cleaned.pdb"
+
+
+def test_find_by_path(tmp_path):
+    registry = ReceptorRegistry(str(tmp_path / "registry.sqlite"))
+    _register(registry, "r1", "/data/r1/3m2w_cleaned.pdb")
+
+    assert registry.find_by_path("/data/r1/3m2w_cleaned.pdbqt")["receptor_id"] == "r1"
+    assert registry.find_by_path("/data/r2/3m2w_cleaned.pdb") is None
+
+
+def test_find_by_filename_returns_every_match(tmp_path):
+    registry = ReceptorRegistry(str(tmp_path / "registry.sqlite"))
+    _register(registry, "r1", "/data/r1/3m2w_cleaned.pdb")
+    _register(registry, "r2", "/data/r2/3m2w_cleaned.pdb")
+
+    entries = registry.find_by_filename("3m2w_cleaned.pdb")
+    assert sorted(entry["receptor_id"] for entry in entries) == ["r1", "r2"]
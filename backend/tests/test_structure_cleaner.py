@@ -0,0 +1,49 @@
+import numpy as np
+
+from utils.pocket_detection import MAX_BOX_SIZE
+from utils.structure_cleaner import _heavy_atom_ad_types, site_box
+from utils.structure_io import ATOM_DTYPE
+from utils.structure_model import Structure
+
+
+def _atoms(names):
+    atoms = np.zeros(len(names), dtype=ATOM_DTYPE)
+    for atom, (resname, name) in zip(atoms, names):
+        atom["resname"] = resname
+        atom["name"] = name
+        atom["element"] = name[0]
+    return atoms
+
+
+def test_donor_nitrogens_are_not_acceptors():
+    atoms = _atoms(
+        [
+            ("ALA", "N"),
+            ("PRO", "N"),
+            ("LYS", "NZ"),
+            ("ARG", "NH1"),
+            ("ASN", "ND2"),
+            ("TRP", "NE1"),
+            ("SER", "OG"),
+        ]
+    )
+
+    assert _heavy_atom_ad_types(atoms).tolist() == ["N", "N", "N", "N", "N", "N", "OA"]
+
+
+def test_histidine_ring_acceptor():
+    atoms = _atoms([("HIS", "ND1"), ("HIS", "NE2"), ("HID", "NE2"), ("HIP", "ND1")])
+
+    assert _heavy_atom_ad_types(atoms).tolist() == ["NA", "N", "NA", "N"]
+
+
+def test_site_box_without_pocket_is_centred_on_site():
+    # Atoms at the corners of a cube: nothing is buried, so no pocket
+    atoms = _atoms([("ALA", "CA")] * 8)
+    atoms["coords"] = np.array(list(np.ndindex(2, 2, 2)), dtype=np.float32) * 20.0
+    structure = Structure(atoms)
+
+    center, size = site_box(structure, np.array([[1.0, 2.0, 3.0]]))
+
+    assert center == (1.0, 2.0, 3.0)
+    assert size == (MAX_BOX_SIZE,) * 3
@@ -0,0 +1,64 @@
+import pytest
+
+from utils.structure_io import format_atoms, parse_atoms
+
+PDB = (
+    "ATOM      1  N   ALA A   1      11.104   6.134  -6.504  1.00  0.00           N\n"
+    "ATOM  A0000  CA  ALA A   1      11.639   6.071  -5.147  1.00  0.00           C\n"
+    "ATOM  *****  C   ALA AA001      13.140   6.255  -5.193  1.00  0.00           C\n"
+    "ATOM  a0000  O   ALA A****      13.633   7.352  -5.451  1.00  0.00           O\n"
+)
+
+
+def test_parses_hybrid36_numbers():
+    atoms = parse_atoms(PDB)
+
+    assert atoms["serial"][1] == 100000
+    assert atoms["serial"][3] == 100000 + 26 * 36**4
+    assert atoms["resseq"][2] == 10001
+
+
+def test_undecodable_numbers_do_not_fail_the_file():
+    atoms = parse_atoms(PDB)
+
+    assert len(atoms) == 4
+    # The serial falls back to the record's position
+    assert atoms["serial"][2] == 3
+    assert atoms["coords"][3][0] == pytest.approx(13.633)
+
+
+def test_format_atoms_round_trips_large_numbers():
+    atoms = parse_atoms(PDB)[:2]
+    atoms["resseq"] = [9999, 10000]
+
+    assert parse_atoms(format_atoms(atoms))["resseq"].tolist() == [9999, 10000]
+
+
+def test_format_atoms_aliases_long_chain_ids():
+    atoms = parse_atoms(PDB)[:3]
+    atoms["chain"] = ["AB", "A", "AC"]
+
+    written = parse_atoms(format_atoms(atoms))
+
+    # Chain A keeps its ID; the long IDs get distinct free ones
+    assert written["chain"].tolist() == ["B", "A", "C"]
+    assert atoms["chain"].tolist() == ["AB", "A", "AC"]
+
+
+def test_format_atoms_matches_fixed_columns():
+    atoms = parse_atoms(PDB)[:1]
+    atoms["coords"] = [[-0.0004, 1234.5675, -999.999]]
+    atoms["charge"] = -0.0
+
+    line = format_atoms(atoms, pdbqt=True).splitlines()[0]
+
+    assert line[30:54] == "  -0.0001234.568-999.999"
+    assert line[70:76] == "-0.000"
+
+
+def test_format_atoms_rejects_values_wider_than_their_column():
+    atoms = parse_atoms(PDB)[:1]
+    atoms["bfactor"] = 1000.0
+
+    with pytest.raises(ValueError):
+        format_atoms(atoms)
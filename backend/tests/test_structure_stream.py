@@ -0,0 +1,63 @@
+import pytest
+
+from utils.structure_io import parse_atoms
+from utils.structure_stream import mmcif_atoms, mmcif_to_pdb_lines
+
+MMCIF = """data_test
+loop_
+_atom_site.group_PDB
+_atom_site.id
+_atom_site.type_symbol
+_atom_site.label_atom_id
+_atom_site.label_alt_id
+_atom_site.label_comp_id
+_atom_site.auth_asym_id
+_atom_site.auth_seq_id
+_atom_site.pdbx_PDB_ins_code
+_atom_site.Cartn_x
+_atom_site.Cartn_y
+_atom_site.Cartn_z
+_atom_site.occupancy
+_atom_site.B_iso_or_equiv
+_atom_site.pdbx_PDB_model_num
+ATOM 1 N N . ALA {chain} 12345 ? 1.000 2.000 3.000 1.00 10.00 1
+ATOM 2 C CA A ALA {chain} 12345 ? 2.000 2.000 3.000 0.40 10.00 1
+ATOM 3 C CA B ALA {chain} 12345 ? 2.100 2.000 3.000 0.60 10.00 1
+ATOM 4 S SG . CYS {other} 7 ? 4.000 2.000 3.000 1.00 10.00 1
+#
+"""
+
+
+def _lines(chain="AA", other="AB"):
+    return MMCIF.format(chain=chain, other=other).splitlines()
+
+
+def test_mmcif_atoms_keep_full_chain_ids_and_numbers():
+    atoms = mmcif_atoms(_lines())
+
+    assert atoms["chain"].tolist() == ["AA", "AA", "AB"]
+    assert atoms["resseq"].tolist() == [12345, 12345, 7]
+    # The higher-occupancy alternate is kept
+    assert atoms["coords"][1][0] == pytest.approx(2.1)
+
+
+def test_mmcif_atoms_select_multi_character_chains():
+    atoms = mmcif_atoms(_lines(), chains=["AB"])
+
+    assert atoms["name"].tolist() == ["SG"]
+
+
+def test_pdb_lines_alias_long_chain_ids():
+    lines = list(mmcif_to_pdb_lines(_lines("AA", "A")))
+    atoms = parse_atoms("\n".join(lines))
+
+    # The first-seen long chain takes "A"; the real chain A gets the next
+    # free ID, and the full IDs go to the segment ID column
+    assert atoms["chain"].tolist() == ["A", "A", "A", "B"]
+    assert [line[72:76].strip() for line in lines[1:3]] == ["AA", "AA"]
+
+
+def test_pdb_lines_write_large_residue_numbers_in_hybrid36():
+    atoms = parse_atoms("\n".join(mmcif_to_pdb_lines(_lines("A", "B"))), first_model=False)
+
+    assert atoms["resseq"].tolist() == [12345, 12345, 12345, 7]
@@ -0,0 +1,175 @@
+import numpy as np
+from scipy.spatial import cKDTree
+
+# Van der Waals radii in Angstroms by element
+VDW_RADII = {
+    "H": 1.10,
+    "C": 1.70,
+    "N": 1.55,
+    "O": 1.52,
+    "S": 1.80,
+    "P": 1.80,
+    "SE": 1.90,
+}
+DEFAULT_RADIUS = 1.80
+
+# Water probe radius in Angstroms
+PROBE_RADIUS = 1.4
+
+# Rays cast from SG and their length, for pocket depth
+DEPTH_RAYS = 60
+DEPTH_RAY_LENGTH = 10.0
+
+
+def atom_radii(elements, names=None):
+    """
+    Van der Waals radii for a set of atoms
+
+    Args:
+        elements (ndarray): Element symbols; blank entries fall back to
+            the first letter of the atom name
+        names (ndarray, optional): Atom names
+
+    Returns:
+        ndarray: Radii in Angstroms
+    """
+    elements = np.char.upper(np.asarray(elements).astype(str))
+    if names is not None:
+        blank = elements == ""
+        elements[blank] = np.char.upper(np.asarray(names)[blank].astype("U1"))
+
+    radii = np.full(len(elements), DEFAULT_RADIUS)
+    for element, radius in VDW_RADII.items():
+        radii[elements == element] = radius
+    return radii
+
+
+def sphere_points(n_points):
+    """
+    Evenly spread unit vectors on a sphere (golden-section spiral)
+
+    Args:
+        n_points (int): Number of points
+
+    Returns:
+        ndarray: Unit vectors, shape (n_points, 3)
+    """
+    i = np.arange(n_points) + 0.5
+    z = 1.0 - 2.0 * i / n_points
+    r = np.sqrt(1.0 - z * z)
+    phi = np.pi * (3.0 - np.sqrt(5.0)) * i
+    return np.column_stack((r * np.cos(phi), r * np.sin(phi), z))
+
+
+def shrake_rupley(
+    coords, radii, atom_indices, n_points=96, probe=PROBE_RADIUS, tree=None
+):
+    """
+    Solvent accessible surface area of selected atoms (Shrake-Rupley)
+
+    Test points of all selected atoms are checked against all nearby
+    atoms in one sparse neighbour query; no per-atom Python loop.
+
+    Args:
+        coords (ndarray): Coordinates of all atoms, shape (n_atoms, 3)
+        radii (ndarray): Van der Waals radii of all atoms
+        atom_indices (ndarray): Atoms to compute the area for
+        n_points (int): Test points per atom (default: 96)
+        probe (float): Probe radius in Angstroms (default: 1.4)
+        tree (cKDTree, optional): Prebuilt KD-tree over coords
+
+    Returns:
+        ndarray: Accessible area in square Angstroms for each selected atom
+    """
+    coords = np.asarray(coords, dtype=np.float64)
+    atom_indices = np.asarray(atom_indices, dtype=np.int64)
+    if len(atom_indices) == 0:
+        return np.zeros(0)
+
+    if tree is None:
+        tree = cKDTree(coords)
+
+    expanded = radii + probe
+    # (selected, n_points, 3) test points on each expanded sphere
+    unit = sphere_points(n_points)
+    points = coords[atom_indices, None, :] + (
+        expanded[atom_indices, None, None] * unit[None, :, :]
+    )
+    points = points.reshape(-1, 3)
+    owner = np.repeat(atom_indices, n_points)
+
+    # A point is buried if it lies inside the expanded sphere of another atom
+    pairs = cKDTree(points).sparse_distance_matrix(
+        tree, expanded.max(), output_type="ndarray"
+    )
+    point_idx, atom_idx, dist = pairs["i"], pairs["j"], pairs["v"]
+    inside = (dist < expanded[atom_idx]) & (atom_idx != owner[point_idx])
+
+    buried = np.zeros(len(points), dtype=bool)
+    buried[point_idx[inside]] = True
+
+    exposed_fraction = (~buried).reshape(len(atom_indices), n_points).mean(axis=1)
+    return exposed_fraction * 4.0 * np.pi * expanded[atom_indices] ** 2
+
+
+def pocket_depth(
+    coords,
+    radii,
+    origins,
+    atom_groups,
+    origin_groups,
+    n_rays=DEPTH_RAYS,
+    length=DEPTH_RAY_LENGTH,
+    tree=None,
+):
+    """
+    Fraction of directions around each origin that are enclosed by protein
+
+    Rays are cast from every origin; a ray is enclosed if any sample
+    along it falls inside an atom outside the origin's own group (its
+    residue). 0 means a flat exposed surface, 1 a fully buried site, and
+    values in between the depth of the surrounding pocket.
+
+    Args:
+        coords (ndarray): Coordinates of all atoms, shape (n_atoms, 3)
+        radii (ndarray): Van der Waals radii of all atoms
+        origins (ndarray): Ray origins, shape (n_origins, 3)
+        atom_groups (ndarray): Group id of each atom, e.g. a residue index
+        origin_groups (ndarray): Group id of each origin; atoms of the
+            same group do not block its rays
+        n_rays (int): Rays per origin (default: 60)
+        length (float): Ray length in Angstroms (default: 10)
+        tree (cKDTree, optional): Prebuilt KD-tree over coords
+
+    Returns:
+        ndarray: Enclosure between 0 and 1 for each origin
+    """
+    coords = np.asarray(coords, dtype=np.float64)
+    origins = np.atleast_2d(np.asarray(origins, dtype=np.float64))
+    if len(origins) == 0:
+        return np.zeros(0)
+
+    if tree is None:
+        tree = cKDTree(coords)
+
+    # (origins, rays, steps, 3) samples from 2 A out to the ray length
+    steps = np.arange(2.0, length + 0.5, 1.0)
+    unit = sphere_points(n_rays)
+    samples = origins[:, None, None, :] + (
+        unit[None, :, None, :] * steps[None, None, :, None]
+    )
+    samples = samples.reshape(-1, 3)
+    sample_origin = np.repeat(np.arange(len(origins)), n_rays * len(steps))
+
+    pairs = cKDTree(samples).sparse_distance_matrix(
+        tree, radii.max(), output_type="ndarray"
+    )
+    sample_idx, atom_idx, dist = pairs["i"], pairs["j"], pairs["v"]
+    hit = (dist < radii[atom_idx]) & (
+        atom_groups[atom_idx] != origin_groups[sample_origin[sample_idx]]
+    )
+
+    blocked = np.zeros(len(samples), dtype=bool)
+    blocked[sample_idx[hit]] = True
+    blocked_rays = blocked.reshape(len(origins), n_rays, len(steps)).any(axis=2)
+    return blocked_rays.mean(axis=1)
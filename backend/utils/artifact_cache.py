@@ -0,0 +1,281 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Root directory for all persistent preparation caches; kept outside the
+# source tree so runtime artifacts never end up in the repository
+CACHE_ROOT = os.getenv(
+    "BINDFORGE_CACHE_DIR",
+    os.path.join(
+        os.getenv("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")),
+        "bindforge",
+    ),
+)
+
+# Entries used within this many seconds are not evicted, as a docking run
+# in this or another worker process may still be reading their files
+CACHE_IN_USE_SECONDS = float(os.getenv("CACHE_IN_USE_SECONDS", "3600"))
+
+
+def hash_file(path, chunk_size=1 << 20):
+    """
+    Compute the SHA-256 digest of a file without loading it into memory
+
+    Args:
+        path (str): Path to the file
+        chunk_size (int): Read size in bytes
+
+    Returns:
+        str: Hex digest
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ArtifactCache:
+    """
+    Content-addressed on-disk cache with size-bounded LRU eviction.
+
+    Every entry is a directory named after its key. Recency is tracked
+    in memory and persisted through the entry directory mtime, so the
+    LRU order survives restarts without a separate index file. The mtime
+    is also what protects entries in use: every lookup refreshes it, and
+    entries looked up by any process within in_use_seconds are kept even
+    when the cache is over budget.
+    """
+
+    def __init__(self, cache_dir, max_bytes=2 * 1024**3, in_use_seconds=CACHE_IN_USE_SECONDS):
+        """
+        Initialize the cache
+
+        Args:
+            cache_dir (str): Directory holding the cache entries
+            max_bytes (int): Maximum total size of all entries in bytes
+            in_use_seconds (float): Entries used more recently than this are
+                never evicted
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.in_use_seconds = in_use_seconds
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()  # key -> size in bytes, oldest first
+        self._file_digests = {}  # (path, mtime, size) -> sha256
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_entries()
+
+    @staticmethod
+    def make_key(*parts, **options):
+        """
+        Build a cache key from content digests and preparation options
+
+        Args:
+            *parts: Strings or bytes identifying the content
+            **options: Options that influence the cached artifact
+
+        Returns:
+            str: SHA-256 hex key
+        """
+        digest = hashlib.sha256()
+        for part in parts:
+            if isinstance(part, str):
+                part = part.encode("utf-8")
+            digest.update(part)
+            digest.update(b"\0")
+        digest.update(json.dumps(options, sort_keys=True, default=str).encode("utf-8"))
+        return digest.hexdigest()
+
+    def file_digest(self, path):
+        """
+        SHA-256 of a file, memoized on (path, mtime, size)
+
+        Args:
+            path (str): Path to the file
+
+        Returns:
+            str: Hex digest
+        """
+        stat = os.stat(path)
+        stamp = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+        with self._lock:
+            digest = self._file_digests.get(stamp)
+        if digest is None:
+            digest = hash_file(path)
+            with self._lock:
+                self._file_digests[stamp] = digest
+        return digest
+
+    def entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def get(self, key):
+        """
+        Look up an entry and mark it as most recently used
+
+        Args:
+            key (str): Cache key
+
+        Returns:
+            str: Entry directory, or None on a miss
+        """
+        path = self.entry_dir(key)
+        with self._lock:
+            if os.path.isdir(path):
+                if key not in self._entries:
+                    # Entry written by another worker process
+                    self._entries[key] = self._dir_size(path)
+                self._entries.move_to_end(key)
+                self.hits += 1
+                try:
+                    os.utime(path)
+                except OSError:
+                    pass
+                return path
+
+            # Entry may have been evicted by another process
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+
+    def put(self, key, files):
+        """
+        Store files as a new entry
+
+        The entry is assembled in a staging directory and renamed into
+        place, so readers never observe a partially written entry.
+
+        Args:
+            key (str): Cache key
+            files (dict): Mapping of entry file name to a source path (str)
+                or to file content (bytes)
+
+        Returns:
+            str: Entry directory
+        """
+        final_path = self.entry_dir(key)
+        staging = tempfile.mkdtemp(prefix=".staging-", dir=self.cache_dir)
+
+        try:
+            for name, source in files.items():
+                target = os.path.join(staging, name)
+                if isinstance(source, bytes):
+                    with open(target, "wb") as f:
+                        f.write(source)
+                else:
+                    shutil.copyfile(source, target)
+
+            try:
+                os.rename(staging, final_path)
+            except OSError:
+                # Another worker stored the same entry first
+                if not os.path.isdir(final_path):
+                    raise
+                shutil.rmtree(staging, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+
+        with self._lock:
+            self._entries[key] = self._dir_size(final_path)
+            self._entries.move_to_end(key)
+            self._evict()
+
+        return final_path
+
+    def stats(self):
+        """
+        Report cache counters
+
+        Returns:
+            dict: Entry count, total size and hit/miss/eviction counters
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "size_bytes": sum(self._entries.values()),
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self):
+        """Remove every entry from the cache"""
+        with self._lock:
+            for key in list(self._entries):
+                shutil.rmtree(self.entry_dir(key), ignore_errors=True)
+            self._entries.clear()
+
+    def _evict(self):
+        total = sum(self._entries.values())
+        now = time.time()
+
+        # Always keep the most recent entry, even if it alone exceeds the budget
+        for key in list(self._entries)[:-1]:
+            if total <= self.max_bytes:
+                break
+
+            path = self.entry_dir(key)
+            try:
+                last_used = os.path.getmtime(path)
+            except OSError:
+                # Already evicted by another process
+                total -= self._entries.pop(key)
+                continue
+            if now - last_used < self.in_use_seconds:
+                # Used recently here or in another process; its files may
+                # still be open, so the cache stays over budget for now
+                continue
+
+            size = self._entries.pop(key)
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+            self.evictions += 1
+            logger.info(f"Evicted cache entry {key} ({size} bytes)")
+
+    def _load_entries(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.startswith("."):
+                # Leftover staging directory from an interrupted write; recent
+                # ones may still be in use by another worker process
+                if time.time() - os.path.getmtime(path) > 3600:
+                    shutil.rmtree(path, ignore_errors=True)
+                continue
+            if os.path.isdir(path):
+                entries.append((os.path.getmtime(path), name, self._dir_size(path)))
+
+        for _, name, size in sorted(entries):
+            self._entries[name] = size
+
+        with self._lock:
+            self._evict()
+
+    @staticmethod
+    def _dir_size(path):
+        total = 0
+        for root, _, files in os.walk(path):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        return total
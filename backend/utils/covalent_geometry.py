@@ -0,0 +1,97 @@
+import numpy as np
+
+from utils.structure_io import parse_atoms
+
+
+def parse_pdbqt_coords(pdbqt_text):
+    """
+    Read atom coordinates from a single-model PDBQT file
+
+    Args:
+        pdbqt_text (str): PDBQT content
+
+    Returns:
+        ndarray: Coordinates in file order, shape (n_atoms, 3)
+    """
+    # PDBQT coordinates have three decimals; rounding drops float32 noise
+    return parse_atoms(pdbqt_text, pdbqt=True)["coords"].astype(np.float64).round(3)
+
+
+def map_mol_atoms_to_pdbqt(mol, pdbqt_coords, tolerance=0.5):
+    """
+    Map RDKit atom indices onto atoms of the PDBQT prepared from the molecule
+
+    PDBQT writers reorder atoms and drop non-polar hydrogens, but keep the
+    coordinates, so atoms are matched by position. Vina keeps the input
+    atom order in its output, so the mapping also applies to every pose.
+
+    Args:
+        mol: RDKit molecule with the conformer the PDBQT was written from
+        pdbqt_coords (ndarray): PDBQT atom coordinates, shape (n_atoms, 3)
+        tolerance (float): Maximum distance in Angstroms for a match
+
+    Returns:
+        ndarray: PDBQT atom index for each RDKit atom, -1 where unmatched
+    """
+    if mol is None or mol.GetNumConformers() == 0 or len(pdbqt_coords) == 0:
+        return np.full(mol.GetNumAtoms() if mol is not None else 0, -1, dtype=np.int64)
+
+    mol_coords = mol.GetConformer().GetPositions()
+    deltas = mol_coords[:, None, :] - pdbqt_coords[None, :, :]
+    distances = np.sqrt((deltas**2).sum(axis=2))
+
+    nearest = distances.argmin(axis=1)
+    matched = distances[np.arange(len(mol_coords)), nearest] <= tolerance
+    return np.where(matched, nearest, -1)
+
+
+def reactive_pose_atoms(warhead_result, atom_map):
+    """
+    Collect the pose atom indices of all reactive warhead atoms
+
+    Args:
+        warhead_result (dict): Output of WarheadDetector.detect_warheads
+        atom_map (ndarray): RDKit atom index -> pose atom index
+
+    Returns:
+        ndarray: Sorted unique pose atom indices (empty if none could be mapped)
+    """
+    mol_indices = set()
+    for warhead in warhead_result.get("warheads", []):
+        matches = warhead.get("reactive_atom_indices") or warhead.get("atom_indices", [])
+        for match in matches:
+            mol_indices.update(match)
+
+    mol_indices = np.array(sorted(i for i in mol_indices if i < len(atom_map)), dtype=np.int64)
+    if len(mol_indices) == 0:
+        return mol_indices
+
+    pose_indices = atom_map[mol_indices]
+    return np.unique(pose_indices[pose_indices >= 0])
+
+
+def warhead_cysteine_distances(pose_coords, warhead_atoms, sg_coords):
+    """
+    Distances from the reactive warhead atoms to cysteine SG atoms
+
+    Computed for all poses and all cysteines in one batched operation.
+
+    Args:
+        pose_coords (ndarray): Pose coordinates, shape (n_poses, n_atoms, 3)
+        warhead_atoms (ndarray): Pose atom indices of the reactive atoms;
+            if empty, every atom of the pose is used
+        sg_coords (ndarray): SG coordinates, shape (n_cysteines, 3)
+
+    Returns:
+        ndarray: Closest warhead atom distance, shape (n_poses, n_cysteines)
+    """
+    pose_coords = np.asarray(pose_coords, dtype=np.float64)
+    sg_coords = np.atleast_2d(np.asarray(sg_coords, dtype=np.float64))
+
+    if len(warhead_atoms):
+        pose_coords = pose_coords[:, warhead_atoms, :]
+
+    # (poses, atoms, 1, 3) - (1, 1, cysteines, 3) -> (poses, atoms, cysteines)
+    deltas = pose_coords[:, :, None, :] - sg_coords[None, None, :, :]
+    distances = np.sqrt((deltas**2).sum(axis=3))
+    return distances.min(axis=1)
@@ -0,0 +1,95 @@
+import numpy as np
+
+# Warheads further than this from the cysteine are never predicted to react
+MAX_COVALENT_DISTANCE = 8.0
+
+
+def step_score(affinities, distances):
+    """
+    Step-function covalent score
+
+    The distance to the cysteine selects a fixed penalty factor and the
+    affinity is scaled linearly between -4 and -10 kcal/mol.
+
+    Args:
+        affinities (ndarray): Docking affinities in kcal/mol
+        distances (ndarray): Warhead-cysteine distances in Angstroms
+
+    Returns:
+        ndarray: Scores between 0 and 10, higher is better
+    """
+    distance_factor = np.select(
+        [distances < 3.5, distances < 5.0, distances < 7.0],
+        [1.0, 0.8, 0.4],
+        default=0.1,
+    )
+
+    # Affinity contribution (negative scores are better)
+    affinity_component = np.clip((-affinities - 4) / 6, 0.0, 1.0)
+
+    return affinity_component * distance_factor * 10
+
+
+def sigmoid_score(affinities, distances):
+    """
+    Sigmoid covalent score
+
+    A logistic distance term centred on 4 Angstroms multiplied by an
+    exponential affinity term.
+
+    Args:
+        affinities (ndarray): Docking affinities in kcal/mol
+        distances (ndarray): Warhead-cysteine distances in Angstroms
+
+    Returns:
+        ndarray: Unbounded positive scores, higher is better
+    """
+    distance_factor = 1.0 / (1.0 + np.exp((distances - 4.0) * 2.0))
+    affinity_factor = np.exp(-affinities / 2.0)
+    return distance_factor * affinity_factor * 10.0
+
+
+# Scoring functions by name, with the score above which a pose with a
+# warhead is predicted to bind covalently
+SCORING_FUNCTIONS = {
+    "step": (step_score, 4.0),
+    "sigmoid": (sigmoid_score, 150.0),
+}
+
+
+def score_covalent(affinities, distances, has_warhead, scoring="step", threshold=None):
+    """
+    Score and classify poses for covalent binding in one vectorized call
+
+    Args:
+        affinities (array-like): Docking affinities in kcal/mol
+        distances (array-like): Warhead-cysteine distances in Angstroms
+        has_warhead (bool or array-like): Whether each molecule has a warhead;
+            broadcast against the other arrays
+        scoring (str): Name of the scoring function in SCORING_FUNCTIONS
+        threshold (float, optional): Score threshold overriding the default
+            of the scoring function
+
+    Returns:
+        tuple: (scores, predictions) where predictions holds "likely" or
+            "unlikely" for each pose
+    """
+    if scoring not in SCORING_FUNCTIONS:
+        raise ValueError(
+            f"Unknown scoring function: {scoring}. "
+            f"Available: {', '.join(sorted(SCORING_FUNCTIONS))}"
+        )
+
+    score_fn, default_threshold = SCORING_FUNCTIONS[scoring]
+    if threshold is None:
+        threshold = default_threshold
+
+    affinities = np.asarray(affinities, dtype=np.float64)
+    distances = np.asarray(distances, dtype=np.float64)
+    has_warhead = np.asarray(has_warhead, dtype=bool)
+
+    scores = score_fn(affinities, distances)
+    likely = has_warhead & (distances <= MAX_COVALENT_DISTANCE) & (scores > threshold)
+    predictions = np.where(likely, "likely", "unlikely")
+
+    return scores, predictions
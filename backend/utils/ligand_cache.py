@@ -0,0 +1,180 @@
+import json
+import os
+import threading
+
+from rdkit import Chem, rdBase
+
+from utils.artifact_cache import CACHE_ROOT, ArtifactCache
+from utils.ligand_prep import CONFORMER_MAX_ITERS, CONFORMER_PRUNE_RMS, LIGAND_CONFORMERS
+
+LIGAND_PDB = "ligand.pdb"
+LIGAND_PDBQT = "ligand.pdbqt"
+LIGAND_MOL = "ligand.mol"
+LIGAND_METADATA = "metadata.json"
+LIGAND_CONFORMERS_SDF = "conformers.sdf"
+
+LIGAND_CACHE_DIR = os.getenv("LIGAND_CACHE_DIR", os.path.join(CACHE_ROOT, "ligands"))
+LIGAND_CACHE_MAX_MB = int(os.getenv("LIGAND_CACHE_MAX_MB", "1024"))
+
+# Preparation recipes. Each recipe is part of the cache key, so changing a
+# parameter automatically invalidates entries prepared the old way.
+OPENBABEL_PREP = {
+    "toolkit": "openbabel",
+    "forcefield": "mmff94",
+    "make3d_steps": 500,
+    "localopt_steps": 500,
+    "charges": "gasteiger",
+    "torsion_tree": True,
+    "pdbqt_writer": "meeko",
+}
+RDKIT_PREP = {
+    "toolkit": "rdkit",
+    "embedding": "etkdg_v3",
+    "random_seed": 42,
+    "conformers": LIGAND_CONFORMERS,
+    "prune_rms": CONFORMER_PRUNE_RMS,
+    "forcefield": "mmff94",
+    "max_iters": CONFORMER_MAX_ITERS,
+    "charges": "gasteiger",
+    "pdbqt_writer": "meeko",
+}
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def canonical_identity(smiles):
+    """
+    Canonicalize a SMILES string
+
+    Args:
+        smiles (str): SMILES string
+
+    Returns:
+        tuple: (canonical_smiles, inchikey), or None if RDKit cannot parse
+            or sanitize it
+    """
+    # BlockLogs restores the previous log state on exit instead of
+    # re-enabling logging that another thread may have switched off
+    with rdBase.BlockLogs():
+        mol = Chem.MolFromSmiles(smiles, sanitize=False)
+        if mol is None:
+            return None
+        try:
+            Chem.SanitizeMol(mol)
+        except Chem.rdchem.MolSanitizeException:
+            return None
+        return Chem.MolToSmiles(mol), Chem.MolToInchiKey(mol)
+
+
+class LigandCache(ArtifactCache):
+    """
+    Store of prepared ligands keyed by canonical SMILES, InChIKey and the
+    preparation recipe.
+
+    Each entry holds the 3D structure as PDB and MOL (the MOL keeps bond
+    orders, so an RDKit molecule can be rebuilt from it) and the PDBQT
+    used for docking.
+    """
+
+    def ligand_key(self, smiles, recipe):
+        """
+        Build the cache key for a ligand
+
+        Args:
+            smiles (str): SMILES string in any valid form
+            recipe (dict): Preparation parameters
+
+        Returns:
+            str: Cache key, or None if the SMILES cannot be canonicalized
+        """
+        identity = canonical_identity(smiles)
+        if identity is None:
+            return None
+        canonical_smiles, inchikey = identity
+        return self.make_key(canonical_smiles, inchikey, **recipe)
+
+    def get_ligand(self, key):
+        """
+        Look up a prepared ligand
+
+        Args:
+            key (str): Cache key from ligand_key()
+
+        Returns:
+            dict: Paths to the cached pdb, pdbqt, mol and conformers files
+                (the last only exists for ensemble recipes), or None on a miss
+        """
+        if key is None:
+            return None
+
+        entry = self.get(key)
+        if entry is None:
+            return None
+
+        paths = self._entry_paths(entry)
+        if not os.path.exists(paths["pdbqt_path"]):
+            return None
+        return paths
+
+    def put_ligand(self, key, smiles, recipe, pdb_path, pdbqt_path, mol_block, conformers=None):
+        """
+        Store a prepared ligand
+
+        Args:
+            key (str): Cache key from ligand_key()
+            smiles (str): SMILES string the ligand was prepared from
+            recipe (dict): Preparation parameters
+            pdb_path (str or bytes): Path to the 3D PDB file, or its content
+            pdbqt_path (str or bytes): Path to the PDBQT file, or its content
+            mol_block (str): MOL block of the 3D structure with hydrogens
+            conformers (str, optional): SDF block of the conformer ensemble,
+                lowest energy first
+
+        Returns:
+            dict: Paths to the cached pdb, pdbqt and mol files
+        """
+        canonical_smiles, inchikey = canonical_identity(smiles)
+        metadata = {
+            "smiles": smiles,
+            "canonical_smiles": canonical_smiles,
+            "inchikey": inchikey,
+            "recipe": recipe,
+        }
+
+        files = {
+            LIGAND_PDB: pdb_path,
+            LIGAND_PDBQT: pdbqt_path,
+            LIGAND_MOL: mol_block.encode("utf-8"),
+            LIGAND_METADATA: json.dumps(metadata, indent=2).encode("utf-8"),
+        }
+        if conformers is not None:
+            files[LIGAND_CONFORMERS_SDF] = conformers.encode("utf-8")
+
+        entry = self.put(key, files)
+        return self._entry_paths(entry)
+
+    @staticmethod
+    def _entry_paths(entry):
+        return {
+            "pdb_path": os.path.join(entry, LIGAND_PDB),
+            "pdbqt_path": os.path.join(entry, LIGAND_PDBQT),
+            "mol_path": os.path.join(entry, LIGAND_MOL),
+            "conformers_path": os.path.join(entry, LIGAND_CONFORMERS_SDF),
+        }
+
+
+def get_ligand_cache():
+    """
+    Get the process-wide ligand cache
+
+    Returns:
+        LigandCache: Shared cache instance
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LigandCache(
+                LIGAND_CACHE_DIR, max_bytes=LIGAND_CACHE_MAX_MB * 1024 * 1024
+            )
+        return _cache
@@ -0,0 +1,134 @@
+import io
+import os
+
+import numpy as np
+from rdkit import Chem
+from rdkit.Chem import AllChem
+
+# Conformers embedded per ligand; the lowest-energy ones are docked
+LIGAND_CONFORMERS = int(os.getenv("LIGAND_CONFORMERS", "10"))
+
+# Conformers closer than this heavy-atom RMSD (Angstroms) count as duplicates
+CONFORMER_PRUNE_RMS = float(os.getenv("CONFORMER_PRUNE_RMS", "0.5"))
+
+# Force-field iterations per conformer
+CONFORMER_MAX_ITERS = 500
+
+
+def mol_to_pdbqt(mol):
+    """
+    Write a ligand as PDBQT text with Meeko, without touching the disk
+
+    Meeko assigns Gasteiger charges and AutoDock atom types, merges
+    non-polar hydrogens and builds the torsion tree from the RDKit bond
+    graph, so no file has to be written and read back by another tool.
+
+    Args:
+        mol: RDKit molecule with explicit hydrogens and a 3D conformer
+
+    Returns:
+        str: PDBQT content with ROOT/BRANCH/TORSDOF records
+    """
+    from meeko import MoleculePreparation, PDBQTWriterLegacy
+
+    setups = MoleculePreparation().prepare(mol)
+    pdbqt, is_ok, error = PDBQTWriterLegacy.write_string(setups[0])
+    if not is_ok:
+        raise ValueError(f"Meeko could not write PDBQT: {error}")
+    return pdbqt
+
+
+def mol_from_molblock(mol_block):
+    """
+    Read a MOL block, keeping its hydrogens and coordinates
+
+    Args:
+        mol_block (str): MOL block, e.g. written by OpenBabel
+
+    Returns:
+        RDKit molecule
+    """
+    mol = Chem.MolFromMolBlock(mol_block, removeHs=False)
+    if mol is None:
+        raise ValueError("RDKit could not read the prepared molecule")
+    return mol
+
+
+def embed_conformers(
+    mol,
+    n_conformers=LIGAND_CONFORMERS,
+    random_seed=42,
+    prune_rms=CONFORMER_PRUNE_RMS,
+    threads=0,
+):
+    """
+    Embed and optimise a conformer ensemble on a set number of threads
+
+    ETKDG embeds all conformers in one call and MMFF optimises them in
+    another, each spread over the given threads by RDKit. Callers that
+    run in parallel workers pass their share of the cores, so the
+    workers do not oversubscribe the machine. Molecules that the
+    distance-geometry start cannot embed are retried from random
+    coordinates, and UFF is used where MMFF has no parameters.
+
+    Args:
+        mol: RDKit molecule with explicit hydrogens; conformers are added to it
+        n_conformers (int): Number of conformers to embed
+        random_seed (int): Seed for reproducible embedding
+        prune_rms (float): Minimum RMSD between kept conformers
+        threads (int): RDKit threads; 0 uses every core (default: 0)
+
+    Returns:
+        tuple: (conf_ids, energies) sorted by energy, lowest first; failed
+            optimisations have infinite energy
+    """
+    params = AllChem.ETKDGv3()
+    params.randomSeed = random_seed
+    params.pruneRmsThresh = prune_rms
+    params.numThreads = threads
+
+    conf_ids = list(AllChem.EmbedMultipleConfs(mol, numConfs=n_conformers, params=params))
+    if not conf_ids:
+        params.useRandomCoords = True
+        conf_ids = list(AllChem.EmbedMultipleConfs(mol, numConfs=n_conformers, params=params))
+    if not conf_ids:
+        raise ValueError("Could not generate 3D coordinates")
+
+    if AllChem.MMFFHasAllMoleculeParams(mol):
+        optimized = AllChem.MMFFOptimizeMoleculeConfs(
+            mol, numThreads=threads, maxIters=CONFORMER_MAX_ITERS
+        )
+    else:
+        optimized = AllChem.UFFOptimizeMoleculeConfs(
+            mol, numThreads=threads, maxIters=CONFORMER_MAX_ITERS
+        )
+
+    # Optimisation returns (-1, -1.0) for conformers the force field could
+    # not be set up for; rank them last instead of first
+    status = np.array([flag for flag, _ in optimized])
+    energies = np.array([energy for _, energy in optimized], dtype=np.float64)
+    energies[status == -1] = np.inf
+    order = np.argsort(energies, kind="stable")
+    return [conf_ids[i] for i in order], energies[order]
+
+
+def conformers_to_sdf(mol, conf_ids, energies):
+    """
+    Write conformers as an SDF block, in the given order
+
+    Args:
+        mol: RDKit molecule holding the conformers
+        conf_ids (list): Conformer IDs to write
+        energies (ndarray): Force-field energy of each conformer
+
+    Returns:
+        str: SDF content with an "energy" property per record
+    """
+    buffer = io.StringIO()
+    writer = Chem.SDWriter(buffer)
+    for conf_id, energy in zip(conf_ids, energies):
+        mol.SetProp("energy", f"{energy:.4f}")
+        writer.write(mol, confId=conf_id)
+    writer.close()
+    mol.ClearProp("energy")
+    return buffer.getvalue()
@@ -0,0 +1,108 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+from utils.artifact_cache import CACHE_ROOT, ArtifactCache
+
+MAP_PREFIX = "grid"
+MAP_METADATA = "metadata.json"
+
+MAP_STORE_DIR = os.getenv("MAP_STORE_DIR", os.path.join(CACHE_ROOT, "maps"))
+MAP_STORE_MAX_MB = int(os.getenv("MAP_STORE_MAX_MB", "4096"))
+
+_store = None
+_store_lock = threading.Lock()
+
+
+class MapStore(ArtifactCache):
+    """
+    Store of Vina affinity maps keyed by receptor content, box and scoring
+    function.
+
+    Maps for a fixed receptor and box are deterministic, so they are
+    computed by the first worker that needs them and loaded from disk by
+    every other worker process afterwards.
+
+    The store shares the cost of computing maps, not the memory they take
+    once loaded. The maps are kept in Vina's text format because the Vina
+    bindings can only take maps through Vina.load_maps(), which parses
+    them into buffers private to each process; there is no way to hand
+    Vina a memory-mapped grid. Each worker therefore holds its own copy of
+    the grids it docks against (bounded by VINA_ENGINE_CACHE_SIZE), and
+    only the files are shared, through the page cache.
+    """
+
+    def map_key(self, receptor_path, center, size, scoring):
+        """
+        Build the store key for a set of maps
+
+        Args:
+            receptor_path (str): Path to the receptor PDBQT file
+            center (tuple): Normalized box center
+            size (tuple): Normalized box edge lengths
+            scoring (str): Vina scoring function
+
+        Returns:
+            str: Store key
+        """
+        return self.make_key(
+            self.file_digest(receptor_path),
+            center=list(center),
+            size=list(size),
+            scoring=scoring,
+        )
+
+    def get_maps(self, key):
+        """
+        Look up stored maps
+
+        Args:
+            key (str): Store key from map_key()
+
+        Returns:
+            str: Map prefix to pass to Vina.load_maps(), or None on a miss
+        """
+        entry = self.get(key)
+        if entry is None:
+            return None
+        return os.path.join(entry, MAP_PREFIX)
+
+    def put_maps(self, key, write_maps, metadata):
+        """
+        Write maps into the store
+
+        Args:
+            key (str): Store key from map_key()
+            write_maps (callable): Called with a map prefix; must write the
+                map files (e.g. Vina.write_maps)
+            metadata (dict): Description of the receptor, box and scoring
+
+        Returns:
+            str: Map prefix of the stored maps
+        """
+        staging = tempfile.mkdtemp(prefix=".maps-", dir=self.cache_dir)
+        try:
+            write_maps(os.path.join(staging, MAP_PREFIX))
+            files = {name: os.path.join(staging, name) for name in os.listdir(staging)}
+            files[MAP_METADATA] = json.dumps(metadata, indent=2).encode("utf-8")
+            entry = self.put(key, files)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+        return os.path.join(entry, MAP_PREFIX)
+
+
+def get_map_store():
+    """
+    Get the process-wide map store
+
+    Returns:
+        MapStore: Shared store instance
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = MapStore(MAP_STORE_DIR, max_bytes=MAP_STORE_MAX_MB * 1024 * 1024)
+        return _store
@@ -1,24 +1,117 @@
+import atexit
+import hashlib
+import itertools
 import logging
+import math
 import os
+import shutil
 import tempfile
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
 from typing import List, Optional, Tuple, Union
 
 import numpy as np
 from openbabel import pybel
+from rdkit import Chem
+
+from utils.ligand_cache import OPENBABEL_PREP, canonical_identity, get_ligand_cache
+from utils.ligand_prep import mol_from_molblock, mol_to_pdbqt
 
 logger = logging.getLogger(__name__)
 
+# Worker processes of the shared preparation pool (defaults to one per
+# core); a request's max_workers only caps how many of them it uses
+MOLECULE_WORKERS = int(os.getenv("MOLECULE_WORKERS", "0")) or os.cpu_count() or 1
+
+# Upper bound on the molecules sent to a worker at once
+MOLECULE_CHUNK_SIZE = int(os.getenv("MOLECULE_CHUNK_SIZE", "16"))
+
+# Pool kept alive between batches so workers start warm
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def molecule_key(smiles: str) -> str:
+    """
+    Stable identifier of a molecule, used to name its prepared files
+
+    The InChIKey is the same in every process and for every way of
+    writing the SMILES, so the same compound always maps to the same
+    files and different compounds never share them.
+
+    Args:
+        smiles (str): SMILES representation of the molecule
+
+    Returns:
+        str: InChIKey, or a digest of the SMILES string if RDKit cannot parse it
+    """
+    identity = canonical_identity(smiles)
+    if identity is not None and identity[1]:
+        return identity[1]
+    return f"molecule_{hashlib.sha256(smiles.encode('utf-8')).hexdigest()[:16]}"
+
+
+def _prepared_paths(output_dir: str, key: str) -> Tuple[str, str]:
+    """PDB and PDBQT paths of a molecule in a directory"""
+    pdb_path = os.path.join(output_dir, f"{key}.pdb")
+    pdbqt_path = os.path.join(output_dir, f"{key}.pdbqt")
+    return pdb_path, pdbqt_path
+
+
+def _is_prepared(pdb_path: str, pdbqt_path: str) -> bool:
+    # The PDBQT is published last, so it marks a complete preparation
+    return os.path.exists(pdbqt_path) and os.path.exists(pdb_path)
+
+
+def _publish_prepared(output_dir: str, key: str, prepare) -> Tuple[str, str]:
+    """
+    Write the PDB and PDBQT files of a molecule atomically
+
+    The files are written into a staging directory and renamed into
+    place, so parallel workers preparing the same compound never expose
+    a partly written file to each other or to readers.
+
+    Args:
+        output_dir (str): Directory to save output files
+        key (str): Molecule key from molecule_key()
+        prepare (callable): Called with staging (pdb_path, pdbqt_path) to write
+
+    Returns:
+        tuple: Final (pdb_path, pdbqt_path)
+    """
+    pdb_path, pdbqt_path = _prepared_paths(output_dir, key)
+    staging = tempfile.mkdtemp(prefix=".staging-", dir=output_dir)
+    try:
+        staged_pdb, staged_pdbqt = _prepared_paths(staging, key)
+        prepare(staged_pdb, staged_pdbqt)
+        os.replace(staged_pdb, pdb_path)
+        os.replace(staged_pdbqt, pdbqt_path)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+    return pdb_path, pdbqt_path
+
 
 def process_smiles(
-    smiles: str, output_dir: str, molecule_name: Optional[str] = None
+    smiles: str,
+    output_dir: str,
+    molecule_name: Optional[str] = None,
+    use_cache: bool = True,
 ) -> dict:
     """
     Process a SMILES string to generate 3D structures and PDBQT files
 
+    Files are named by the molecule's InChIKey. A compound whose files
+    already exist in the output directory is not prepared again, and
+    prepared structures are looked up in the ligand cache next, so a
+    compound that was already prepared skips embedding, optimisation and
+    conversion.
+
     Args:
         smiles (str): SMILES representation of the molecule
         output_dir (str): Directory to save output files
-        molecule_name (str, optional): Name for the molecule. If None, will use a hash of the SMILES
+        molecule_name (str, optional): Name for the molecule. If None, its InChIKey is used
+        use_cache (bool): Whether to use the ligand cache (default: True)
 
     Returns:
         dict: Dictionary with paths to generated files
@@ -26,38 +119,64 @@ def process_smiles(
     try:
         logger.info(f"Processing SMILES: {smiles}")
 
-        # Create molecule from SMILES
-        mol = pybel.readstring("smi", smiles)
-
-        # Generate name if not provided
+        key = molecule_key(smiles)
         if molecule_name is None:
-            molecule_name = f"molecule_{abs(hash(smiles)) % 10000}"
+            molecule_name = key
 
-        # Create output paths
         os.makedirs(output_dir, exist_ok=True)
-        pdb_path = os.path.join(output_dir, f"{molecule_name}.pdb")
-        pdbqt_path = os.path.join(output_dir, f"{molecule_name}.pdbqt")
+        pdb_path, pdbqt_path = _prepared_paths(output_dir, key)
 
-        # Generate 3D coordinates
-        mol.make3D(forcefield="mmff94", steps=500)
+        if _is_prepared(pdb_path, pdbqt_path):
+            logger.info(f"Reused prepared files for {smiles}")
+        else:
+            cache = get_ligand_cache() if use_cache else None
+            cache_key = cache.ligand_key(smiles, OPENBABEL_PREP) if cache else None
+            cached = cache.get_ligand(cache_key) if cache else None
+
+            if cached:
+
+                def prepare(staged_pdb, staged_pdbqt):
+                    shutil.copyfile(cached["pdb_path"], staged_pdb)
+                    shutil.copyfile(cached["pdbqt_path"], staged_pdbqt)
+
+                logger.info(f"Reused cached preparation for {smiles}")
+            else:
 
-        # Add hydrogens
-        mol.addh()
+                def prepare(staged_pdb, staged_pdbqt):
+                    # Create molecule from SMILES
+                    mol = pybel.readstring("smi", smiles)
 
-        # Perform energy minimization
-        mol.localopt(forcefield="mmff94", steps=500)
+                    # Generate 3D coordinates
+                    mol.make3D(forcefield="mmff94", steps=500)
 
-        # Save as PDB
-        mol.write("pdb", pdb_path, overwrite=True)
-        logger.info(f"Saved 3D structure to {pdb_path}")
+                    # Add hydrogens
+                    mol.addh()
 
-        # Convert to PDBQT (for docking)
-        convert_to_pdbqt_ligand(pdb_path, pdbqt_path)
-        logger.info(f"Converted to PDBQT: {pdbqt_path}")
+                    # Perform energy minimization
+                    mol.localopt(forcefield="mmff94", steps=500)
+
+                    # Save as PDB
+                    mol.write("pdb", staged_pdb, overwrite=True)
+
+                    # Convert to PDBQT (for docking) in memory
+                    mol_block = mol.write("mol")
+                    pdbqt = mol_to_pdbqt(mol_from_molblock(mol_block))
+                    with open(staged_pdbqt, "w") as f:
+                        f.write(pdbqt)
+
+                    if cache_key is not None:
+                        cache.put_ligand(
+                            cache_key, smiles, OPENBABEL_PREP, staged_pdb,
+                            pdbqt.encode("utf-8"), mol_block,
+                        )
+
+            _publish_prepared(output_dir, key, prepare)
+            logger.info(f"Saved 3D structure and PDBQT to {pdb_path}, {pdbqt_path}")
 
         return {
             "smiles": smiles,
             "name": molecule_name,
+            "molecule_key": key,
             "pdb_path": pdb_path,
             "pdbqt_path": pdbqt_path,
         }
@@ -67,38 +186,38 @@ def process_smiles(
         raise
 
 
-def process_sdf(sdf_file_path: str, output_dir: str) -> List[dict]:
+def _prepare_sdf_molecule(mol, idx: int, output_dir: str) -> dict:
     """
-    Process an SDF file to generate 3D structures and PDBQT files for each molecule
+    Generate the 3D structure and PDBQT file of one SDF record
 
     Args:
-        sdf_file_path (str): Path to SDF file
+        mol: OpenBabel molecule read from the SDF file
+        idx (int): Position of the record in the file
         output_dir (str): Directory to save output files
 
     Returns:
-        list: List of dictionaries with paths to generated files for each molecule
+        dict: Paths to the generated files, shared by all records of the
+            same compound
     """
-    try:
-        logger.info(f"Processing SDF file: {sdf_file_path}")
-
-        results = []
-        os.makedirs(output_dir, exist_ok=True)
+    # Get molecule name or generate one
+    if mol.title:
+        mol_name = mol.title.replace(" ", "_")
+    else:
+        mol_name = f"molecule_{idx}"
 
-        # Read all molecules from SDF
-        for idx, mol in enumerate(pybel.readfile("sdf", sdf_file_path)):
-            # Get molecule name or generate one
-            if mol.title:
-                mol_name = mol.title.replace(" ", "_")
-            else:
-                mol_name = f"molecule_{idx}"
+    # Clean name (remove special characters)
+    mol_name = "".join(c if c.isalnum() or c == "_" else "_" for c in mol_name)
 
-            # Clean name (remove special characters)
-            mol_name = "".join(c if c.isalnum() or c == "_" else "_" for c in mol_name)
+    # Get SMILES representation; files are named by its InChIKey
+    smiles = mol.write("smi").strip()
+    key = molecule_key(smiles.split("\t")[0])
+    pdb_path, pdbqt_path = _prepared_paths(output_dir, key)
 
-            # Output paths for this molecule
-            pdb_path = os.path.join(output_dir, f"{mol_name}.pdb")
-            pdbqt_path = os.path.join(output_dir, f"{mol_name}.pdbqt")
+    if _is_prepared(pdb_path, pdbqt_path):
+        logger.info(f"Reused prepared files for {mol_name}")
+    else:
 
+        def prepare(staged_pdb, staged_pdbqt):
             # Check if 3D coordinates exist, if not generate them
             if not has_3d_coordinates(mol):
                 logger.info(f"Generating 3D coordinates for {mol_name}")
@@ -111,22 +230,44 @@ def process_sdf(sdf_file_path: str, output_dir: str) -> List[dict]:
             mol.localopt(forcefield="mmff94", steps=500)
 
             # Save as PDB
-            mol.write("pdb", pdb_path, overwrite=True)
+            mol.write("pdb", staged_pdb, overwrite=True)
 
-            # Convert to PDBQT
-            convert_to_pdbqt_ligand(pdb_path, pdbqt_path)
+            # Convert to PDBQT in memory
+            pdbqt = mol_to_pdbqt(mol_from_molblock(mol.write("mol")))
+            with open(staged_pdbqt, "w") as f:
+                f.write(pdbqt)
 
-            # Get SMILES representation
-            smiles = mol.write("smi").strip()
+        _publish_prepared(output_dir, key, prepare)
 
-            results.append(
-                {
-                    "name": mol_name,
-                    "smiles": smiles,
-                    "pdb_path": pdb_path,
-                    "pdbqt_path": pdbqt_path,
-                }
-            )
+    return {
+        "name": mol_name,
+        "smiles": smiles,
+        "molecule_key": key,
+        "pdb_path": pdb_path,
+        "pdbqt_path": pdbqt_path,
+    }
+
+
+def process_sdf(sdf_file_path: str, output_dir: str) -> List[dict]:
+    """
+    Process an SDF file to generate 3D structures and PDBQT files for each molecule
+
+    Args:
+        sdf_file_path (str): Path to SDF file
+        output_dir (str): Directory to save output files
+
+    Returns:
+        list: List of dictionaries with paths to generated files for each molecule
+    """
+    try:
+        logger.info(f"Processing SDF file: {sdf_file_path}")
+
+        results = []
+        os.makedirs(output_dir, exist_ok=True)
+
+        # Read all molecules from SDF
+        for idx, mol in enumerate(pybel.readfile("sdf", sdf_file_path)):
+            results.append(_prepare_sdf_molecule(mol, idx, output_dir))
 
         logger.info(f"Processed {len(results)} molecules from SDF file")
         return results
@@ -136,6 +277,104 @@ def process_sdf(sdf_file_path: str, output_dir: str) -> List[dict]:
         raise
 
 
+def iter_sdf_records(sdf_file):
+    """
+    Read SDF records one at a time
+
+    Args:
+        sdf_file: Binary file object with SDF content
+
+    Yields:
+        str: Text of one record, including its $$$$ terminator
+    """
+    lines = []
+    for line in sdf_file:
+        lines.append(line.decode("utf-8", errors="replace"))
+        if line.startswith(b"$$$$"):
+            yield "".join(lines)
+            lines = []
+
+    # A last record without terminator
+    if any(line.strip() for line in lines):
+        yield "".join(lines)
+
+
+def _process_sdf_chunk(chunk, output_dir):
+    """Prepare a chunk of SDF records inside a worker; errors become results"""
+    results = []
+    for idx, record in chunk:
+        try:
+            mol = pybel.readstring("sdf", record)
+            result = _prepare_sdf_molecule(mol, idx, output_dir)
+        except Exception as e:
+            logger.error(f"Error processing SDF record {idx}: {str(e)}")
+            result = {"name": f"molecule_{idx}", "smiles": "", "error": str(e)}
+        result["index"] = idx
+        results.append(result)
+    return results
+
+
+def stream_process_sdf(
+    sdf_file,
+    output_dir: str,
+    chunk_size: int = MOLECULE_CHUNK_SIZE,
+    max_workers: Optional[int] = None,
+):
+    """
+    Prepare the molecules of an SDF file in parallel, yielding results as they finish
+
+    Records are read incrementally and sent to the warm process pool in
+    fixed-size chunks. Only a few chunks per worker are in flight at a
+    time, so memory stays bounded however large the file is.
+
+    Args:
+        sdf_file: Binary file object with SDF content
+        output_dir (str): Directory to save output files
+        chunk_size (int): Records per chunk (default: MOLECULE_CHUNK_SIZE)
+        max_workers (int, optional): Most chunks in flight at once, i.e.
+            workers of the shared pool this request may occupy
+
+    Yields:
+        dict: One result per record in completion order, with its "index"
+            in the file; failed records have an "error" entry
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    max_pending = _request_workers(max_workers)
+
+    records = enumerate(iter_sdf_records(sdf_file))
+    pending = {}
+
+    def submit_next():
+        chunk = list(itertools.islice(records, chunk_size))
+        if chunk:
+            pool = get_molecule_pool()
+            pending[pool.submit(_process_sdf_chunk, chunk, output_dir)] = (chunk, pool)
+        return bool(chunk)
+
+    while len(pending) < max_pending and submit_next():
+        pass
+
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            chunk, pool = pending.pop(future)
+            try:
+                yield from future.result()
+            except BrokenProcessPool as e:
+                # Report the chunk of the crashed worker; later chunks go
+                # to a fresh pool
+                logger.error(f"Molecule worker failed: {str(e)}")
+                _discard_pool(pool)
+                for idx, _ in chunk:
+                    yield {
+                        "index": idx,
+                        "name": f"molecule_{idx}",
+                        "smiles": "",
+                        "error": f"Molecule worker failed: {str(e)}",
+                    }
+            submit_next()
+
+
 def has_3d_coordinates(mol) -> bool:
     """
     Check if molecule already has 3D coordinates
@@ -166,95 +405,167 @@ def has_3d_coordinates(mol) -> bool:
     return not all(d < 0.1 for d in distances)
 
 
-def convert_to_pdbqt_ligand(
-    pdb_path: str, output_pdbqt_path: Optional[str] = None
-) -> str:
-    """
-    Convert a ligand PDB file to PDBQT format for AutoDock Vina
-
-    Args:
-        pdb_path (str): Path to input PDB file
-        output_pdbqt_path (str, optional): Path to save PDBQT file
+def _init_molecule_worker():
+    """Load OpenBabel force fields and RDKit once per worker process"""
+    mol = pybel.readstring("smi", "CCO")
+    mol.make3D(forcefield="mmff94", steps=1)
+    Chem.MolFromSmiles("CCO")
 
-    Returns:
-        str: Path to PDBQT file
-    """
-    logger = logging.getLogger(__name__)
 
+def _process_one(job):
+    """Prepare one molecule inside a worker; errors become the result"""
+    index, smiles, name, output_dir = job
     try:
-        # If no output path specified, create one
-        if output_pdbqt_path is None:
-            base_name = os.path.splitext(os.path.basename(pdb_path))[0]
-            output_pdbqt_path = f"{base_name}_ligand.pdbqt"
+        return process_smiles(smiles, output_dir, name)
+    except Exception as e:
+        logger.error(f"Error processing SMILES {smiles}: {str(e)}")
+        return {"smiles": smiles, "name": name or f"molecule_{index}", "error": str(e)}
 
-        logger.info(f"Converting ligand to PDBQT: {pdb_path}")
 
-        # Check if file exists
-        if not os.path.exists(pdb_path):
-            raise FileNotFoundError(f"Input PDB file not found: {pdb_path}")
+def get_molecule_pool():
+    """
+    Get the warm process pool used for batch preparation
 
-        # Use OpenBabel to convert PDB to PDBQT format for a ligand
-        mol = next(pybel.readfile("pdb", pdb_path))
+    The pool is created on first use with MOLECULE_WORKERS processes and
+    kept for later batches, so workers pay the OpenBabel/RDKit start-up
+    cost only once. Requests share it whatever their max_workers.
 
-        # Add hydrogens if missing
-        mol.addh()
+    Returns:
+        ProcessPoolExecutor: Shared pool
+    """
+    global _pool
 
-        # Compute Gasteiger charges - required for AutoDock
-        pybel.ob.OBChargeModel.FindType("gasteiger").ComputeCharges(mol.OBMol)
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=MOLECULE_WORKERS, initializer=_init_molecule_worker
+            )
+        return _pool
 
-        # Set AutoDock atom types
-        mol.OBMol.AddPolarHydrogens()
-        pybel.ob.OBAromaticTyper().AssignAromaticFlags(mol.OBMol)
 
-        # This is important for ligands - set up all rotatable bonds
-        # PDBQT format needs TORSDOF records for ligands
-        conv = pybel.ob.OBConversion()
-        conv.SetOutFormat("pdbqt")
-        conv.AddOption("x", pybel.ob.OBConversion.OUTOPTIONS)  # Rigid fragment
-        conv.AddOption("r", pybel.ob.OBConversion.OUTOPTIONS)  # Root atom detection
+def _request_workers(max_workers=None):
+    """Workers of the shared pool a request may use at once"""
+    return max(1, min(max_workers or MOLECULE_WORKERS, MOLECULE_WORKERS))
 
-        # Write to PDBQT file
-        conv.WriteFile(mol.OBMol, output_pdbqt_path)
 
-        logger.info(f"Successfully converted ligand to PDBQT: {output_pdbqt_path}")
-        return output_pdbqt_path
+def _discard_pool(pool):
+    """Drop a broken pool so the next batch starts a fresh one"""
+    global _pool
+    with _pool_lock:
+        if _pool is pool:
+            _pool = None
+    pool.shutdown(wait=False)
 
-    except FileNotFoundError as e:
-        logger.error(f"File error: {str(e)}")
-        raise
-    except StopIteration:
-        logger.error(f"Could not read PDB file or file is empty: {pdb_path}")
-        raise ValueError(f"Invalid or empty PDB file: {pdb_path}")
-    except Exception as e:
-        logger.error(f"Error converting to PDBQT: {str(e)}")
-        raise
+
+@atexit.register
+def _shutdown_pool():
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
 
 
 def batch_process_smiles(
-    smiles_list: List[str], output_dir: str, names: Optional[List[str]] = None
+    smiles_list: List[str],
+    output_dir: str,
+    names: Optional[List[str]] = None,
+    max_workers: Optional[int] = None,
 ) -> List[dict]:
     """
     Process multiple SMILES strings
 
+    Inputs are deduplicated by InChIKey first, so a compound listed many
+    times is prepared once and every entry shares its files. The unique
+    molecules are prepared in parallel on a warm process pool and sent
+    to the workers in chunks; results come back in input order.
+
     Args:
         smiles_list (list): List of SMILES strings
         output_dir (str): Directory to save output files
         names (list, optional): List of names for the molecules
+        max_workers (int, optional): Most workers of the shared pool used
+            at once; 1 prepares the molecules in this process
 
     Returns:
-        list: List of dictionaries with paths to generated files
+        list: List of dictionaries with paths to generated files. Failed
+            molecules have an "error" entry and do not affect the others.
     """
-    results = []
+    keys = [molecule_key(smiles) for smiles in smiles_list]
+
+    # One job per compound, for its first occurrence
+    first = {}
+    for i, key in enumerate(keys):
+        first.setdefault(key, i)
+    jobs = [(i, smiles_list[i], None, output_dir) for i in first.values()]
 
-    for i, smiles in enumerate(smiles_list):
+    workers = _request_workers(max_workers)
+    if workers == 1 or len(jobs) <= 1:
+        prepared = [_process_one(job) for job in jobs]
+    else:
+        prepared = _process_on_pool(jobs, workers)
+
+    by_key = dict(zip(first, prepared))
+    results = []
+    for i, (smiles, key) in enumerate(zip(smiles_list, keys)):
         name = names[i] if names and i < len(names) else None
-        try:
-            result = process_smiles(smiles, output_dir, name)
-            results.append(result)
-        except Exception as e:
-            logger.error(f"Error processing SMILES {smiles}: {str(e)}")
-            results.append(
-                {"smiles": smiles, "name": name or f"molecule_{i}", "error": str(e)}
-            )
+        results.append({**by_key[key], "smiles": smiles, "name": name or key})
+    return results
+
+
+def _process_jobs(jobs):
+    """Prepare a chunk of jobs inside a worker"""
+    return [_process_one(job) for job in jobs]
+
+
+def _process_on_pool(jobs, workers):
+    """
+    Prepare jobs on the warm pool, in order
+
+    At most one chunk per allowed worker is in flight, so a request with
+    a small max_workers leaves the rest of the shared pool to others. A
+    crashed worker fails the molecules left unfinished, not the batch.
+
+    Args:
+        jobs (list): (index, smiles, name, output_dir) tuples
+        workers (int): Most chunks in flight at once
+
+    Returns:
+        list: One result per job, in order
+    """
+    # Several chunks per worker keep the load balanced
+    chunk_size = max(1, min(MOLECULE_CHUNK_SIZE, math.ceil(len(jobs) / (workers * 4))))
+    starts = iter(range(0, len(jobs), chunk_size))
+    pool = get_molecule_pool()
+
+    results = [None] * len(jobs)
+    pending = {}
+
+    def submit_next():
+        start = next(starts, None)
+        if start is not None:
+            pending[pool.submit(_process_jobs, jobs[start:start + chunk_size])] = start
+        return start is not None
+
+    try:
+        while len(pending) < workers and submit_next():
+            pass
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                start = pending.pop(future)
+                chunk_results = future.result()
+                results[start:start + len(chunk_results)] = chunk_results
+                submit_next()
+    except BrokenProcessPool as e:
+        # A crashed worker breaks the pool; report the molecules left
+        # unfinished instead of failing the whole batch
+        logger.error(f"Molecule worker failed: {str(e)}")
+        _discard_pool(pool)
+        for j, (i, smiles, name, _) in enumerate(jobs):
+            if results[j] is None:
+                results[j] = {
+                    "smiles": smiles,
+                    "name": name or f"molecule_{i}",
+                    "error": f"Molecule worker failed: {str(e)}",
+                }
 
     return results
@@ -1,10 +1,22 @@
 import os
-import tempfile
+
+from utils.structure_stream import (
+    atom_records,
+    renumber,
+    strip_hydrogens,
+    structure_base_name,
+    structure_lines,
+)
 
 def clean_pdb_for_docking(pdb_path):
     """
     Clean a PDB file to make it suitable for docking with AutoDock Vina
     
+    Keeps ATOM and HETATM records without hydrogens and drops all other
+    records (CONECT, COMPND, etc.); TER records are written at chain breaks.
+    Records are filtered one line at a time, so gzip-compressed PDB and
+    mmCIF input are cleaned in constant memory.
+    
     Args:
         pdb_path (str): Path to the PDB file to clean
         
@@ -15,38 +27,17 @@ def clean_pdb_for_docking(pdb_path):
         return None
         
     try:
-        with open(pdb_path, 'r') as f:
-            pdb_lines = f.readlines()
-            
-        # Filter out problematic lines
-        clean_lines = []
-        for line in pdb_lines:
-            # Keep ATOM records
-            if line.startswith('ATOM'):
-                # Skip hydrogen atoms (element type H)
-                if len(line) >= 78 and line[76:78].strip() == 'H':
-                    continue
-                clean_lines.append(line)
-            # Keep HETATM records
-            elif line.startswith('HETATM'):
-                # Skip hydrogen atoms (element type H)
-                if len(line) >= 78 and line[76:78].strip() == 'H':
-                    continue
-                clean_lines.append(line)
-            # Keep TER records
-            elif line.startswith('TER'):
-                clean_lines.append(line)
-            # Skip all other records (CONECT, COMPND, etc.)
-                
-        # Add END record if not present
-        if not any(line.startswith('END') for line in clean_lines):
-            clean_lines.append('END\n')
+        lines = renumber(strip_hydrogens(atom_records(structure_lines(pdb_path))))
             
         # Write cleaned PDB file
-        cleaned_path = pdb_path.replace('.pdb', '_docking_ready.pdb')
-        with open(cleaned_path, 'w') as f:
-            f.writelines(clean_lines)
-            
+        cleaned_path = os.path.join(
+            os.path.dirname(pdb_path),
+            f"{structure_base_name(pdb_path)}_docking_ready.pdb",
+        )
+        with open(cleaned_path, "w") as f:
+            for line in lines:
+                f.write(line + "\n")
+            f.write("END\n")
         return cleaned_path
     except Exception as e:
         print(f"Error cleaning PDB file: {str(e)}")
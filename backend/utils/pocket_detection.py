@@ -0,0 +1,186 @@
+import numpy as np
+from scipy import ndimage
+from scipy.spatial import cKDTree
+
+# Grid spacing in Angstroms; coarsened for very large structures so the
+# grid never exceeds MAX_GRID_POINTS
+GRID_SPACING = 1.0
+MAX_GRID_POINTS = 4_000_000
+
+# A grid point is empty if no heavy atom centre is within this distance
+POCKET_CLEARANCE = 3.0
+
+# A point is buried if protein is hit along at least this many of the 14
+# scan directions within SCAN_DISTANCE Angstroms
+BURIED_DIRECTIONS = 10
+SCAN_DISTANCE = 8.0
+
+# Clusters with fewer points are noise, not pockets
+MIN_POCKET_POINTS = 10
+
+# A pocket belongs to a cysteine if it comes within this distance of SG
+POCKET_SEARCH_RADIUS = 8.0
+
+# Box edges are rounded up to BOX_STEP so similar boxes share grid maps
+BOX_STEP = 2.0
+MIN_BOX_SIZE = 12.0
+MAX_BOX_SIZE = 30.0
+
+# Largest heavy-atom distance of the ligand in Angstroms, assumed when
+# the ligand is not known, and its bounds
+DEFAULT_LIGAND_EXTENT = 10.0
+MIN_LIGAND_EXTENT = 6.0
+MAX_LIGAND_EXTENT = 16.0
+
+# 6 axis and 8 body-diagonal scan directions
+_DIRECTIONS = np.array(
+    [d for d in np.ndindex(3, 3, 3) if np.count_nonzero(np.array(d) - 1) in (1, 3)]
+) - 1
+
+
+def _shift(grid, offset):
+    """grid[i + offset], False outside the grid"""
+    out = np.zeros_like(grid)
+    src, dst = [], []
+    for o, n in zip(offset, grid.shape):
+        if o >= 0:
+            src.append(slice(o, n))
+            dst.append(slice(0, n - o))
+        else:
+            src.append(slice(0, n + o))
+            dst.append(slice(-o, n))
+    out[tuple(dst)] = grid[tuple(src)]
+    return out
+
+
+def detect_pockets(coords, spacing=GRID_SPACING):
+    """
+    Find pockets as clusters of buried empty grid points
+
+    A grid is laid over the protein. Points away from all atoms are
+    empty; an empty point is buried when protein lies ahead of it along
+    most scan directions. Buried empty points are clustered by
+    connectivity and small clusters are dropped.
+
+    Args:
+        coords (ndarray): Heavy atom coordinates, shape (n_atoms, 3)
+        spacing (float): Grid spacing in Angstroms (default: 1.0)
+
+    Returns:
+        tuple: (points, labels) with pocket point coordinates of shape
+            (n_points, 3) and the pocket of each point; pocket 0 is the
+            largest
+    """
+    coords = np.asarray(coords, dtype=np.float64)
+    if len(coords) == 0:
+        return np.zeros((0, 3)), np.zeros(0, dtype=np.int64)
+
+    origin = coords.min(axis=0)
+    extent = coords.max(axis=0) - origin
+    spacing = max(spacing, (np.prod(extent + spacing) / MAX_GRID_POINTS) ** (1 / 3))
+    shape = tuple(np.floor(extent / spacing).astype(int) + 1)
+
+    axes = [origin[i] + spacing * np.arange(shape[i]) for i in range(3)]
+    grid_points = np.stack(np.meshgrid(*axes, indexing="ij"), axis=-1).reshape(-1, 3)
+
+    distances, _ = cKDTree(coords).query(
+        grid_points, k=1, distance_upper_bound=POCKET_CLEARANCE
+    )
+    empty = np.isinf(distances).reshape(shape)
+    occupied = ~empty
+
+    # Count directions along which protein is met within the scan distance
+    buried_count = np.zeros(shape, dtype=np.int8)
+    for direction in _DIRECTIONS:
+        n_steps = int(np.ceil(SCAN_DISTANCE / (spacing * np.linalg.norm(direction))))
+        hit = np.zeros(shape, dtype=bool)
+        for step in range(1, n_steps + 1):
+            hit |= _shift(occupied, direction * step)
+        buried_count += hit
+
+    candidates = empty & (buried_count >= BURIED_DIRECTIONS)
+    labels, n_labels = ndimage.label(candidates)
+    if n_labels == 0:
+        return np.zeros((0, 3)), np.zeros(0, dtype=np.int64)
+
+    # Relabel by decreasing size, dropping clusters that are too small
+    sizes = np.bincount(labels.ravel())[1:]
+    order = np.argsort(-sizes, kind="stable")
+    keep = order[sizes[order] >= MIN_POCKET_POINTS]
+    relabel = np.full(n_labels + 1, -1, dtype=np.int64)
+    relabel[keep + 1] = np.arange(len(keep))
+
+    flat_labels = relabel[labels.ravel()]
+    selected = flat_labels >= 0
+    return grid_points[selected], flat_labels[selected]
+
+
+def ligand_extent(mol):
+    """
+    Largest heavy-atom distance of a ligand
+
+    Args:
+        mol: RDKit molecule with a conformer
+
+    Returns:
+        float: Extent in Angstroms, clipped to a sensible range
+    """
+    if mol is None or mol.GetNumConformers() == 0:
+        return DEFAULT_LIGAND_EXTENT
+
+    positions = mol.GetConformer().GetPositions()
+    heavy = np.array([atom.GetAtomicNum() > 1 for atom in mol.GetAtoms()])
+    positions = positions[heavy] if heavy.any() else positions
+
+    deltas = positions[:, None, :] - positions[None, :, :]
+    extent = np.sqrt((deltas**2).sum(axis=2)).max()
+    return float(np.clip(extent, MIN_LIGAND_EXTENT, MAX_LIGAND_EXTENT))
+
+
+def fit_docking_box(points, labels, anchor=None, extent=DEFAULT_LIGAND_EXTENT):
+    """
+    Tightest docking box covering a pocket
+
+    With an anchor (a cysteine SG), the box covers the part of the
+    closest pocket that a ligand bound at the anchor can reach (within
+    its extent) plus the anchor itself; without one, the largest pocket.
+    A margin of a quarter of the ligand extent is added on every side.
+
+    Args:
+        points (ndarray): Pocket point coordinates, shape (n_points, 3)
+        labels (ndarray): Pocket of each point
+        anchor (sequence, optional): (x, y, z) the pocket has to be next to
+        extent (float): Ligand extent in Angstroms, from ligand_extent()
+
+    Returns:
+        tuple: (center, size) as 3-tuples, or None if no suitable pocket
+    """
+    if len(points) == 0:
+        return None
+
+    if anchor is None:
+        selected = points[labels == 0]
+    else:
+        anchor = np.asarray(anchor, dtype=np.float64)
+        distances = np.linalg.norm(points - anchor, axis=1)
+        nearest = distances.argmin()
+        if distances[nearest] > POCKET_SEARCH_RADIUS:
+            return None
+
+        in_pocket = (labels == labels[nearest]) & (distances <= extent)
+        selected = np.vstack([points[in_pocket], anchor])
+
+    margin = extent / 4.0
+    low = selected.min(axis=0) - margin
+    high = selected.max(axis=0) + margin
+
+    size = np.ceil((high - low) / BOX_STEP) * BOX_STEP
+    size = np.clip(size, MIN_BOX_SIZE, MAX_BOX_SIZE)
+    center = (low + high) / 2.0
+
+    # A capped box must still reach the anchor
+    if anchor is not None:
+        reach = size / 2.0 - margin
+        center = np.clip(center, anchor - reach, anchor + reach)
+
+    return tuple(np.round(center, 3).tolist()), tuple(size.tolist())
@@ -0,0 +1,121 @@
+import numpy as np
+
+
+class PoseSet:
+    """
+    Docking poses parsed from Vina PDBQT output into NumPy arrays.
+
+    All poses of one Vina run share the same atoms in the same order, so
+    coordinates are stored as a single (n_poses, n_atoms, 3) array.
+
+    Attributes:
+        modes (ndarray): Pose numbers, shape (n_poses,)
+        affinities (ndarray): Vina affinities in kcal/mol, shape (n_poses,)
+        rmsd_lb (ndarray): RMSD lower bound to the best pose, shape (n_poses,)
+        rmsd_ub (ndarray): RMSD upper bound to the best pose, shape (n_poses,)
+        coords (ndarray): Atom coordinates, shape (n_poses, n_atoms, 3)
+        atom_names (ndarray): PDB atom names, shape (n_atoms,)
+        atom_types (ndarray): AutoDock atom types, shape (n_atoms,)
+        blocks (list): PDBQT text of each pose, MODEL to ENDMDL
+    """
+
+    def __init__(self, modes, affinities, rmsd_lb, rmsd_ub, coords, atom_names, atom_types, blocks):
+        self.modes = modes
+        self.affinities = affinities
+        self.rmsd_lb = rmsd_lb
+        self.rmsd_ub = rmsd_ub
+        self.coords = coords
+        self.atom_names = atom_names
+        self.atom_types = atom_types
+        self.blocks = blocks
+
+    def __len__(self):
+        return len(self.modes)
+
+
+def parse_vina_poses(pdbqt_text):
+    """
+    Parse multi-model Vina output in a single pass
+
+    Args:
+        pdbqt_text (str): Content of a Vina output PDBQT file
+
+    Returns:
+        PoseSet: Parsed poses
+    """
+    modes = []
+    scores = []
+    blocks = []
+    coord_fields = []
+    atom_names = []
+    atom_types = []
+    atoms_per_pose = []
+
+    mode = None
+    score = (np.nan, np.nan, np.nan)
+    block = []
+    n_atoms = 0
+
+    for line in pdbqt_text.splitlines(keepends=True):
+        record = line[:6]
+
+        if record.startswith("MODEL"):
+            mode = int(line.split()[1])
+            score = (np.nan, np.nan, np.nan)
+            block = [line]
+            n_atoms = 0
+            continue
+
+        if mode is None:
+            continue
+
+        block.append(line)
+
+        if record in ("ATOM  ", "HETATM"):
+            # Fixed columns can touch for large values, so slice before splitting
+            coord_fields.append(f"{line[30:38]} {line[38:46]} {line[46:54]}")
+            if not atoms_per_pose:
+                atom_names.append(line[12:16].strip())
+                atom_types.append(line[77:79].strip())
+            n_atoms += 1
+        elif line.startswith("REMARK VINA RESULT:"):
+            values = line.split(":", 1)[1].split()
+            score = tuple(float(v) for v in values[:3])
+        elif record.startswith("ENDMDL"):
+            modes.append(mode)
+            scores.append(score)
+            blocks.append("".join(block))
+            atoms_per_pose.append(n_atoms)
+            mode = None
+
+    if atoms_per_pose and len(set(atoms_per_pose)) != 1:
+        raise ValueError("Poses in Vina output have different atom counts")
+
+    n_atoms = atoms_per_pose[0] if atoms_per_pose else 0
+    coords = np.array(" ".join(coord_fields).split(), dtype=np.float64)
+    scores = np.array(scores, dtype=np.float64).reshape(-1, 3)
+
+    return PoseSet(
+        modes=np.array(modes, dtype=np.int64),
+        affinities=scores[:, 0],
+        rmsd_lb=scores[:, 1],
+        rmsd_ub=scores[:, 2],
+        coords=coords.reshape(len(modes), n_atoms, 3),
+        atom_names=np.array(atom_names),
+        atom_types=np.array(atom_types),
+        blocks=blocks,
+    )
+
+
+def read_vina_poses(pdbqt_path):
+    """
+    Parse a Vina output PDBQT file
+
+    Args:
+        pdbqt_path (str): Path to Vina output file
+
+    Returns:
+        PoseSet: Parsed poses
+    """
+    with open(pdbqt_path, "r") as f:
+        return parse_vina_poses(f.read())
@@ -0,0 +1,109 @@
+import os
+import threading
+
+from utils.artifact_cache import CACHE_ROOT, ArtifactCache
+from utils.receptor_index import ReceptorIndex, index_path_for
+
+RECEPTOR_PDB = "receptor.pdb"
+RECEPTOR_PDBQT = "receptor.pdbqt"
+RECEPTOR_INDEX = os.path.basename(index_path_for(RECEPTOR_PDBQT))
+
+RECEPTOR_CACHE_DIR = os.getenv(
+    "RECEPTOR_CACHE_DIR", os.path.join(CACHE_ROOT, "receptors")
+)
+RECEPTOR_CACHE_MAX_MB = int(os.getenv("RECEPTOR_CACHE_MAX_MB", "2048"))
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+class ReceptorCache(ArtifactCache):
+    """
+    Cache of prepared receptors keyed by the SHA-256 of the source
+    structure plus the options used to make the PDBQT from it.
+
+    Each entry holds the PDBQT, the source PDB if there is one, and the
+    receptor's spatial index and pockets, built once at preparation time.
+    """
+
+    def receptor_key(self, structure_path, **options):
+        """
+        Build the cache key for a receptor
+
+        Args:
+            structure_path (str): Path to the cleaned PDB file, or to the
+                PDBQT a cropped receptor is cut from
+            **options: Conversion options
+
+        Returns:
+            str: Cache key
+        """
+        return self.make_key(self.file_digest(structure_path), **options)
+
+    def get_receptor(self, key):
+        """
+        Look up a prepared receptor
+
+        Args:
+            key (str): Cache key from receptor_key()
+
+        Returns:
+            str: Path to the cached PDBQT file, or None on a miss
+        """
+        entry = self.get(key)
+        if entry is None:
+            return None
+
+        pdbqt_path = os.path.join(entry, RECEPTOR_PDBQT)
+        return pdbqt_path if os.path.exists(pdbqt_path) else None
+
+    def put_receptor(self, key, pdb_path, pdbqt_path, index=None):
+        """
+        Store a prepared receptor
+
+        Args:
+            key (str): Cache key from receptor_key()
+            pdb_path (str): Path to the source PDB file, or None if the
+                PDBQT was not made from one (e.g. a cropped receptor)
+            pdbqt_path (str): Path to the PDBQT file
+            index (ReceptorIndex, optional): Index of the receptor, e.g. the
+                one saved during protein preparation; built if not given
+
+        Returns:
+            str: Path to the cached PDBQT file
+        """
+        if index is None:
+            index = ReceptorIndex.from_structure(pdb_path or pdbqt_path)
+
+        # Detect pockets now so they are stored with the entry
+        index.pockets
+
+        sources = [path for path in (pdb_path, pdbqt_path) if path]
+        index_path = index_path_for(pdbqt_path)
+        index.save(index_path, sources)
+
+        files = {RECEPTOR_PDBQT: pdbqt_path, RECEPTOR_INDEX: index_path}
+        if pdb_path:
+            files[RECEPTOR_PDB] = pdb_path
+        try:
+            entry = self.put(key, files)
+        finally:
+            os.remove(index_path)
+
+        return os.path.join(entry, RECEPTOR_PDBQT)
+
+
+def get_receptor_cache():
+    """
+    Get the process-wide receptor cache
+
+    Returns:
+        ReceptorCache: Shared cache instance
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ReceptorCache(
+                RECEPTOR_CACHE_DIR, max_bytes=RECEPTOR_CACHE_MAX_MB * 1024 * 1024
+            )
+        return _cache
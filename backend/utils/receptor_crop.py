@@ -0,0 +1,60 @@
+import numpy as np
+
+from utils.structure_io import read_atoms, write_atoms
+
+
+def residues_near_box(atoms, center, size, distance):
+    """
+    Select whole residues with any atom within a distance of a box
+
+    Args:
+        atoms (ndarray): Atoms with dtype structure_io.ATOM_DTYPE
+        center (sequence): Box center (x, y, z)
+        size (sequence): Box edge lengths (x, y, z)
+        distance (float): Maximum distance from the box in Angstroms
+
+    Returns:
+        ndarray: Boolean mask over the atoms
+    """
+    if len(atoms) == 0:
+        return np.zeros(0, dtype=bool)
+
+    # Distance from each atom to the box surface (0 inside the box)
+    outside = np.abs(atoms["coords"] - np.asarray(center)) - np.asarray(size) / 2.0
+    near = np.linalg.norm(np.maximum(outside, 0.0), axis=1) <= distance
+
+    residues = np.rec.fromarrays([atoms["chain"], atoms["resseq"], atoms["icode"]])
+    _, residue_ids = np.unique(residues, return_inverse=True)
+    residue_ids = residue_ids.ravel()
+
+    keep_residue = np.bincount(residue_ids, weights=near) > 0
+    return keep_residue[residue_ids]
+
+
+def crop_receptor(structure_path, output_path, center, size, distance):
+    """
+    Write the part of a receptor around a docking box
+
+    Whole residues are kept so no side chain is cut; a TER record is
+    written wherever the kept residues leave a gap in the chain.
+
+    Args:
+        structure_path (str): Path to the receptor PDB or PDBQT file
+        output_path (str): Path of the cropped file (same format)
+        center (sequence): Box center (x, y, z)
+        size (sequence): Box edge lengths (x, y, z)
+        distance (float): Maximum distance from the box in Angstroms
+
+    Returns:
+        tuple: (output_path, kept_atoms, total_atoms)
+    """
+    atoms = read_atoms(structure_path)
+    kept = atoms[residues_near_box(atoms, center, size, distance)]
+
+    write_atoms(
+        kept,
+        output_path,
+        pdbqt=structure_path.lower().endswith(".pdbqt"),
+        break_on_gaps=True,
+    )
+    return output_path, len(kept), len(atoms)
@@ -0,0 +1,319 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from utils.artifact_cache import hash_file
+from utils.pocket_detection import detect_pockets
+from utils.structure_io import read_atoms
+
+# Number of receptor indexes kept in memory per process
+RECEPTOR_INDEX_CACHE_SIZE = int(os.getenv("RECEPTOR_INDEX_CACHE_SIZE", "8"))
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def index_path_for(structure_path):
+    """
+    Path of the persisted index belonging to a structure file
+
+    Args:
+        structure_path (str): Path to a PDB or PDBQT file
+
+    Returns:
+        str: Path of the .index.npz file next to it
+    """
+    return os.path.splitext(structure_path)[0] + ".index.npz"
+
+
+class ReceptorIndex:
+    """
+    Spatial index over the atoms of a receptor.
+
+    Holds (chain, resnum, atom name) -> coordinate lookups and a KD-tree
+    over all atoms, so cysteine lookup, box centering and neighbourhood
+    queries do not have to re-read the structure file. Pockets detected
+    on the receptor are stored with it.
+    """
+
+    def __init__(
+        self,
+        coords,
+        chains,
+        resnums,
+        resnames,
+        atom_names,
+        elements=None,
+        pocket_points=None,
+        pocket_labels=None,
+        structure_digests=None,
+    ):
+        """
+        Build the index from per-atom arrays
+
+        Args:
+            coords (ndarray): Atom coordinates, shape (n_atoms, 3)
+            chains (ndarray): Chain identifiers
+            resnums (ndarray): Residue sequence numbers
+            resnames (ndarray): Residue names
+            atom_names (ndarray): Atom names
+            elements (ndarray, optional): Element symbols; guessed from the
+                atom names if not given
+            pocket_points (ndarray, optional): Detected pocket points
+            pocket_labels (ndarray, optional): Pocket of each pocket point
+            structure_digests (ndarray, optional): SHA-256 of the structure
+                files the index was built from
+        """
+        self.coords = np.asarray(coords, dtype=np.float64).reshape(-1, 3)
+        self.chains = np.asarray(chains).astype(str)
+        self.resnums = np.asarray(resnums, dtype=np.int64)
+        self.resnames = np.asarray(resnames).astype(str)
+        self.atom_names = np.asarray(atom_names).astype(str)
+
+        if elements is None:
+            # Indexes saved before elements were stored: names such as
+            # "1HB" or "HG1" start with their element after any digits
+            elements = np.char.lstrip(self.atom_names, "0123456789").astype("U1")
+        self.elements = np.asarray(elements).astype(str)
+        self.structure_digests = (
+            set(np.asarray(structure_digests).astype(str).tolist())
+            if structure_digests is not None
+            else set()
+        )
+
+        self._pockets = None
+        if pocket_points is not None and pocket_labels is not None:
+            self._pockets = (
+                np.asarray(pocket_points, dtype=np.float64).reshape(-1, 3),
+                np.asarray(pocket_labels, dtype=np.int64),
+            )
+
+        self._atoms = {}
+        self._residues = {}
+        for i, key in enumerate(zip(self.chains.tolist(), self.resnums.tolist(), self.atom_names.tolist())):
+            # Keep the first alternate location of each atom
+            self._atoms.setdefault(key, i)
+            self._residues.setdefault(key[:2], []).append(i)
+
+        self._tree = None
+
+    def __len__(self):
+        return len(self.coords)
+
+    @classmethod
+    def from_structure(cls, structure_path):
+        """
+        Build the index from a PDB or PDBQT file
+
+        Args:
+            structure_path (str): Path to the structure file
+
+        Returns:
+            ReceptorIndex: New index
+        """
+        atoms = read_atoms(structure_path)
+        # PDB coordinates have three decimals; rounding drops float32 noise
+        coords = atoms["coords"].astype(np.float64).round(3)
+        return cls(
+            coords,
+            atoms["chain"],
+            atoms["resseq"],
+            atoms["resname"],
+            atoms["name"],
+            elements=atoms["element"],
+        )
+
+    @classmethod
+    def load(cls, index_path):
+        """
+        Load an index saved with save()
+
+        Args:
+            index_path (str): Path to the .npz file
+
+        Returns:
+            ReceptorIndex: Loaded index
+        """
+        with np.load(index_path) as data:
+            optional = {
+                key: data[key]
+                for key in ("elements", "pocket_points", "pocket_labels", "structure_digests")
+                if key in data
+            }
+            return cls(
+                data["coords"],
+                data["chains"],
+                data["resnums"],
+                data["resnames"],
+                data["atom_names"],
+                **optional,
+            )
+
+    def save(self, index_path, structure_paths=()):
+        """
+        Save the index arrays; the KD-tree is rebuilt on load
+
+        Pockets are saved if they have been detected. The digests of the
+        structure files are saved too, so an index whose structure was
+        replaced is detected as stale.
+
+        Args:
+            index_path (str): Path to the .npz file
+            structure_paths (sequence): Structure files holding the indexed
+                atoms, e.g. the PDB and the PDBQT converted from it
+        """
+        arrays = {
+            "coords": self.coords,
+            "chains": self.chains,
+            "resnums": self.resnums,
+            "resnames": self.resnames,
+            "atom_names": self.atom_names,
+            "elements": self.elements,
+        }
+        if self._pockets is not None:
+            arrays["pocket_points"], arrays["pocket_labels"] = self._pockets
+        digests = self.structure_digests | {hash_file(path) for path in structure_paths}
+        if digests:
+            arrays["structure_digests"] = np.array(sorted(digests))
+
+        with open(index_path, "wb") as f:
+            np.savez(f, **arrays)
+
+    @property
+    def tree(self):
+        """KD-tree over all atom coordinates, built on first use"""
+        if self._tree is None:
+            self._tree = cKDTree(self.coords)
+        return self._tree
+
+    @property
+    def pockets(self):
+        """
+        Pockets of the receptor, detected on first use over heavy atoms
+
+        Returns:
+            tuple: (points, labels) as returned by detect_pockets()
+        """
+        if self._pockets is None:
+            self._pockets = detect_pockets(self.coords[self.elements != "H"])
+        return self._pockets
+
+    def atom_index(self, chain, resnum, atom_name):
+        """
+        Look up an atom
+
+        Args:
+            chain (str): Chain identifier
+            resnum (int): Residue sequence number
+            atom_name (str): Atom name
+
+        Returns:
+            int: Atom index, or None if not found
+        """
+        return self._atoms.get((chain, int(resnum), atom_name))
+
+    def atom_coord(self, chain, resnum, atom_name):
+        """
+        Get the coordinates of an atom
+
+        Args:
+            chain (str): Chain identifier
+            resnum (int): Residue sequence number
+            atom_name (str): Atom name
+
+        Returns:
+            ndarray: (x, y, z), or None if not found
+        """
+        idx = self.atom_index(chain, resnum, atom_name)
+        return None if idx is None else self.coords[idx]
+
+    def residue_atoms(self, chain, resnum):
+        """
+        Get the atom indices of a residue
+
+        Args:
+            chain (str): Chain identifier
+            resnum (int): Residue sequence number
+
+        Returns:
+            list: Atom indices (empty if the residue is not present)
+        """
+        return self._residues.get((chain, int(resnum)), [])
+
+    def has_chain(self, chain):
+        """Whether any atom belongs to the given chain"""
+        return bool(np.any(self.chains == chain))
+
+    def cysteine_sg(self, chain, resnum):
+        """
+        Get the SG coordinates of a cysteine
+
+        Args:
+            chain (str): Chain identifier
+            resnum (int): Residue sequence number
+
+        Returns:
+            ndarray: (x, y, z), or None if the residue is not a cysteine with an SG
+        """
+        idx = self.atom_index(chain, resnum, "SG")
+        if idx is None or self.resnames[idx] != "CYS":
+            return None
+        return self.coords[idx]
+
+    def neighbours(self, point, radius):
+        """
+        Find atoms within a radius of a point
+
+        Args:
+            point (sequence): (x, y, z)
+            radius (float): Search radius in Angstroms
+
+        Returns:
+            ndarray: Sorted atom indices
+        """
+        return np.array(sorted(self.tree.query_ball_point(point, radius)), dtype=np.int64)
+
+
+def get_receptor_index(structure_path):
+    """
+    Get the index of a receptor, reusing persisted and in-memory copies
+
+    A persisted .index.npz next to the structure (written when the
+    receptor is cached) is loaded if it was saved for the structure's
+    current content; otherwise the structure is parsed once and the index
+    kept in memory.
+
+    Args:
+        structure_path (str): Path to a PDB or PDBQT file
+
+    Returns:
+        ReceptorIndex: Index of the structure
+    """
+    stat = os.stat(structure_path)
+    key = (os.path.abspath(structure_path), stat.st_mtime_ns, stat.st_size)
+
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is not None:
+            _indexes.move_to_end(key)
+            return index
+
+    index = None
+    index_path = index_path_for(structure_path)
+    if os.path.exists(index_path):
+        index = ReceptorIndex.load(index_path)
+        if hash_file(structure_path) not in index.structure_digests:
+            # The structure was replaced after the index was saved
+            index = None
+    if index is None:
+        index = ReceptorIndex.from_structure(structure_path)
+
+    with _indexes_lock:
+        _indexes[key] = index
+        while len(_indexes) > RECEPTOR_INDEX_CACHE_SIZE:
+            _indexes.popitem(last=False)
+
+    return index
@@ -0,0 +1,210 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from utils.artifact_cache import CACHE_ROOT
+from utils.pocket_detection import fit_docking_box
+
+RECEPTOR_REGISTRY_PATH = os.getenv(
+    "RECEPTOR_REGISTRY_PATH", os.path.join(CACHE_ROOT, "receptors.sqlite")
+)
+
+# Box key of the largest pocket; cysteine boxes are keyed "chain:resnum"
+POCKET_BOX = "pocket"
+
+_registry = None
+_registry_lock = threading.Lock()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS receptors (
+    receptor_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    cleaned_pdb TEXT NOT NULL,
+    cleaned_name TEXT NOT NULL,
+    pdbqt TEXT NOT NULL,
+    index_path TEXT,
+    cysteines TEXT NOT NULL,
+    boxes TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS receptors_cleaned_name ON receptors (cleaned_name);
+CREATE INDEX IF NOT EXISTS receptors_cleaned_pdb ON receptors (cleaned_pdb);
+CREATE INDEX IF NOT EXISTS receptors_pdbqt ON receptors (pdbqt);
+"""
+
+
+def receptor_boxes(index, cysteine_ids):
+    """
+    Docking boxes of a receptor for the default ligand extent
+
+    Args:
+        index (ReceptorIndex): Receptor index with pockets
+        cysteine_ids (list): Cysteine identifiers in format "chain:resnum"
+
+    Returns:
+        dict: Box key -> {"center": [x, y, z], "size": [x, y, z]}, for the
+            largest pocket and each cysteine next to a pocket
+    """
+    points, labels = index.pockets
+    anchors = {POCKET_BOX: None}
+    for cys_id in cysteine_ids:
+        chain, resnum = cys_id.split(":")
+        sg = index.cysteine_sg(chain, int(resnum))
+        if sg is not None:
+            anchors[cys_id] = tuple(float(c) for c in sg)
+
+    boxes = {}
+    for key, anchor in anchors.items():
+        box = fit_docking_box(points, labels, anchor)
+        if box is not None:
+            boxes[key] = {"center": list(box[0]), "size": list(box[1])}
+    return boxes
+
+
+class ReceptorRegistry:
+    """
+    SQLite table of prepared receptors keyed by receptor ID.
+
+    Each row points at the prepared artifacts (cleaned PDB, PDBQT and
+    receptor index) and holds the cysteine SG coordinates and docking
+    boxes computed at preparation time, so docking requests resolve a
+    receptor with one primary-key lookup instead of searching the disk.
+    """
+
+    def __init__(self, db_path=RECEPTOR_REGISTRY_PATH):
+        """
+        Open the registry, creating the table if needed
+
+        Args:
+            db_path (str): Path to the SQLite database
+        """
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+
+    @staticmethod
+    def _entry(row):
+        if row is None:
+            return None
+        entry = dict(row)
+        entry["cysteines"] = json.loads(entry["cysteines"])
+        entry["boxes"] = json.loads(entry["boxes"])
+        return entry
+
+    def register(
+        self, receptor_id, name, digest, cleaned_pdb, pdbqt, cysteines, boxes,
+        index_path=None,
+    ):
+        """
+        Add or update a prepared receptor
+
+        Args:
+            receptor_id (str): Receptor ID
+            name (str): Name of the uploaded structure
+            digest (str): SHA-256 of the uploaded structure
+            cleaned_pdb (str): Path to the cleaned PDB file
+            pdbqt (str): Path to the receptor PDBQT file
+            cysteines (dict): Cysteine ID -> SG coordinates
+            boxes (dict): Docking boxes from receptor_boxes()
+            index_path (str, optional): Path to the saved receptor index
+
+        Returns:
+            dict: Registered entry
+        """
+        # Paths are stored absolute so find_by_path() matches them exactly
+        values = (
+            receptor_id,
+            name,
+            digest,
+            os.path.abspath(cleaned_pdb),
+            os.path.basename(cleaned_pdb),
+            os.path.abspath(pdbqt),
+            index_path,
+            json.dumps(cysteines),
+            json.dumps(boxes),
+            time.time(),
+        )
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO receptors VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                values,
+            )
+        return self.get(receptor_id)
+
+    def get(self, receptor_id):
+        """
+        Look up a receptor by ID
+
+        Args:
+            receptor_id (str): Receptor ID
+
+        Returns:
+            dict: Registered entry, or None if unknown
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM receptors WHERE receptor_id = ?", (receptor_id,)
+            ).fetchone()
+        return self._entry(row)
+
+    def find_by_path(self, path):
+        """
+        Look up the receptor stored at a path
+
+        Args:
+            path (str): Path to the cleaned PDB or the PDBQT of a receptor
+
+        Returns:
+            dict: Registered entry, or None if unknown
+        """
+        path = os.path.abspath(path)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM receptors WHERE cleaned_pdb = ? OR pdbqt = ?",
+                (path, path),
+            ).fetchone()
+        return self._entry(row)
+
+    def find_by_filename(self, filename):
+        """
+        Look up all receptors with this cleaned file name
+
+        The same file name is shared by every preparation of a structure
+        (e.g. with different sites or chains), so callers must treat more
+        than one match as ambiguous.
+
+        Args:
+            filename (str): Base name of the cleaned PDB file
+
+        Returns:
+            list: Registered entries, most recent first
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM receptors WHERE cleaned_name = ? ORDER BY created_at DESC",
+                (filename,),
+            ).fetchall()
+        return [self._entry(row) for row in rows]
+
+
+def get_receptor_registry():
+    """
+    Get the process-wide receptor registry
+
+    Returns:
+        ReceptorRegistry: Shared registry instance
+    """
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ReceptorRegistry()
+        return _registry
@@ -1,33 +1,370 @@
 import logging
 import os
-import tempfile
 from collections import defaultdict
 
 import numpy as np
-from Bio.PDB import PDBIO, PDBParser, Select
 from openbabel import pybel
+from scipy.spatial import cKDTree
+
+from utils.accessibility import PROBE_RADIUS, atom_radii, pocket_depth, shrake_rupley
+from utils.pocket_detection import MAX_BOX_SIZE, fit_docking_box
+from utils.receptor_crop import residues_near_box
+from utils.receptor_index import ReceptorIndex, index_path_for
+from utils.structure_io import parse_atoms, pdb_chain_aliases, write_atoms
+from utils.structure_model import Structure
+from utils.structure_stream import structure_base_name
+
+# Maximum SG-SG distance in Angstroms for a potential disulfide bond
+DISULFIDE_DISTANCE = 3.0
+
+# SG accessible area in square Angstroms at which a cysteine counts as
+# about two-thirds reachable for ligandability ranking
+SG_EXPOSURE_SCALE = 10.0
+
+# Region-limited protonation: residues with an atom within
+# PROTONATION_MARGIN of the docking box fitted at the site get hydrogens,
+# so every residue a pose can touch within Vina's 8 A cutoff has them.
+# Residues within PROTONATION_BUFFER of those are passed to OpenBabel as
+# context (bonded neighbours, disulfide partners) so that the cut does
+# not leave open valences on the protonated residues.
+PROTONATION_MARGIN = 8.0
+PROTONATION_BUFFER = 4.0
+
+# AutoDock types of heavy atoms outside the protonated region: oxygens
+# accept, and nitrogens are plain N (backbone amides, Lys/Arg/Asn/Gln/Trp
+# side chain donors) except for histidine ring nitrogens without a
+# hydrogen. HIS is typed as its common HIE tautomer.
+HISTIDINE_ACCEPTORS = {
+    "HIS": {"ND1"},
+    "HIE": {"ND1"},
+    "HID": {"NE2"},
+}
+
+AROMATIC_RING_ATOMS = {
+    "PHE": {"CG", "CD1", "CD2", "CE1", "CE2", "CZ"},
+    "TYR": {"CG", "CD1", "CD2", "CE1", "CE2", "CZ"},
+    "HIS": {"CG", "CD2", "CE1"},
+    "TRP": {"CD2", "CE2", "CE3", "CZ2", "CZ3", "CH2"},
+}
+
+
+def _as_structure(structure):
+    """Parse a structure file unless an in-memory Structure was given"""
+    if isinstance(structure, Structure):
+        return structure
+    return Structure.from_pdb(structure)
+
+
+def _select_altlocs(structure):
+    """
+    Pick one alternate location per atom
 
+    Args:
+        structure (Structure): Parsed structure
 
-class NonHetSelect(Select):
+    Returns:
+        ndarray: Boolean mask keeping atoms without alternates and the
+            highest-occupancy alternate of each disordered atom
     """
-    Select class to remove hetero atoms (ligands, water, etc)
+    keep = structure.altloc == ""
+    alternates = np.flatnonzero(~keep)
+
+    best = {}
+    for i in alternates:
+        key = (structure.chain[i], structure.resseq[i], structure.icode[i], structure.name[i])
+        if key not in best or structure.occupancy[i] > structure.occupancy[best[key]]:
+            best[key] = i
+
+    keep[list(best.values())] = True
+    return keep
+
+
+def clean_model(structure, keep_ligands=None):
+    """
+    Remove water molecules, ligands and alternate locations from a structure
+
+    Args:
+        structure (Structure): Parsed structure
+        keep_ligands (list): List of ligand residue names to keep (optional)
+
+    Returns:
+        Structure: Cleaned structure
+    """
+    # Standard residues are ATOM records; keep HETATM only for the named ligands
+    keep = structure.record == "ATOM"
+    if keep_ligands:
+        keep |= np.isin(structure.resname, list(keep_ligands))
+
+    cleaned = structure.select(keep & _select_altlocs(structure))
+    cleaned.altloc[:] = ""
+    return cleaned
+
+
+def protonate(structure, chain_aliases=None):
+    """
+    Add hydrogens to a structure with OpenBabel
+
+    The structure is handed to OpenBabel as an in-memory string. Chain
+    IDs longer than one character are written as one-character aliases.
+
+    Args:
+        structure (Structure): Cleaned structure
+        chain_aliases (dict, optional): Chain ID -> PDB chain ID to write
+
+    Returns:
+        pybel.Molecule: Protonated molecule
+    """
+    mol = pybel.readstring("pdb", structure.to_pdb_string(chain_aliases))
+    mol.addh()
+    return mol
+
+
+def _residue_ids(structure):
+    """Index of each atom's residue, counting residues in file order"""
+    change = np.ones(len(structure), dtype=bool)
+    change[1:] = (
+        (structure.chain[1:] != structure.chain[:-1])
+        | (structure.resseq[1:] != structure.resseq[:-1])
+        | (structure.icode[1:] != structure.icode[:-1])
+    )
+    return np.cumsum(change) - 1
+
+
+def site_points(structure, residues=None, center=None):
+    """
+    Coordinates that define a protonation site
+
+    Args:
+        structure (Structure): Cleaned structure
+        residues (list, optional): Residues as "chain:number" strings or
+            dictionaries with chain and residue_number, e.g. cysteines
+        center (sequence, optional): (x, y, z) of a pocket or docking box
+
+    Returns:
+        ndarray: Site coordinates, shape (n_points, 3)
     """
+    points = []
+    for residue in residues or []:
+        if isinstance(residue, dict):
+            chain, number = residue["chain"], residue["residue_number"]
+        else:
+            chain, number = str(residue).split(":")
+        mask = (structure.chain == chain) & (structure.resseq == int(number))
+        if not mask.any():
+            raise ValueError(f"Residue {chain}:{number} not found in structure")
+        points.append(structure.coords[mask].astype(np.float64))
+
+    if center is not None:
+        points.append(np.asarray(center, dtype=np.float64).reshape(1, 3))
+
+    if not points:
+        raise ValueError("A protonation site needs residues or a center")
+    return np.vstack(points)
+
+
+def structure_index(structure):
+    """
+    Receptor index of a cleaned structure, heavy atoms only
+
+    Args:
+        structure (Structure): Cleaned structure
+
+    Returns:
+        ReceptorIndex: Index; pockets are detected on first use
+    """
+    return ReceptorIndex(
+        structure.coords.astype(np.float64).round(3),
+        structure.chain,
+        structure.resseq,
+        structure.resname,
+        structure.name,
+        elements=structure.element,
+    )
+
+
+def site_box(structure, points, index=None):
+    """
+    Docking box at a protonation site, fitted as docking fits it
+
+    The box covers the pocket next to the site. Without a pocket there,
+    the largest box docking uses is centred on the site.
+
+    Args:
+        structure (Structure): Cleaned structure
+        points (ndarray): Site coordinates, e.g. from site_points()
+        index (ReceptorIndex, optional): Index of the structure, if built
+
+    Returns:
+        tuple: (center, size) as 3-tuples
+    """
+    if index is None:
+        index = structure_index(structure)
+    anchor = np.atleast_2d(points).mean(axis=0)
+    pocket_points, labels = index.pockets
+    box = fit_docking_box(pocket_points, labels, anchor)
+    if box is None:
+        return tuple(anchor.tolist()), (MAX_BOX_SIZE,) * 3
+    return box
+
+
+def _heavy_atom_ad_types(atoms):
+    """AutoDock types for protein heavy atoms without hydrogens"""
+    elements = np.char.capitalize(atoms["element"])
+    types = elements.astype("U2")
+    types[elements == "O"] = "OA"
+    for resname, names in HISTIDINE_ACCEPTORS.items():
+        types[
+            (elements == "N") & (atoms["resname"] == resname) & np.isin(atoms["name"], list(names))
+        ] = "NA"
+    for resname, names in AROMATIC_RING_ATOMS.items():
+        types[(atoms["resname"] == resname) & np.isin(atoms["name"], list(names))] = "A"
+    return types
+
+
+def protonate_site(structure, points, radius=None, index=None):
+    """
+    Add hydrogens only to the residues around a site
+
+    Residues with an atom within PROTONATION_MARGIN of the docking box at
+    the site (or within an explicit radius of the site points) are
+    protonated; everything else stays heavy-atom-only. Only those
+    residues and a thin shell of neighbours are handed to OpenBabel, so
+    the cost follows the size of the site rather than of the assembly.
+
+    Args:
+        structure (Structure): Cleaned structure
+        points (ndarray): Site coordinates, e.g. from site_points()
+        radius (float, optional): Protonation radius around the points in
+            Angstroms; derived from the site's docking box if not given
+        index (ReceptorIndex, optional): Index of the structure, used to
+            fit the box
+
+    Returns:
+        tuple: (protonated, receptor) atom arrays in residue order; the
+            first holds all hydrogens for the PDB, the second the polar
+            hydrogens and AutoDock types for the rigid receptor PDBQT
+    """
+    residue_ids = _residue_ids(structure)
+    coords = structure.coords.astype(np.float64)
+    n_residues = residue_ids[-1] + 1 if len(residue_ids) else 0
+
+    if radius is None:
+        center, size = site_box(structure, points, index)
+        near_site = residues_near_box(structure.atoms, center, size, PROTONATION_MARGIN)
+    else:
+        near_site = cKDTree(np.atleast_2d(points)).query(
+            coords, k=1, distance_upper_bound=radius
+        )[0] <= radius
+    core = np.zeros(n_residues, dtype=bool)
+    core[residue_ids[near_site]] = True
+    core_atoms = core[residue_ids]
+
+    region = core.copy()
+    if core_atoms.any():
+        near_core = cKDTree(coords[core_atoms]).query(
+            coords, k=1, distance_upper_bound=PROTONATION_BUFFER
+        )[0] <= PROTONATION_BUFFER
+        region[residue_ids[near_core]] = True
+
+    rest = structure.atoms[~core_atoms].copy()
+    rest["ad_type"] = _heavy_atom_ad_types(rest)
+    rest_ids = residue_ids[~core_atoms]
+
+    if not core_atoms.any():
+        return rest, rest
+
+    # OpenBabel reads one-character chains; map its output back through
+    # the aliases so the merged atoms keep the full chain IDs
+    aliases = pdb_chain_aliases(structure.chain)
+    chains = {alias: chain for chain, alias in aliases.items()}
+    mol = protonate(structure.select(region[residue_ids]), aliases)
+    conv = pybel.ob.OBConversion()
+    conv.SetOutFormat("pdbqt")
+    conv.AddOption("r", pybel.ob.OBConversion.OUTOPTIONS)
+
+    # Residue index of every core residue, to put OpenBabel's output back
+    # in place
+    starts = np.flatnonzero(np.diff(residue_ids, prepend=-1))
+    keys = zip(
+        structure.chain[starts].tolist(),
+        structure.resseq[starts].tolist(),
+        structure.icode[starts].tolist(),
+    )
+    core_index = {key: i for i, key in enumerate(keys) if core[i]}
+
+    outputs = (
+        parse_atoms(mol.write("pdb")),
+        parse_atoms(conv.WriteString(mol.OBMol), pdbqt=True),
+    )
+
+    merged = []
+    for output in outputs:
+        output["chain"] = [chains.get(chain, chain) for chain in output["chain"].tolist()]
+        ids = np.array(
+            [
+                core_index.get(key, -1)
+                for key in zip(
+                    output["chain"].tolist(),
+                    output["resseq"].tolist(),
+                    output["icode"].tolist(),
+                )
+            ],
+            dtype=np.int64,
+        )
+        site_atoms = output[ids >= 0]
+        site_atoms["record"] = structure.record[starts][ids[ids >= 0]]
+
+        atoms = np.concatenate([site_atoms, rest])
+        order = np.argsort(np.concatenate([ids[ids >= 0], rest_ids]), kind="stable")
+        merged.append(atoms[order])
 
-    def accept_residue(self, residue):
-        # Return True if the residue is not a hetero atom/water
-        return residue.id[0] == " "  # This selects only standard amino acids
+    return tuple(merged)
 
 
-def clean_structure(input_pdb_path, output_pdb_path=None, keep_ligands=None):
+def write_receptor_pdbqt(mol, output_pdbqt_path):
+    """
+    Write a molecule as a rigid receptor PDBQT without re-reading it
+
+    Args:
+        mol (pybel.Molecule): Prepared receptor
+        output_pdbqt_path (str): Path to save PDBQT file
+
+    Returns:
+        str: Path to PDBQT file
+    """
+    conv = pybel.ob.OBConversion()
+    conv.SetOutFormat("pdbqt")
+    conv.AddOption("r", pybel.ob.OBConversion.OUTOPTIONS)  # r for rigid
+
+    with open(output_pdbqt_path, "w") as f:
+        f.write(conv.WriteString(mol.OBMol))
+
+    return output_pdbqt_path
+
+
+def clean_structure(
+    input_pdb_path,
+    output_pdb_path=None,
+    keep_ligands=None,
+    site_residues=None,
+    site_center=None,
+    protonation_radius=None,
+    chains=None,
+):
     """
     Clean PDB structure by:
     1. Removing water molecules and ligands (except those specified in keep_ligands)
-    2. Adding hydrogens
+    2. Adding hydrogens, to the whole structure or only around a site
 
     Args:
-        input_pdb_path (str): Path to input PDB file
+        input_pdb_path (str): Path to input PDB or mmCIF file, optionally gzip-compressed
         output_pdb_path (str): Path to save cleaned PDB file (optional)
         keep_ligands (list): List of ligand residue names to keep (optional)
+        site_residues (list): Residues such as "A:98" to protonate around (optional)
+        site_center (sequence): (x, y, z) of a pocket to protonate around (optional)
+        protonation_radius (float): Protonation radius around the site; derived
+            from the site's docking box if not given (optional)
+        chains (list): Chains to keep; all if not given (optional)
 
     Returns:
         str: Path to cleaned PDB file
@@ -37,55 +374,32 @@ def clean_structure(input_pdb_path, output_pdb_path=None, keep_ligands=None):
     try:
         # If no output path specified, create one
         if output_pdb_path is None:
-            base_name = os.path.splitext(os.path.basename(input_pdb_path))[0]
+            base_name = structure_base_name(input_pdb_path)
             output_pdb_path = f"{base_name}_cleaned.pdb"
 
         logger.info(f"Cleaning structure: {input_pdb_path}")
         logger.info(f"Output will be saved to: {output_pdb_path}")
 
-        # Step 1: Remove waters and ligands using BioPython
-        parser = PDBParser(QUIET=True)
-        structure = parser.get_structure("protein", input_pdb_path)
-
-        # Custom selector if we want to keep specific ligands
-        if keep_ligands:
-
-            class CustomSelect(Select):
-                def accept_residue(self, residue):
-                    # Keep standard amino acids and specified ligands
-                    return residue.id[0] == " " or residue.resname in keep_ligands
-
-            selector = CustomSelect()
+        # Step 1: Remove waters and ligands from the in-memory model
+        if isinstance(input_pdb_path, Structure):
+            structure = input_pdb_path
         else:
-            selector = NonHetSelect()
-
-        # Save structure without hetero atoms
-        io = PDBIO()
-        io.set_structure(structure)
-
-        # Create temporary file for intermediate result
-        tmp_handle = tempfile.NamedTemporaryFile(suffix=".pdb", delete=False)
-        tmp_path = tmp_handle.name
-        tmp_handle.close()
+            structure = Structure.from_file(input_pdb_path, chains, keep_ligands)
+        cleaned = clean_model(structure, keep_ligands)
 
+        # Step 2: Add hydrogens using OpenBabel
         try:
-            io.save(tmp_path, selector)
-
-            # Step 2: Add hydrogens using OpenBabel
-            try:
-                mol = next(pybel.readfile("pdb", tmp_path))
-                mol.addh()
+            if site_residues or site_center is not None:
+                points = site_points(cleaned, site_residues, site_center)
+                protonated, _ = protonate_site(cleaned, points, protonation_radius)
+                write_atoms(protonated, output_pdb_path)
+            else:
+                mol = protonate(cleaned)
                 mol.write("pdb", output_pdb_path, overwrite=True)
-                logger.info("Successfully cleaned structure and added hydrogens")
-            except Exception as e:
-                logger.error(f"Error adding hydrogens with OpenBabel: {str(e)}")
-                raise
-
-        finally:
-            # Clean up temporary file
-            if os.path.exists(tmp_path):
-                os.remove(tmp_path)
-                logger.debug(f"Removed temporary file: {tmp_path}")
+            logger.info("Successfully cleaned structure and added hydrogens")
+        except Exception as e:
+            logger.error(f"Error adding hydrogens with OpenBabel: {str(e)}")
+            raise
 
         return output_pdb_path
 
@@ -94,37 +408,30 @@ def clean_structure(input_pdb_path, output_pdb_path=None, keep_ligands=None):
         raise
 
 
-def identify_cysteines(pdb_path):
+def identify_cysteines(structure):
     """
     Identify all cysteine residues in the PDB file
 
     Args:
-        pdb_path (str): Path to PDB file
+        structure (Structure or str): Parsed structure or path to PDB file
 
     Returns:
         list: List of cysteine residues with chain and residue number
     """
-    parser = PDBParser(QUIET=True)
-    structure = parser.get_structure("protein", pdb_path)
-
-    cysteines = []
+    structure = _as_structure(structure)
+    mask = structure.residue_mask("CYS")
 
-    for model in structure:
-        for chain in model:
-            chain_id = chain.get_id()
-            for residue in chain:
-                if residue.get_resname() == "CYS":
-                    # Get residue number
-                    res_id = residue.get_id()[1]
-                    cysteines.append(
-                        {
-                            "chain": chain_id,
-                            "residue_number": res_id,
-                            "residue_name": "CYS",
-                        }
-                    )
+    # One entry per residue, in file order
+    residues = dict.fromkeys(zip(structure.chain[mask].tolist(), structure.resseq[mask].tolist()))
 
-    return cysteines
+    return [
+        {
+            "chain": chain_id,
+            "residue_number": res_id,
+            "residue_name": "CYS",
+        }
+        for chain_id, res_id in residues
+    ]
 
 
 def group_cysteines_by_chain(cysteines):
@@ -145,56 +452,71 @@ def group_cysteines_by_chain(cysteines):
     return dict(chain_to_cysteines)
 
 
-def calculate_cysteine_distances(pdb_path, cysteines):
+def _cysteine_sg_atoms(structure, cysteines):
+    """
+    Collect the SG atom of each listed cysteine
+
+    Args:
+        structure (Structure): Parsed structure
+        cysteines (list): List of cysteine residues
+
+    Returns:
+        tuple: (keys, coords) with (chain, residue_number) keys in file
+            order and SG coordinates of shape (n, 3)
+    """
+    sg = np.flatnonzero(structure.atom_mask("CYS", "SG"))
+    keys = list(zip(structure.chain[sg].tolist(), structure.resseq[sg].tolist()))
+
+    wanted = {(c["chain"], c["residue_number"]) for c in cysteines}
+    first = {}
+    for i, key in zip(sg.tolist(), keys):
+        if key in wanted:
+            first.setdefault(key, i)
+
+    coords = structure.coords[list(first.values())].astype(np.float64).round(3)
+    return list(first), coords
+
+
+def calculate_cysteine_distances(structure, cysteines, cutoff=None):
     """
     Calculate distances between SG atoms of cysteine residues
 
+    With a cutoff, only pairs within it are examined, using a KD-tree
+    neighbour search instead of comparing every pair.
+
     Args:
-        pdb_path (str): Path to PDB file
+        structure (Structure or str): Parsed structure or path to PDB file
         cysteines (list): List of cysteine residues
+        cutoff (float, optional): Only return pairs closer than this, in Angstroms
 
     Returns:
         list: List of dictionaries with cysteine pairs and their distances
     """
-    parser = PDBParser(QUIET=True)
-    structure = parser.get_structure("protein", pdb_path)
-
-    # Get all cysteine SG atoms
-    cys_atoms = {}
-    for model in structure:
-        for chain in model:
-            chain_id = chain.get_id()
-            for residue in chain:
-                if residue.get_resname() == "CYS" and residue.get_id()[1] in [
-                    c["residue_number"] for c in cysteines if c["chain"] == chain_id
-                ]:
-                    if "SG" in residue:
-                        res_id = residue.get_id()[1]
-                        cys_atoms[(chain_id, res_id)] = residue["SG"].get_coord()
-
-    # Calculate distances between all cysteine SG atoms
-    distances = []
-    keys = list(cys_atoms.keys())
-    for i in range(len(keys)):
-        for j in range(i + 1, len(keys)):
-            chain_i, res_i = keys[i]
-            chain_j, res_j = keys[j]
-
-            # Calculate Euclidean distance
-            dist = np.linalg.norm(cys_atoms[keys[i]] - cys_atoms[keys[j]])
-
-            distances.append(
-                {
-                    "cys1": {"chain": chain_i, "residue_number": res_i},
-                    "cys2": {"chain": chain_j, "residue_number": res_j},
-                    "distance": float(dist),
-                }
-            )
+    keys, coords = _cysteine_sg_atoms(_as_structure(structure), cysteines)
+    if len(keys) < 2:
+        return []
+
+    if cutoff is None:
+        pairs = np.column_stack(np.triu_indices(len(keys), k=1))
+    else:
+        pairs = cKDTree(coords).query_pairs(cutoff, output_type="ndarray")
+        pairs = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
 
-    return distances
+    dists = np.linalg.norm(coords[pairs[:, 0]] - coords[pairs[:, 1]], axis=1)
+
+    return [
+        {
+            "cys1": {"chain": keys[i][0], "residue_number": keys[i][1]},
+            "cys2": {"chain": keys[j][0], "residue_number": keys[j][1]},
+            "distance": float(dist),
+        }
+        for (i, j), dist in zip(pairs.tolist(), dists.tolist())
+    ]
 
 
-def identify_potential_disulfide_bonds(distances, distance_threshold=3.0):
+def identify_potential_disulfide_bonds(
+    distances, distance_threshold=DISULFIDE_DISTANCE
+):
     """
     Identify potential disulfide bonds based on distance threshold
 
@@ -220,54 +542,150 @@ def identify_potential_disulfide_bonds(distances, distance_threshold=3.0):
     return potential_bonds
 
 
-def analyze_cysteines(pdb_path, cysteines=None):
+def rank_cysteines(structure, cysteines):
+    """
+    Annotate cysteines with accessibility and pocket depth and rank them
+
+    The SG accessible surface area comes from a vectorized Shrake-Rupley
+    calculation over heavy atoms, and pocket depth from rays cast around
+    SG. Ligandability combines both: a reactive cysteine has to be
+    reachable by a ligand and sit in a pocket that can hold one.
+
+    Args:
+        structure (Structure or str): Parsed structure or path to PDB file
+        cysteines (list): List of cysteine residues
+
+    Returns:
+        list: Cysteines with sasa, relative_sasa, pocket_depth,
+            ligandability and rank, most ligandable first
+    """
+    structure = _as_structure(structure)
+    heavy = structure.select(structure.element != "H")
+    keys, _ = _cysteine_sg_atoms(heavy, cysteines)
+
+    sg_index = {}
+    for i in np.flatnonzero(heavy.atom_mask("CYS", "SG")):
+        sg_index.setdefault((str(heavy.chain[i]), int(heavy.resseq[i])), i)
+    sg = np.array([sg_index[key] for key in keys], dtype=np.int64)
+
+    coords = heavy.coords.astype(np.float64)
+    radii = atom_radii(heavy.element, heavy.name)
+    tree = cKDTree(coords)
+
+    residues = np.rec.fromarrays([heavy.chain, heavy.resseq, heavy.icode])
+    _, residue_ids = np.unique(residues, return_inverse=True)
+    residue_ids = residue_ids.ravel()
+
+    sasa = shrake_rupley(coords, radii, sg, tree=tree)
+    max_sasa = 4.0 * np.pi * (radii[sg] + PROBE_RADIUS) ** 2
+    depth = pocket_depth(
+        coords, radii, coords[sg], residue_ids, residue_ids[sg], tree=tree
+    )
+    ligandability = (1.0 - np.exp(-sasa / SG_EXPOSURE_SCALE)) * depth
+
+    metrics = {
+        key: {
+            "sasa": round(float(sasa[i]), 2),
+            "relative_sasa": round(float(sasa[i] / max_sasa[i]), 3),
+            "pocket_depth": round(float(depth[i]), 3),
+            "ligandability": round(float(ligandability[i]), 3),
+        }
+        for i, key in enumerate(keys)
+    }
+
+    # Cysteines without an SG atom cannot react and go last
+    no_sg = {"ligandability": 0.0}
+    ranked = [
+        {**cys, **metrics.get((cys["chain"], cys["residue_number"]), no_sg)}
+        for cys in cysteines
+    ]
+    ranked.sort(key=lambda c: c["ligandability"], reverse=True)
+    for rank, cys in enumerate(ranked, start=1):
+        cys["rank"] = rank
+
+    return ranked
+
+
+def analyze_cysteines(structure, cysteines=None):
     """
     Comprehensive analysis of cysteines in a protein structure
 
     Args:
-        pdb_path (str): Path to PDB file
+        structure (Structure or str): Parsed structure or path to PDB file
         cysteines (list, optional): List of cysteine residues. If None, they will be identified from the structure.
 
     Returns:
-        dict: Dictionary with cysteine analysis, including potential disulfide bonds
+        dict: Dictionary with cysteine analysis, including potential disulfide
+            bonds; cysteines are ranked by ligandability
     """
+    structure = _as_structure(structure)
     if cysteines is None:
-        cysteines = identify_cysteines(pdb_path)
+        cysteines = identify_cysteines(structure)
 
     chain_groups = group_cysteines_by_chain(cysteines)
-    distances = calculate_cysteine_distances(pdb_path, cysteines)
+    # Only pairs within bonding distance are needed, so let the neighbour
+    # search skip the rest
+    distances = calculate_cysteine_distances(
+        structure, cysteines, cutoff=DISULFIDE_DISTANCE
+    )
     potential_disulfides = identify_potential_disulfide_bonds(distances)
 
     # Sort potential disulfides by distance
     potential_disulfides.sort(key=lambda x: x["distance"])
 
     return {
-        "cysteines": cysteines,
+        "cysteines": rank_cysteines(structure, cysteines),
         "chain_groups": chain_groups,
         "potential_disulfide_bonds": potential_disulfides,
     }
 
 
-def clean_and_identify(input_pdb_path, output_pdb_path=None, analyze_cys=True):
+def clean_and_identify(
+    input_pdb_path,
+    output_pdb_path=None,
+    analyze_cys=True,
+    site_residues=None,
+    site_center=None,
+    protonation_radius=None,
+    chains=None,
+):
     """
     Combines structure cleaning and cysteine identification and analysis
 
     Args:
-        input_pdb_path (str): Path to input PDB file
+        input_pdb_path (str): Path to input PDB or mmCIF file, optionally gzip-compressed
         output_pdb_path (str): Path to save cleaned PDB file (optional)
         analyze_cys (bool): Whether to perform cysteine analysis (default: True)
+        site_residues (list): Residues such as "A:98" to protonate around (optional)
+        site_center (sequence): (x, y, z) of a pocket to protonate around (optional)
+        protonation_radius (float): Protonation radius around the site; derived
+            from the site's docking box if not given (optional)
+        chains (list): Chains to keep; all if not given (optional)
 
     Returns:
         tuple: (cleaned_pdb_path, analysis_results)
     """
-    cleaned_path = clean_structure(input_pdb_path, output_pdb_path)
+    if output_pdb_path is None:
+        base_name = structure_base_name(input_pdb_path)
+        output_pdb_path = f"{base_name}_cleaned.pdb"
+
+    # Parse once; protonation does not move heavy atoms, so the analysis
+    # runs on the cleaned model instead of re-reading the output file
+    cleaned = clean_model(Structure.from_file(input_pdb_path, chains))
+    if site_residues or site_center is not None:
+        points = site_points(cleaned, site_residues, site_center)
+        protonated, _ = protonate_site(cleaned, points, protonation_radius)
+        write_atoms(protonated, output_pdb_path)
+    else:
+        protonate(cleaned).write("pdb", output_pdb_path, overwrite=True)
+    cleaned_path = output_pdb_path
 
     if analyze_cys:
-        cysteines = identify_cysteines(cleaned_path)
-        analysis_results = analyze_cysteines(cleaned_path, cysteines)
+        cysteines = identify_cysteines(cleaned)
+        analysis_results = analyze_cysteines(cleaned, cysteines)
         return cleaned_path, analysis_results
     else:
-        cysteines = identify_cysteines(cleaned_path)
+        cysteines = identify_cysteines(cleaned)
         return cleaned_path, cysteines
 
 
@@ -453,19 +871,39 @@ def convert_to_pdbqt_receptor(pdb_path, output_pdbqt_path=None, add_hydrogens=Fa
 
 
 def clean_analyze_and_convert(
-    input_pdb_path, output_dir=None, analyze_cys=True, is_protein=True
+    input_pdb_path,
+    output_dir=None,
+    analyze_cys=True,
+    is_protein=True,
+    site_residues=None,
+    site_center=None,
+    protonation_radius=None,
+    chains=None,
+    base_name=None,
 ):
     """
     Complete protein preparation workflow:
-    1. Clean structure
+    1. Clean structure, protonating the whole structure or only a site
     2. Identify cysteines
     3. Convert to PDBQT format
+    4. Index the receptor and detect pockets (proteins only)
+
+    The input is streamed once through the line filters into an in-memory
+    model that all steps share; gzip-compressed PDB and mmCIF files are
+    read directly, without intermediate files.
 
     Args:
-        input_pdb_path (str): Path to input PDB file
+        input_pdb_path (str): Path to input PDB or mmCIF file, optionally gzip-compressed
         output_dir (str): Directory to save output files (optional)
         analyze_cys (bool): Whether to perform cysteine analysis (default: True)
         is_protein (bool): Whether the input is a protein structure (default: True)
+        site_residues (list): Residues such as "A:98" to protonate around (optional)
+        site_center (sequence): (x, y, z) of a pocket to protonate around (optional)
+        protonation_radius (float): Protonation radius around the site; derived
+            from the site's docking box if not given (optional)
+        chains (list): Chains to keep; all if not given (optional)
+        base_name (str): Prefix of the output file names; taken from the
+            input file name if not given (optional)
 
     Returns:
         dict: Dictionary with paths to processed files and analysis results
@@ -479,7 +917,8 @@ def clean_analyze_and_convert(
     # Ensure output directory exists
     os.makedirs(output_dir, exist_ok=True)
 
-    base_name = os.path.splitext(os.path.basename(input_pdb_path))[0]
+    if base_name is None:
+        base_name = structure_base_name(input_pdb_path)
     cleaned_pdb_path = os.path.join(output_dir, f"{base_name}_cleaned.pdb")
 
     # Determine appropriate PDBQT path based on molecule type
@@ -488,25 +927,44 @@ def clean_analyze_and_convert(
     else:
         pdbqt_path = os.path.join(output_dir, f"{base_name}_ligand.pdbqt")
 
-    # Step 1: Clean the structure
+    # Step 1: Parse once and clean the in-memory model
     try:
-        cleaned_path = clean_structure(input_pdb_path, cleaned_pdb_path)
+        cleaned = clean_model(Structure.from_file(input_pdb_path, chains))
+        index = structure_index(cleaned) if is_protein else None
+        region_limited = is_protein and (site_residues or site_center is not None)
+        if region_limited:
+            points = site_points(cleaned, site_residues, site_center)
+            protonated, receptor = protonate_site(
+                cleaned, points, protonation_radius, index=index
+            )
+            write_atoms(protonated, cleaned_pdb_path)
+        else:
+            mol = protonate(cleaned)
+            mol.write("pdb", cleaned_pdb_path, overwrite=True)
+        cleaned_path = cleaned_pdb_path
         logger.info(f"Structure cleaned: {cleaned_path}")
 
-        # Step 2: Analyze cysteines if requested
+        # Step 2: Analyze cysteines on the model; protonation leaves the
+        # heavy atoms where they were
         if analyze_cys:
-            cysteines = identify_cysteines(cleaned_path)
-            analysis_results = analyze_cysteines(cleaned_path, cysteines)
+            cysteines = identify_cysteines(cleaned)
+            analysis_results = analyze_cysteines(cleaned, cysteines)
         else:
-            cysteines = identify_cysteines(cleaned_path)
+            cysteines = identify_cysteines(cleaned)
             analysis_results = cysteines
 
-        # Step 3: Convert to PDBQT format using appropriate method
+        # Step 3: Convert the protonated molecule to PDBQT without re-reading it
         if is_protein:
-            pdbqt_path = convert_to_pdbqt_receptor(
-                cleaned_path, pdbqt_path, add_hydrogens=False
-            )
+            if region_limited:
+                pdbqt_path = write_atoms(receptor, pdbqt_path, pdbqt=True)
+            else:
+                pdbqt_path = write_receptor_pdbqt(mol, pdbqt_path)
             logger.info(f"Converted to PDBQT receptor: {pdbqt_path}")
+
+            # Step 4: Save the receptor index and its pockets, detected once;
+            # docking picks the saved index up to size its boxes
+            index.pockets
+            index.save(index_path_for(cleaned_path), (cleaned_path, pdbqt_path))
         else:
             pdbqt_path = convert_to_pdbqt2(cleaned_path, pdbqt_path, add_hydrogens=True)
             logger.info(f"Converted to PDBQT ligand: {pdbqt_path}")
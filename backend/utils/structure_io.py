@@ -0,0 +1,529 @@
+import os
+import string
+
+import numpy as np
+
+# One record per atom; all PDB/PDBQT readers and writers share this layout
+ATOM_DTYPE = np.dtype(
+    [
+        ("record", "U6"),
+        ("serial", np.int32),
+        ("name", "U4"),
+        ("altloc", "U1"),
+        ("resname", "U4"),
+        ("chain", "U4"),
+        ("resseq", np.int32),
+        ("icode", "U1"),
+        ("coords", np.float32, (3,)),
+        ("occupancy", np.float32),
+        ("bfactor", np.float32),
+        ("element", "U2"),
+        ("formal_charge", "U2"),
+        ("charge", np.float32),
+        ("ad_type", "U2"),
+    ]
+)
+
+# AutoDock atom types whose element is not the type itself
+AD_TYPE_ELEMENTS = {
+    "A": "C",
+    "NA": "N",
+    "NS": "N",
+    "OA": "O",
+    "OS": "O",
+    "SA": "S",
+    "HD": "H",
+    "HS": "H",
+}
+
+# Column ranges (0-based, end exclusive) of the fixed-width fields
+_COLUMNS = {
+    "record": (0, 6),
+    "serial": (6, 11),
+    "name": (12, 16),
+    "altloc": (16, 17),
+    "resname": (17, 20),
+    "chain": (21, 22),
+    "resseq": (22, 26),
+    "icode": (26, 27),
+    "x": (30, 38),
+    "y": (38, 46),
+    "z": (46, 54),
+    "occupancy": (54, 60),
+    "bfactor": (60, 66),
+    "element": (76, 78),
+    "formal_charge": (78, 80),
+    "charge": (70, 76),
+    "ad_type": (77, 79),
+}
+
+_LINE_WIDTH = 80
+
+_HYBRID36_DIGITS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+# One-character chain IDs handed out to chains whose ID is longer
+_CHAIN_ALIASES = string.ascii_uppercase + string.ascii_lowercase + string.digits
+
+
+def _column(chars, field):
+    """Fixed-width field of every line as a (n_lines, width) character block"""
+    start, end = _COLUMNS[field]
+    return np.ascontiguousarray(chars[:, start:end])
+
+
+def _text(chars, field):
+    """Field as stripped str values; widening to UCS4 avoids per-item decoding"""
+    block = _column(chars, field)
+    return np.char.strip(block.astype(np.uint32).view(f"U{block.shape[1]}").ravel())
+
+
+def _number(chars, field, dtype, default=0):
+    """Field parsed as numbers, with blank fields set to the default"""
+    block = _column(chars, field)
+    blank = (block == 32).all(axis=1)
+    values = block.view(f"S{block.shape[1]}").ravel()
+    if blank.any():
+        values = values.copy()
+        values[blank] = str(default).encode()
+    return values.astype(dtype)
+
+
+def hybrid36_encode(value, width):
+    """
+    Encode a number for a fixed-width PDB field
+
+    Numbers that fit are written as decimals; larger ones use hybrid-36
+    (A0000 follows 99999 in a five-character field), as read by
+    hybrid36_decode().
+
+    Args:
+        value (int): Number to write
+        width (int): Field width, 5 for serials and 4 for residue numbers
+
+    Returns:
+        str: Field value of at most width characters
+    """
+    if -(10 ** (width - 1)) < value < 10**width:
+        return str(value)
+
+    block = 26 * 36 ** (width - 1)
+    offset = value - 10**width
+    if not 0 <= offset < 2 * block:
+        raise ValueError(f"{value} does not fit a {width}-character PDB field")
+
+    # Upper-case numbers come first, then lower-case ones
+    digits = _HYBRID36_DIGITS if offset < block else _HYBRID36_DIGITS.lower()
+    number = offset % block + 10 * 36 ** (width - 1)
+    text = ""
+    while number:
+        number, digit = divmod(number, 36)
+        text = digits[digit] + text
+    return text
+
+
+def hybrid36_decode(text, width):
+    """
+    Decode a hybrid-36 number, as written for serials over 99999 and
+    residue numbers over 9999
+
+    Args:
+        text (str): Stripped field value
+        width (int): Field width
+
+    Returns:
+        int or None: The number, or None if the field is not decodable
+    """
+    try:
+        if text[:1].isupper() and text.isalnum() and text == text.upper():
+            return int(text, 36) - 10 * 36 ** (width - 1) + 10**width
+        if text[:1].islower() and text.isalnum() and text == text.lower():
+            return int(text, 36) + 16 * 36 ** (width - 1) + 10**width
+        return int(text)
+    except ValueError:
+        return None
+
+
+def _integer(chars, field, fallback):
+    """
+    Field parsed as integers, tolerating hybrid-36 and overflow markers
+
+    Plain decimal fields are converted with one NumPy call; only files
+    with other values are decoded per atom. Values that still cannot be
+    read (e.g. "*****") are taken from the fallback, so one field never
+    fails the whole file.
+
+    Args:
+        chars (ndarray): Character block of the atom lines
+        field (str): Field name
+        fallback (ndarray): Value of each atom for undecodable fields
+
+    Returns:
+        ndarray: Integer values
+    """
+    try:
+        return _number(chars, field, np.int64)
+    except ValueError:
+        pass
+
+    start, end = _COLUMNS[field]
+    values = np.array(fallback, dtype=np.int64)
+    for i, text in enumerate(_text(chars, field).tolist()):
+        number = hybrid36_decode(text, end - start) if text else 0
+        if number is not None:
+            values[i] = number
+    return values
+
+
+def parse_atoms(data, pdbqt=None, first_model=True):
+    """
+    Parse ATOM/HETATM records into a structured array
+
+    Lines are sliced as a 2D character array, so each field is converted
+    with one NumPy call instead of per-atom Python objects.
+
+    Args:
+        data (str or bytes): PDB or PDBQT file content
+        pdbqt (bool, optional): Read the PDBQT charge and AutoDock type
+            columns; detected from the content if not given
+        first_model (bool): Stop at the first ENDMDL record (default: True)
+
+    Returns:
+        ndarray: Atoms with dtype ATOM_DTYPE
+    """
+    if isinstance(data, str):
+        data = data.encode()
+
+    if first_model:
+        end = data.find(b"\nENDMDL")
+        if end >= 0:
+            data = data[:end]
+
+    chars = np.array(data.split(b"\n"), dtype=f"S{_LINE_WIDTH}")
+    chars = chars.view(np.uint8).reshape(-1, _LINE_WIDTH)
+
+    # Keep ATOM/HETATM records with coordinates, selected without a Python loop
+    is_atom = (chars[:, :4] == np.frombuffer(b"ATOM", np.uint8)).all(axis=1)
+    is_hetatm = (chars[:, :6] == np.frombuffer(b"HETATM", np.uint8)).all(axis=1)
+    chars = chars[(is_atom | is_hetatm) & (chars[:, 53] != 0)]
+
+    atoms = np.zeros(len(chars), dtype=ATOM_DTYPE)
+    if not len(chars):
+        return atoms
+
+    # Short lines are padded with NULs and may end in CR; make both blanks
+    chars[(chars == 0) | (chars == 13)] = 32
+
+    if pdbqt is None:
+        # PDB leaves columns 67-76 blank (or a segment ID); PDBQT puts the
+        # partial charge there
+        pdbqt = bool(np.any(_column(chars, "charge") == ord(".")))
+
+    for field in ("record", "name", "altloc", "resname", "chain", "icode"):
+        atoms[field] = _text(chars, field)
+    # Undecodable serials fall back to the record's position
+    atoms["serial"] = _integer(chars, "serial", np.arange(1, len(chars) + 1))
+    atoms["resseq"] = _integer(chars, "resseq", np.zeros(len(chars)))
+    atoms["occupancy"] = _number(chars, "occupancy", np.float32, 1.0)
+    atoms["bfactor"] = _number(chars, "bfactor", np.float32)
+    for axis, field in enumerate(("x", "y", "z")):
+        atoms["coords"][:, axis] = _number(chars, field, np.float32)
+
+    if pdbqt:
+        atoms["charge"] = _number(chars, "charge", np.float32)
+        atoms["ad_type"] = _text(chars, "ad_type")
+        elements = atoms["ad_type"].astype(object)
+        for ad_type, element in AD_TYPE_ELEMENTS.items():
+            elements[atoms["ad_type"] == ad_type] = element
+        atoms["element"] = elements.astype("U2")
+    else:
+        atoms["element"] = _text(chars, "element")
+        atoms["formal_charge"] = _text(chars, "formal_charge")
+
+    return atoms
+
+
+def read_atoms(path, first_model=True):
+    """
+    Read a PDB or PDBQT file into a structured array
+
+    Args:
+        path (str): Path to the file
+        first_model (bool): Stop at the first ENDMDL record (default: True)
+
+    Returns:
+        ndarray: Atoms with dtype ATOM_DTYPE
+    """
+    pdbqt = path.lower().endswith(".pdbqt") or None
+    with open(path, "rb") as f:
+        return parse_atoms(f.read(), pdbqt=pdbqt, first_model=first_model)
+
+
+def _atom_name(name, element):
+    # Names shorter than four characters start in column 14 unless the
+    # element symbol has two letters
+    if len(name) < 4 and len(element) != 2:
+        return f" {name}"
+    return name
+
+
+def assign_chain_alias(chain, aliases):
+    """
+    One-character PDB chain ID of a chain, assigned on first sight
+
+    mmCIF chain IDs of large assemblies can have up to four characters;
+    the PDB chain column holds one. A one-character ID is kept unless
+    another chain already uses it; longer IDs get the first free
+    character, so distinct chains stay distinct.
+
+    Args:
+        chain (str): Chain ID
+        aliases (dict): Chain ID -> PDB chain ID assigned so far; updated
+
+    Returns:
+        str: PDB chain ID
+    """
+    alias = aliases.get(chain)
+    if alias is None:
+        used = set(aliases.values())
+        if len(chain) <= 1 and chain not in used:
+            alias = chain
+        else:
+            alias = next((c for c in _CHAIN_ALIASES if c not in used), None)
+            if alias is None:
+                raise ValueError(
+                    f"More than {len(_CHAIN_ALIASES)} chains do not fit PDB chain IDs; "
+                    "select the chains to keep"
+                )
+        aliases[chain] = alias
+    return alias
+
+
+def pdb_chain_aliases(chains):
+    """
+    PDB chain IDs for a set of chains
+
+    Chains that fit keep their IDs; longer ones are aliased.
+
+    Args:
+        chains (iterable): Chain IDs, e.g. the chain column of an atom array
+
+    Returns:
+        dict: Chain ID -> one-character PDB chain ID
+    """
+    chains = list(dict.fromkeys(np.asarray(chains).tolist()))
+    aliases = {}
+    # One-character IDs first, so they are never taken by an alias
+    for chain in sorted(chains, key=lambda chain: len(chain) > 1):
+        assign_chain_alias(chain, aliases)
+    return aliases
+
+
+def check_resnames(resnames):
+    """
+    Raise if residue names do not fit the PDB residue name column
+
+    mmCIF allows five-character residue names; PDB lines hold three. Such
+    names are rejected instead of being cut, which would merge residues.
+
+    Args:
+        resnames (iterable): Residue names to be written
+    """
+    for resname in resnames:
+        if len(resname) > 3:
+            raise ValueError(
+                f"Residue name {resname!r} does not fit the three-character PDB column"
+            )
+
+
+def _field_block(values, width, right=False):
+    """
+    Text values as an (n_atoms, width) character block, padded to the
+    field width; narrowing UCS4 to bytes avoids per-item encoding
+    """
+    values = np.asarray(values, dtype=str)
+    values = np.char.rjust(values, width) if right else np.char.ljust(values, width)
+    codes = values.astype(f"U{width}").view(np.uint32).reshape(-1, width)
+    if (codes > 127).any():
+        raise ValueError("PDB fields must be ASCII")
+    return codes.astype(np.uint8)
+
+
+def _number_block(values, width, decimals=0, plus=False):
+    """
+    Numbers right-aligned in an (n_atoms, width) character block
+
+    Written as "%{width}.{decimals}f" would write them, digit by digit
+    for all atoms at once. A float32 value times 10**decimals is exact
+    in float64, so rounding matches Python's formatting.
+
+    Args:
+        values (ndarray): Numbers to write
+        width (int): Field width
+        decimals (int): Digits after the decimal point; 0 writes integers
+        plus (bool): Write "+" before non-negative numbers
+
+    Returns:
+        ndarray: uint8 character block
+    """
+    if decimals:
+        values = np.asarray(values, dtype=np.float64)
+        scaled = np.rint(np.abs(values) * 10**decimals).astype(np.int64)
+    else:
+        values = np.asarray(values, dtype=np.int64)
+        scaled = np.abs(values)
+    signed = np.signbit(values) | plus
+
+    # Digits before the decimal point, at least one
+    integer = scaled // 10**decimals
+    n_digits = decimals + 1 + sum(integer >= 10**k for k in range(1, width))
+    length = n_digits + (decimals > 0) + signed
+    if (length > width).any():
+        raise ValueError(f"Value does not fit a {width}-character PDB field")
+
+    block = np.full((len(scaled), width), ord(" "), dtype=np.uint8)
+    digit = 0
+    for col in range(width - 1, -1, -1):
+        if decimals and col == width - 1 - decimals:
+            block[:, col] = ord(".")
+            continue
+        is_digit = digit < n_digits
+        block[is_digit, col] = ord("0") + scaled[is_digit] % 10
+        is_sign = signed & (digit == n_digits)
+        block[is_sign, col] = np.where(np.signbit(values[is_sign]), ord("-"), ord("+"))
+        scaled = scaled // 10
+        digit += 1
+    return block
+
+
+def _integer_block(values, width):
+    """Integers as a character block, in hybrid-36 where they do not fit"""
+    fits = (values < 10**width) & (values > -(10 ** (width - 1)))
+    block = _number_block(np.where(fits, values, 0), width)
+    if not fits.all():
+        block[~fits] = _field_block(
+            [hybrid36_encode(value, width) for value in values[~fits].tolist()], width, right=True
+        )
+    return block
+
+
+def format_atoms(atoms, pdbqt=False, ter=True, break_on_gaps=False, chain_aliases=None):
+    """
+    Write atoms as PDB or PDBQT text with renumbered serials
+
+    Each field is formatted for all atoms at once and written into its
+    columns of a fixed-width character block, the reverse of
+    parse_atoms(). Serials and residue numbers too large for their
+    columns are written in hybrid-36. Chain IDs longer than one
+    character are written as one-character aliases (see
+    pdb_chain_aliases), with the full ID in the PDB segment ID column.
+    Residue names, coordinates or other values too wide for their
+    columns raise ValueError instead of shifting the line.
+
+    Args:
+        atoms (ndarray): Atoms with dtype ATOM_DTYPE
+        pdbqt (bool): Write PDBQT charge and AutoDock type columns
+        ter (bool): Write TER records at chain changes and the end (default: True)
+        break_on_gaps (bool): Also write TER where residue numbering jumps
+            within a chain, e.g. after residues were removed (default: False)
+        chain_aliases (dict, optional): Chain ID -> PDB chain ID, e.g. to
+            match a larger structure; derived from the atoms if not given
+
+    Returns:
+        str: File content
+    """
+    check_resnames(np.unique(atoms["resname"]).tolist())
+    if not len(atoms):
+        return "\n" if pdbqt else "END\n"
+    if chain_aliases is None:
+        chain_aliases = pdb_chain_aliases(atoms["chain"])
+
+    chain = atoms["chain"]
+    resseq = atoms["resseq"].astype(np.int64)
+
+    # TER before every atom that starts a new chain (or follows a gap);
+    # each TER takes a serial number
+    ter_before = np.zeros(len(atoms), dtype=bool)
+    if ter:
+        ter_before[1:] = chain[1:] != chain[:-1]
+        if break_on_gaps:
+            ter_before[1:] |= np.diff(resseq) > 1
+    serial = np.arange(1, len(atoms) + 1, dtype=np.int64) + np.cumsum(ter_before)
+
+    chains, chain_index = np.unique(chain, return_inverse=True)
+    alias = np.array([chain_aliases[c] for c in chains.tolist()], dtype="U1")[chain_index]
+
+    name = atoms["name"]
+    element = atoms["element"]
+    indent = (np.char.str_len(name) < 4) & (np.char.str_len(element) != 2)
+    name = np.where(indent, np.char.add(" ", name), name)
+
+    coords = atoms["coords"]
+    fields = [
+        (0, 6, _field_block(atoms["record"], 6)),
+        (6, 11, _integer_block(serial, 5)),
+        (12, 16, _field_block(name, 4)),
+        (16, 17, _field_block(atoms["altloc"], 1)),
+        (17, 20, _field_block(atoms["resname"], 3, right=True)),
+        (21, 22, _field_block(alias, 1)),
+        (22, 26, _integer_block(resseq, 4)),
+        (26, 27, _field_block(atoms["icode"], 1)),
+        (30, 38, _number_block(coords[:, 0], 8, 3)),
+        (38, 46, _number_block(coords[:, 1], 8, 3)),
+        (46, 54, _number_block(coords[:, 2], 8, 3)),
+        (54, 60, _number_block(atoms["occupancy"], 6, 2)),
+        (60, 66, _number_block(atoms["bfactor"], 6, 2)),
+    ]
+    if pdbqt:
+        width = 79
+        fields += [
+            (70, 76, _number_block(atoms["charge"], 6, 3, plus=True)),
+            (77, 79, _field_block(atoms["ad_type"], 2)),
+        ]
+    else:
+        width = _LINE_WIDTH
+        fields += [
+            (72, 76, _field_block(np.where(alias != chain, chain, ""), 4)),
+            (76, 78, _field_block(element, 2, right=True)),
+            (78, 80, _field_block(atoms["formal_charge"], 2)),
+        ]
+
+    block = np.full((len(atoms), width), ord(" "), dtype=np.uint8)
+    for start, end, columns in fields:
+        block[:, start:end] = columns
+
+    lines = block.view(f"S{width}").ravel()
+    lines = np.insert(lines, np.flatnonzero(ter_before), b"TER").tolist()
+    if ter:
+        lines.append(b"TER")
+    if not pdbqt:
+        lines.append(b"END")
+    return b"\n".join(lines).decode() + "\n"
+
+
+def write_atoms(atoms, path, pdbqt=None, ter=True, break_on_gaps=False, chain_aliases=None):
+    """
+    Write atoms to a PDB or PDBQT file
+
+    Args:
+        atoms (ndarray): Atoms with dtype ATOM_DTYPE
+        path (str): Output path
+        pdbqt (bool, optional): Output format; taken from the extension if not given
+        ter (bool): Write TER records at chain changes and the end (default: True)
+        break_on_gaps (bool): Also write TER at residue numbering gaps (default: False)
+        chain_aliases (dict, optional): Chain ID -> PDB chain ID (see format_atoms)
+
+    Returns:
+        str: Output path
+    """
+    if pdbqt is None:
+        pdbqt = os.path.splitext(path)[1].lower() == ".pdbqt"
+
+    with open(path, "w") as f:
+        f.write(
+            format_atoms(
+                atoms, pdbqt=pdbqt, ter=ter, break_on_gaps=break_on_gaps,
+                chain_aliases=chain_aliases,
+            )
+        )
+
+    return path
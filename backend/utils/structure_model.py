@@ -0,0 +1,120 @@
+import numpy as np
+
+from utils.structure_io import ATOM_DTYPE, format_atoms, parse_atoms, read_atoms
+from utils.structure_stream import read_structure_atoms
+
+
+def _field(name, doc):
+    """Expose one column of the atom array as a writable view"""
+    return property(lambda self: self.atoms[name], doc=doc)
+
+
+class Structure:
+    """
+    In-memory model of one structure, backed by a structured NumPy array.
+
+    The file is parsed once; cleaning, cysteine analysis and output all
+    work on the array columns (boolean masks instead of per-atom objects).
+
+    Attributes:
+        atoms (ndarray): Atoms with dtype structure_io.ATOM_DTYPE
+    """
+
+    record = _field("record", "Record types, ATOM or HETATM")
+    name = _field("name", "Atom names")
+    altloc = _field("altloc", "Alternate location indicators")
+    resname = _field("resname", "Residue names")
+    chain = _field("chain", "Chain identifiers")
+    resseq = _field("resseq", "Residue sequence numbers")
+    icode = _field("icode", "Insertion codes")
+    coords = _field("coords", "Atom coordinates, shape (n_atoms, 3)")
+    occupancy = _field("occupancy", "Occupancies")
+    bfactor = _field("bfactor", "Temperature factors")
+    element = _field("element", "Element symbols")
+
+    def __init__(self, atoms=None):
+        self.atoms = np.zeros(0, dtype=ATOM_DTYPE) if atoms is None else atoms
+
+    def __len__(self):
+        return len(self.atoms)
+
+    @classmethod
+    def from_pdb_string(cls, pdb_text):
+        """
+        Parse the first model of a PDB or PDBQT file
+
+        Args:
+            pdb_text (str): File content
+
+        Returns:
+            Structure: Parsed structure
+        """
+        return cls(parse_atoms(pdb_text))
+
+    @classmethod
+    def from_pdb(cls, pdb_path):
+        """
+        Read the first model of a PDB or PDBQT file
+
+        Args:
+            pdb_path (str): Path to the file
+
+        Returns:
+            Structure: Parsed structure
+        """
+        return cls(read_atoms(pdb_path))
+
+    @classmethod
+    def from_file(cls, path, chains=None, keep_hetatm=None):
+        """
+        Read the first model of a PDB or mmCIF file, optionally gzip-compressed
+
+        The file is streamed through the line filters, so waters, other
+        HETATM residues, unwanted chains and alternate locations are
+        dropped before any atom is stored. mmCIF chain IDs and residue
+        numbers are kept in full.
+
+        Args:
+            path (str): Path to the file
+            chains (list, optional): Chains to keep; all if not given
+            keep_hetatm (list, optional): HETATM residue names to keep
+
+        Returns:
+            Structure: Parsed structure
+        """
+        return cls(read_structure_atoms(path, chains, keep_hetatm, hydrogens=True))
+
+    def select(self, mask):
+        """
+        Get the atoms selected by a boolean mask or index array
+
+        Args:
+            mask (ndarray): Boolean mask or atom indices
+
+        Returns:
+            Structure: New structure with the selected atoms
+        """
+        return Structure(self.atoms[mask])
+
+    def residue_mask(self, resname):
+        """Boolean mask of the atoms belonging to residues with this name"""
+        return self.resname == resname
+
+    def atom_mask(self, resname, atom_name):
+        """Boolean mask of the named atom in residues with this name"""
+        return (self.resname == resname) & (self.name == atom_name)
+
+    def to_pdb_string(self, chain_aliases=None):
+        """
+        Write the structure as PDB text with renumbered atoms
+
+        A TER record is written at each chain change and at the end.
+
+        Args:
+            chain_aliases (dict, optional): Chain ID -> PDB chain ID for
+                chain IDs longer than one character (see format_atoms)
+
+        Returns:
+            str: PDB file content
+        """
+        return format_atoms(self.atoms, chain_aliases=chain_aliases)
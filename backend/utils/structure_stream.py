@@ -0,0 +1,524 @@
+import gzip
+import io
+import itertools
+import os
+import re
+
+import numpy as np
+
+from utils.structure_io import (
+    ATOM_DTYPE,
+    assign_chain_alias,
+    check_resnames,
+    hybrid36_encode,
+    parse_atoms,
+)
+
+# Atoms parsed per block when a line stream is turned into an atom array
+PARSE_CHUNK_LINES = 50_000
+
+STRUCTURE_EXTENSIONS = (".pdb", ".ent", ".pdbqt", ".cif", ".mmcif")
+
+# mmCIF _atom_site items for each PDB field, preferring author numbering
+_CIF_FIELDS = {
+    "record": ("group_PDB",),
+    "serial": ("id",),
+    "name": ("auth_atom_id", "label_atom_id"),
+    "altloc": ("label_alt_id",),
+    "resname": ("auth_comp_id", "label_comp_id"),
+    "chain": ("auth_asym_id", "label_asym_id"),
+    "resseq": ("auth_seq_id", "label_seq_id"),
+    "icode": ("pdbx_PDB_ins_code",),
+    "x": ("Cartn_x",),
+    "y": ("Cartn_y",),
+    "z": ("Cartn_z",),
+    "occupancy": ("occupancy",),
+    "bfactor": ("B_iso_or_equiv",),
+    "element": ("type_symbol",),
+    "model": ("pdbx_PDB_model_num",),
+}
+
+# Values of fields that are missing, unknown or inapplicable
+_CIF_DEFAULTS = {
+    "record": "ATOM",
+    "serial": "0",
+    "resseq": "0",
+    "x": "0",
+    "y": "0",
+    "z": "0",
+    "occupancy": "1",
+    "bfactor": "0",
+    "model": "1",
+}
+
+# A CIF value: quoted strings end at a quote followed by whitespace
+_CIF_TOKEN = re.compile(r"""'(.*?)'(?=\s|$)|"(.*?)"(?=\s|$)|(\S+)""")
+
+
+def _is_atom(line):
+    return line.startswith("ATOM") or line.startswith("HETATM")
+
+
+def structure_base_name(path):
+    """
+    File name without directory, compression and structure extensions
+
+    Args:
+        path (str): Path such as 1abc.cif.gz
+
+    Returns:
+        str: Base name such as 1abc
+    """
+    name = os.path.basename(path)
+    if name.lower().endswith(".gz"):
+        name = name[:-3]
+    root, ext = os.path.splitext(name)
+    return root if ext.lower() in STRUCTURE_EXTENSIONS else name
+
+
+def open_lines(path):
+    """
+    Iterate over the lines of a structure file
+
+    Gzip-compressed files are recognised by their magic bytes and
+    decompressed on the fly, so nothing is unpacked to disk.
+
+    Args:
+        path (str): Path to a PDB or mmCIF file, optionally gzip-compressed
+
+    Yields:
+        str: Lines without line endings
+    """
+    with open(path, "rb") as raw:
+        compressed = raw.read(2) == b"\x1f\x8b"
+        raw.seek(0)
+        stream = gzip.GzipFile(fileobj=raw) if compressed else raw
+        with io.TextIOWrapper(stream, encoding="utf-8", errors="replace") as text:
+            for line in text:
+                yield line.rstrip("\r\n")
+
+
+def _cif_value(value, default=""):
+    return default if value in ("?", ".") else value
+
+
+def mmcif_rows(lines):
+    """
+    Rows of the _atom_site loop of an mmCIF stream
+
+    Rows are read as the lines arrive; other categories are skipped.
+    Unknown ("?") and inapplicable (".") values are given as defaults.
+
+    Args:
+        lines (iterable): mmCIF lines
+
+    Yields:
+        dict: Field name (as in _CIF_FIELDS) to value string
+    """
+    items = []
+    in_loop = False
+    columns = None
+
+    for line in lines:
+        if line.startswith("loop_"):
+            in_loop, items, columns = True, [], None
+            continue
+
+        if in_loop and line.startswith("_atom_site."):
+            items.append(line.split()[0][len("_atom_site."):])
+            continue
+
+        if not items:
+            in_loop = False
+            continue
+
+        if line.startswith(("_", "#", "loop_", "data_")) or not line.strip():
+            if columns is not None:
+                # End of the atom_site loop
+                return
+            items, in_loop = [], False
+            continue
+
+        if columns is None:
+            positions = {item: i for i, item in enumerate(items)}
+            columns = {
+                field: next((positions[n] for n in names if n in positions), None)
+                for field, names in _CIF_FIELDS.items()
+            }
+
+        values = [a or b or c for a, b, c in _CIF_TOKEN.findall(line)]
+        if len(values) != len(items):
+            continue
+
+        yield {
+            field: _cif_value(values[index], _CIF_DEFAULTS.get(field, ""))
+            if index is not None
+            else _CIF_DEFAULTS.get(field, "")
+            for field, index in columns.items()
+        }
+
+
+def mmcif_to_pdb_lines(lines):
+    """
+    Convert the _atom_site loop of an mmCIF stream to PDB records
+
+    Rows are converted as they are read. Serials and residue numbers too
+    large for the PDB columns are written in hybrid-36. Chain IDs longer
+    than one character get a one-character alias as they are first seen,
+    with the full ID in the segment ID column; residue names longer than
+    three raise ValueError, as cutting them would merge residues. Model
+    changes are marked with MODEL/ENDMDL records.
+
+    Args:
+        lines (iterable): mmCIF lines
+
+    Yields:
+        str: ATOM/HETATM, MODEL and ENDMDL records
+    """
+    model = None
+    aliases = {}
+
+    for row in mmcif_rows(lines):
+        if row["model"] != model:
+            if model is not None:
+                yield "ENDMDL"
+            yield f"MODEL     {row['model']:>4}"
+            model = row["model"]
+
+        check_resnames((row["resname"],))
+        chain = assign_chain_alias(row["chain"], aliases)
+        segment = row["chain"] if chain != row["chain"] else ""
+        name = row["name"]
+        element = row["element"].upper()
+        if len(name) < 4 and len(element) != 2:
+            name = f" {name}"
+
+        yield (
+            f"{row['record']:<6}{hybrid36_encode(int(row['serial']), 5):>5} "
+            f"{name:<4}{row['altloc']:1}{row['resname']:>3} "
+            f"{chain:1}{hybrid36_encode(int(row['resseq']), 4):>4}{row['icode'][:1]:1}   "
+            f"{float(row['x']):8.3f}{float(row['y']):8.3f}{float(row['z']):8.3f}"
+            f"{float(row['occupancy']):6.2f}{float(row['bfactor']):6.2f}"
+            f"      {segment:<4}{element:>2}"
+        )
+
+    if model is not None:
+        yield "ENDMDL"
+
+
+def _mmcif_block(rows):
+    """Atom array of a list of mmCIF rows"""
+    atoms = np.zeros(len(rows), dtype=ATOM_DTYPE)
+    if not rows:
+        return atoms
+
+    for field in ("record", "name", "altloc", "resname", "chain", "icode"):
+        atoms[field] = [row[field] for row in rows]
+    atoms["element"] = [row["element"].upper() for row in rows]
+    for field in ("serial", "resseq"):
+        atoms[field] = np.array([row[field] for row in rows]).astype(np.int64)
+    for field in ("occupancy", "bfactor"):
+        atoms[field] = np.array([row[field] for row in rows]).astype(np.float32)
+    atoms["coords"] = np.array(
+        [(row["x"], row["y"], row["z"]) for row in rows]
+    ).astype(np.float32)
+    return atoms
+
+
+def select_altloc_atoms(atoms):
+    """
+    Keep the highest-occupancy alternate location of each atom
+
+    Args:
+        atoms (ndarray): Atoms with dtype structure_io.ATOM_DTYPE
+
+    Returns:
+        ndarray: Atoms with blank altloc fields, in the original order
+    """
+    keep = atoms["altloc"] == ""
+    alternates = np.flatnonzero(~keep)
+    if len(alternates):
+        # Highest occupancy first, ties in file order; the first
+        # alternate of each atom is then the one to keep
+        order = alternates[np.lexsort((alternates, -atoms["occupancy"][alternates]))]
+        best = {}
+        for i, key in zip(
+            order.tolist(),
+            zip(*(atoms[field][order].tolist() for field in ("chain", "resseq", "icode", "name"))),
+        ):
+            best.setdefault(key, i)
+        keep[list(best.values())] = True
+
+    atoms = atoms[keep]
+    atoms["altloc"] = ""
+    return atoms
+
+
+def mmcif_atoms(lines, chains=None, keep_hetatm=None, hydrogens=False, chunk_rows=PARSE_CHUNK_LINES):
+    """
+    Read the first model of an mmCIF stream into an atom array
+
+    The mmCIF values are stored as they are, so multi-character chain
+    IDs and residue numbers over 9999 are kept. Rows are filtered as they
+    are read, like clean_lines() does for PDB records, and converted one
+    block at a time.
+
+    Args:
+        lines (iterable): mmCIF lines
+        chains (iterable, optional): Chains to keep; all if not given
+        keep_hetatm (iterable, optional): HETATM residue names to keep
+        hydrogens (bool): Keep hydrogens (default: False)
+        chunk_rows (int): Rows converted per block
+
+    Returns:
+        ndarray: Atoms with dtype structure_io.ATOM_DTYPE
+    """
+    chains = set(chains) if chains else None
+    keep_hetatm = set(keep_hetatm or ())
+
+    blocks, chunk = [], []
+    model = None
+    for row in mmcif_rows(lines):
+        if model is None:
+            model = row["model"]
+        elif row["model"] != model:
+            break
+        if chains is not None and row["chain"] not in chains:
+            continue
+        if row["record"] == "HETATM" and row["resname"] not in keep_hetatm:
+            continue
+        if not hydrogens and row["element"].upper() in ("H", "D"):
+            continue
+        chunk.append(row)
+        if len(chunk) >= chunk_rows:
+            blocks.append(_mmcif_block(chunk))
+            chunk = []
+    blocks.append(_mmcif_block(chunk))
+    return select_altloc_atoms(np.concatenate(blocks))
+
+
+def _open_structure(path):
+    """Lines of a structure file and whether it is mmCIF"""
+    lines = open_lines(path)
+
+    # mmCIF files open with a data block header, whatever their name
+    head = next(lines, "")
+    return itertools.chain([head], lines), head.startswith("data_")
+
+
+def structure_lines(path):
+    """
+    PDB records of a PDB or mmCIF file, optionally gzip-compressed
+
+    Args:
+        path (str): Path to the structure file
+
+    Yields:
+        str: PDB records
+    """
+    lines, is_mmcif = _open_structure(path)
+    if is_mmcif:
+        return mmcif_to_pdb_lines(lines)
+    return lines
+
+
+def read_structure_atoms(path, chains=None, keep_hetatm=None, hydrogens=False):
+    """
+    Read and clean the first model of a PDB or mmCIF file
+
+    PDB files go through clean_lines(); mmCIF files are read into the
+    atom array directly, so chain IDs and residue numbers that do not fit
+    PDB columns are kept as they are.
+
+    Args:
+        path (str): Path to the structure file, optionally gzip-compressed
+        chains (iterable, optional): Chains to keep; all if not given
+        keep_hetatm (iterable, optional): HETATM residue names to keep
+        hydrogens (bool): Keep hydrogens (default: False)
+
+    Returns:
+        ndarray: Atoms with dtype structure_io.ATOM_DTYPE
+    """
+    lines, is_mmcif = _open_structure(path)
+    if is_mmcif:
+        return mmcif_atoms(lines, chains, keep_hetatm, hydrogens)
+    return parse_lines(
+        clean_lines(lines, chains=chains, keep_hetatm=keep_hetatm, hydrogens=hydrogens)
+    )
+
+
+def first_model(lines):
+    """Stop at the end of the first model"""
+    for line in lines:
+        if line.startswith("ENDMDL"):
+            return
+        yield line
+
+
+def atom_records(lines):
+    """Keep ATOM/HETATM and TER records, dropping headers, CONECT and the like"""
+    for line in lines:
+        if _is_atom(line) or line.startswith("TER"):
+            yield line
+
+
+def _element(line):
+    element = line[76:78].strip()
+    if element:
+        return element.upper()
+    return line[12:16].strip().lstrip("0123456789")[:1].upper()
+
+
+def strip_hydrogens(lines):
+    """Drop hydrogen and deuterium atoms"""
+    for line in lines:
+        if _is_atom(line) and _element(line) in ("H", "D"):
+            continue
+        yield line
+
+
+def select_chains(lines, chains):
+    """
+    Keep the atoms of the given chains
+
+    Args:
+        lines (iterable): PDB records
+        chains (iterable): Chain identifiers to keep
+
+    Yields:
+        str: PDB records
+    """
+    chains = set(chains)
+    for line in lines:
+        if _is_atom(line) and line[21:22] not in chains:
+            continue
+        yield line
+
+
+def select_hetatms(lines, keep=None):
+    """
+    Drop HETATM records except whitelisted residues
+
+    Waters are dropped too unless listed.
+
+    Args:
+        lines (iterable): PDB records
+        keep (iterable, optional): HETATM residue names to keep
+
+    Yields:
+        str: PDB records
+    """
+    keep = set(keep or ())
+    for line in lines:
+        if line.startswith("HETATM") and line[17:20].strip() not in keep:
+            continue
+        yield line
+
+
+def _best_alternates(residue):
+    """Residue lines with one alternate per atom, the highest occupancy first seen"""
+    best = {}
+    for i, line in enumerate(residue):
+        if line[16:17] == " ":
+            continue
+        name = line[12:16]
+        occupancy = float(line[54:60].strip() or 1.0)
+        if name not in best or occupancy > best[name][1]:
+            best[name] = (i, occupancy)
+
+    chosen = {i for i, _ in best.values()}
+    for i, line in enumerate(residue):
+        if line[16:17] == " ":
+            yield line
+        elif i in chosen:
+            yield f"{line[:16]} {line[17:]}"
+
+
+def select_altlocs(lines):
+    """
+    Keep the highest-occupancy alternate location of each atom
+
+    Only one residue is held at a time, since alternates of an atom are
+    listed within its residue.
+
+    Args:
+        lines (iterable): PDB records
+
+    Yields:
+        str: PDB records with blank altloc columns
+    """
+    residue, key = [], None
+    for line in lines:
+        line_key = line[17:27] if _is_atom(line) else None
+        if line_key != key or line_key is None:
+            yield from _best_alternates(residue)
+            residue, key = [], line_key
+        if line_key is None:
+            yield line
+        else:
+            residue.append(line)
+    yield from _best_alternates(residue)
+
+
+def renumber(lines):
+    """Renumber atom serials and write TER records at chain changes"""
+    serial, chain = 1, None
+    for line in lines:
+        if line.startswith("TER"):
+            continue
+        if _is_atom(line):
+            if chain is not None and line[21:22] != chain:
+                yield "TER"
+                serial += 1
+            chain = line[21:22]
+            line = f"{line[:6]}{hybrid36_encode(serial, 5):>5}{line[11:]}"
+            serial += 1
+        yield line
+    if chain is not None:
+        yield "TER"
+
+
+def clean_lines(lines, chains=None, keep_hetatm=None, hydrogens=False, models="first"):
+    """
+    Compose the standard cleaning filters over a stream of PDB records
+
+    Args:
+        lines (iterable): PDB records, e.g. from structure_lines()
+        chains (iterable, optional): Chains to keep; all if not given
+        keep_hetatm (iterable, optional): HETATM residue names to keep
+        hydrogens (bool): Keep hydrogens (default: False)
+        models (str): "first" to stop after the first model, "all" to keep all
+
+    Yields:
+        str: Cleaned PDB records
+    """
+    if models == "first":
+        lines = first_model(lines)
+    lines = atom_records(lines)
+    if chains:
+        lines = select_chains(lines, chains)
+    lines = select_hetatms(lines, keep_hetatm)
+    if not hydrogens:
+        lines = strip_hydrogens(lines)
+    return select_altlocs(lines)
+
+
+def parse_lines(lines, chunk_lines=PARSE_CHUNK_LINES):
+    """
+    Parse a stream of PDB records into an atom array, one block at a time
+
+    Args:
+        lines (iterable): PDB records
+        chunk_lines (int): Lines parsed per block
+
+    Returns:
+        ndarray: Atoms with dtype structure_io.ATOM_DTYPE
+    """
+    blocks, chunk = [], []
+    for line in lines:
+        chunk.append(line)
+        if len(chunk) >= chunk_lines:
+            blocks.append(parse_atoms("\n".join(chunk), pdbqt=False, first_model=False))
+            chunk = []
+    blocks.append(parse_atoms("\n".join(chunk), pdbqt=False, first_model=False))
+    return np.concatenate(blocks)
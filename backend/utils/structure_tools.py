@@ -1,6 +1,7 @@
-from Bio.PDB import PDBParser, Selection
 import os
 
+from utils.receptor_index import get_receptor_index
+
 def get_residue_coordinates(pdb_path, chain_id, residue_number, atom_name="CA"):
     """
     Get the coordinates of a specific atom from a residue in a PDB file
@@ -21,39 +22,23 @@ def get_residue_coordinates(pdb_path, chain_id, residue_number, atom_name="CA"):
             pdb_path = potential_pdb
             
     try:
-        parser = PDBParser(QUIET=True)
-        structure = parser.get_structure('protein', pdb_path)
-        
-        # Find the residue
-        for model in structure:
-            if chain_id in model:
-                chain = model[chain_id]
-                
-                # Try to get the residue with the residue ID
-                residue_found = False
-                for residue in chain:
-                    if residue.get_id()[1] == residue_number:
-                        residue_found = True
-                        # Find the requested atom
-                        if atom_name in residue:
-                            atom = residue[atom_name]
-                            return atom.get_coord().tolist()
-                        else:
-                            # If specific atom not found, return CA or first atom
-                            if "CA" in residue:
-                                return residue["CA"].get_coord().tolist()
-                            else:
-                                # Get first atom
-                                for atom in residue:
-                                    return atom.get_coord().tolist()
-                
-                if not residue_found:
-                    print(f"Warning: Residue {residue_number} not found in chain {chain_id}")
-                    return None
-        
-        print(f"Warning: Chain {chain_id} not found in structure")
-        return None
+        index = get_receptor_index(pdb_path)
+
+        atoms = index.residue_atoms(chain_id, residue_number)
+        if not atoms:
+            if index.has_chain(chain_id):
+                print(f"Warning: Residue {residue_number} not found in chain {chain_id}")
+            else:
+                print(f"Warning: Chain {chain_id} not found in structure")
+            return None
+
+        # Requested atom, else CA, else the first atom of the residue
+        for name in (atom_name, "CA"):
+            coord = index.atom_coord(chain_id, residue_number, name)
+            if coord is not None:
+                return coord.tolist()
+        return index.coords[atoms[0]].tolist()
         
     except Exception as e:
         print(f"Error parsing PDB structure: {str(e)}")
-        return None
\ No newline at end of file
+        return None
@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+from utils.artifact_cache import ArtifactCache
+
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Written last into a prepared protein directory; its presence marks the
+# entry as complete
+ANALYSIS_FILE = "analysis.json"
+
+
+def store_upload(fileobj, directory, suffix=""):
+    """
+    Save an upload under the SHA-256 of its content
+
+    The content is hashed while it is copied, so the file is read only
+    once. Identical uploads map to the same file, and uploads that share
+    a name no longer overwrite each other.
+
+    Args:
+        fileobj: Readable binary file object, e.g. UploadFile.file
+        directory (str): Directory to store the file in
+        suffix (str): File suffix, e.g. ".pdb" or ".cif.gz"
+
+    Returns:
+        tuple: (path, digest) of the stored file
+    """
+    os.makedirs(directory, exist_ok=True)
+    digest = hashlib.sha256()
+
+    with tempfile.NamedTemporaryFile(
+        dir=directory, prefix=".upload-", delete=False
+    ) as tmp:
+        for chunk in iter(lambda: fileobj.read(UPLOAD_CHUNK_SIZE), b""):
+            digest.update(chunk)
+            tmp.write(chunk)
+
+    digest = digest.hexdigest()
+    path = os.path.join(directory, f"{digest}{suffix}")
+    if os.path.exists(path):
+        os.remove(tmp.name)
+    else:
+        os.replace(tmp.name, path)
+
+    return path, digest
+
+
+def prepared_key(digest, **options):
+    """
+    Key of a prepared protein: the upload digest plus preparation options
+
+    Args:
+        digest (str): SHA-256 of the uploaded structure
+        **options: Options that change the prepared artifacts
+
+    Returns:
+        str: Hex key
+    """
+    return ArtifactCache.make_key(digest, **options)
+
+
+def load_prepared(entry_dir):
+    """
+    Load the saved result of a completed preparation
+
+    Args:
+        entry_dir (str): Prepared protein directory
+
+    Returns:
+        dict: Result with absolute cleaned_pdb and pdbqt paths and the
+            analysis, or None if the protein was not prepared yet
+    """
+    try:
+        with open(os.path.join(entry_dir, ANALYSIS_FILE)) as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    paths = {
+        name: os.path.join(entry_dir, saved[name]) for name in ("cleaned_pdb", "pdbqt")
+    }
+    if not all(os.path.exists(path) for path in paths.values()):
+        return None
+    return {**saved, **paths}
+
+
+def prepare_once(entry_dir, prepare):
+    """
+    Run a preparation into its own directory unless it already exists
+
+    The preparation writes into a staging directory that is renamed into
+    place together with the saved result, so a directory is either
+    complete or absent, and concurrent uploads of the same structure do
+    not write over each other.
+
+    Args:
+        entry_dir (str): Prepared protein directory
+        prepare (callable): Called with a staging directory; returns the
+            result dict with cleaned_pdb and pdbqt paths inside it
+
+    Returns:
+        tuple: (result, reused) with paths pointing into entry_dir
+    """
+    result = load_prepared(entry_dir)
+    if result is not None:
+        return result, True
+
+    parent = os.path.dirname(entry_dir)
+    os.makedirs(parent, exist_ok=True)
+    staging = tempfile.mkdtemp(prefix=".staging-", dir=parent)
+
+    try:
+        result = prepare(staging)
+        saved = {
+            **result,
+            "cleaned_pdb": os.path.relpath(result["cleaned_pdb"], staging),
+            "pdbqt": os.path.relpath(result["pdbqt"], staging),
+        }
+        with open(os.path.join(staging, ANALYSIS_FILE), "w") as f:
+            json.dump(saved, f)
+
+        try:
+            os.rename(staging, entry_dir)
+        except OSError:
+            # Another request prepared the same structure first
+            if load_prepared(entry_dir) is None:
+                raise
+            shutil.rmtree(staging, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    return load_prepared(entry_dir), False
@@ -1,6 +1,8 @@
 from rdkit import Chem
 import numpy as np
 
+from utils.covalent_scoring import score_covalent
+
 class WarheadDetector:
     def __init__(self):
         """Initialize warhead detector with SMARTS patterns for common reactive groups"""
@@ -86,78 +88,15 @@ def calculate_covalent_score(affinity, distance_to_cysteine):
     """
     Calculate a score for potential covalent binding
     
-    Args:
-        affinity: Docking binding affinity (kcal/mol)
-        distance_to_cysteine: Distance to cysteine sulfur (Angstrom)
-        
-    Returns:
-        float: Score representing covalent binding potential
-    """
-    # Ideal distance is around 3-4 Å
-    distance_factor = 1.0 / (1.0 + np.exp((distance_to_cysteine - 4.0) * 2.0))
-    
-    # Affinity is typically negative, better scores are more negative
-    # Normalize to positive value for scoring
-    affinity_factor = np.exp(-affinity / 2.0)
-    
-    # Combine scores
-    return distance_factor * affinity_factor * 10.0
-
-def predict_covalent_binding(affinity, has_warhead, distance_to_cysteine):
-    """
-    Predict if a compound is likely to form a covalent bond
+    Scalar wrapper around the "sigmoid" function in utils.covalent_scoring;
+    use score_covalent there to score many poses at once.
     
     Args:
         affinity: Docking binding affinity (kcal/mol)
-        has_warhead: Whether compound contains a warhead group
         distance_to_cysteine: Distance to cysteine sulfur (Angstrom)
         
     Returns:
-        dict: Prediction results
+        float: Score representing covalent binding potential
     """
-    # No warhead, no covalent binding
-    if not has_warhead:
-        return {
-            "is_covalent": False,
-            "confidence": 0.9,
-            "reason": "No reactive warhead detected"
-        }
-    
-    # Distance too large for covalent bond
-    if distance_to_cysteine > 7.0:
-        return {
-            "is_covalent": False,
-            "confidence": 0.8,
-            "reason": f"Distance to cysteine ({distance_to_cysteine:.1f} Å) too large for covalent bond"
-        }
-    
-    # Ideal distance for covalent binding
-    if 3.0 <= distance_to_cysteine <= 5.0:
-        confidence = 0.9
-        if affinity < -7.0:  # Good affinity
-            confidence = 0.95
-            
-        return {
-            "is_covalent": True,
-            "confidence": confidence,
-            "reason": f"Warhead at optimal distance ({distance_to_cysteine:.1f} Å) with good affinity ({affinity:.1f})"
-        }
-    
-    # Close enough but not ideal
-    if distance_to_cysteine < 7.0:
-        confidence = 0.7
-        if affinity < -7.0:  # Good affinity
-            confidence = 0.8
-            
-        return {
-            "is_covalent": True,
-            "confidence": confidence,
-            "reason": f"Warhead at reasonable distance ({distance_to_cysteine:.1f} Å) with affinity {affinity:.1f}"
-        }
-    
-    # Fallback
-    return {
-        "is_covalent": False,
-        "confidence": 0.6,
-        "reason": "Conditions not ideal for covalent binding"
-    }
\ No newline at end of file
+    scores, _ = score_covalent(affinity, distance_to_cysteine, True, scoring="sigmoid")
+    return float(scores)